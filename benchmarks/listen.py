@@ -0,0 +1,260 @@
+"""Benchmark listening, from receiving a pull response to calling the ``on_*`` hooks.
+
+A stub HTTP session generates a stream of events (messages, typing, reactions and
+presence updates) at a fixed rate, and serves them as pull responses to a client
+listening with `Client._do_one_listen`. Reports how many events are handled per
+second, the latency from an event being generated to it being handled, and how
+much the memory usage grows. Run from the repository root::
+
+    python benchmarks/listen.py                # As fast as possible, for 10 seconds
+    python benchmarks/listen.py --rate 2000    # 2000 events per second
+
+From the CPU time used per event, this also estimates how many accounts one CPU
+core can listen with, given how many events each account receives per second. The
+estimate is most accurate when generating events as fast as possible, since the
+thread generating events at a fixed rate uses CPU time as well.
+"""
+import argparse
+import collections
+import itertools
+import json
+import resource
+import threading
+import time
+
+from utils import OfflineClient
+
+# Fractions of each kind of generated event
+MIX = (("message", 0.5), ("typing", 0.25), ("reaction", 0.15), ("presence", 0.1))
+
+
+def get_rss():
+    """Return the current resident set size in bytes, or the peak if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Kilobytes on Linux, bytes on macOS, but it's only a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def client_payload(delta):
+    return [ord(c) for c in json.dumps({"deltas": [delta]})]
+
+
+class EventStream:
+    """Generates events of each kind in `MIX`, in a fixed order."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        kinds = []
+        for kind, fraction in MIX:
+            kinds.extend([kind] * int(fraction * 20))
+        self._kinds = itertools.cycle(kinds)
+        reaction = {
+            "deltaMessageReaction": {
+                "threadKey": {"threadFbId": 1111},
+                "messageId": "mid.$bench0",
+                "action": 0,
+                "userId": 4321,
+                "senderId": 4321,
+                "reaction": "\U0001f60d",
+            }
+        }
+        self._reaction = {
+            "type": "delta",
+            "delta": {"class": "ClientPayload", "payload": client_payload(reaction)},
+            "ofd_ts": 1567000000000,
+        }
+        self._presence = {
+            "type": "chatproxy-presence",
+            "buddyList": {str(4321 + i): {"lat": 1567000000, "p": 2} for i in range(5)},
+        }
+
+    def next(self):
+        kind = next(self._kinds)
+        if kind == "message":
+            return {
+                "type": "delta",
+                "delta": {
+                    "class": "NewMessage",
+                    "body": "Hello, this is a benchmark",
+                    "messageMetadata": {
+                        "messageId": "mid.$bench{}".format(next(self._ids)),
+                        "actorFbId": 4321,
+                        "timestamp": "1567000000000",
+                        "threadKey": {"threadFbId": 1111},
+                        "tags": ["source:chat:web"],
+                    },
+                    "attachments": [],
+                    "data": {},
+                },
+            }
+        if kind == "typing":
+            return {"type": "typ", "from": 4321, "to": 1234, "st": 1}
+        if kind == "reaction":
+            return self._reaction
+        return self._presence
+
+
+class StubResponse:
+    def __init__(self, content):
+        self.status_code = 200
+        self._content = content.encode()
+
+
+class StubSession:
+    """Stands in for `requests.Session`, serving generated events on pull requests.
+
+    Args:
+        rate: Events generated per second, or ``0`` to generate events as fast as
+            they're requested
+        batch_size: Max. number of events in a pull response
+        hold: Max. number of seconds to wait for events, like Facebook does
+    """
+
+    def __init__(self, rate, batch_size, hold=1):
+        self.rate = rate
+        self.batch_size = batch_size
+        self.hold = hold
+        #: Time each event was generated at, in order
+        self.generated_at = []
+        self.pulls = 0
+        self._stream = EventStream()
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def start(self):
+        if self.rate:
+            threading.Thread(target=self._generate, daemon=True).start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+
+    def _generate(self):
+        started_at = time.perf_counter()
+        for i in itertools.count():
+            # Generate events on schedule, so falling behind shows up as latency
+            scheduled_at = started_at + i / self.rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self._condition:
+                if self._stopped:
+                    return
+                self._pending.append((scheduled_at, self._stream.next()))
+                self._condition.notify()
+
+    def _take_events(self):
+        if not self.rate:
+            now = time.perf_counter()
+            return [(now, self._stream.next()) for _ in range(self.batch_size)]
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending, timeout=self.hold)
+            count = min(self.batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def get(self, url, params=None, timeout=None):
+        if not url.endswith("/pull"):
+            raise ValueError("Unexpected request: {}".format(url))
+        if "sticky_token" not in params or params["sticky_token"] is None:
+            content = {"t": "lb", "lb_info": {"sticky": "sticky", "pool": "pool"}}
+            return StubResponse("for (;;);" + json.dumps(content))
+        self.pulls += 1
+        events = self._take_events()
+        self.generated_at.extend(generated_at for generated_at, _ in events)
+        content = {"t": "msg", "seq": self.pulls, "ms": [m for _, m in events]}
+        return StubResponse("for (;;);" + json.dumps(content))
+
+
+class BenchmarkClient(OfflineClient):
+    def __init__(self):
+        super().__init__()
+        self.handled_at = []
+
+    def on_event(self, event):
+        super().on_event(event)
+        self.handled_at.append(time.perf_counter())
+
+
+def percentile(values, q):
+    return values[int(q * (len(values) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Events generated per second (default: as fast as possible)",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10, help="Seconds to run (default: 10)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=50,
+        help="Max. events per pull response (default: 50)",
+    )
+    parser.add_argument(
+        "--account-rate",
+        type=float,
+        default=1,
+        help="Events per second each account receives, used to estimate how many "
+        "accounts a core can listen with (default: 1)",
+    )
+    args = parser.parse_args()
+
+    client = BenchmarkClient()
+    client.set_active_status(False)
+    session = StubSession(args.rate, args.batch_size)
+    client._state._session = session
+
+    client._do_one_listen()  # Gets the sticky token
+    rss_before = get_rss()
+    cpu_before = time.process_time()
+    started_at = time.perf_counter()
+    session.start()
+    while time.perf_counter() - started_at < args.duration:
+        client._do_one_listen()
+    elapsed = time.perf_counter() - started_at
+    cpu_time = time.process_time() - cpu_before
+    session.stop()
+    rss_after = get_rss()
+
+    handled = len(client.handled_at)
+    latencies = sorted(
+        handled_at - generated_at
+        for generated_at, handled_at in zip(session.generated_at, client.handled_at)
+    )
+    if not latencies:
+        print("No events were handled")
+        return
+    events_per_cpu_second = handled / cpu_time
+
+    print("Events handled:     {}".format(handled))
+    print("Pulls:              {}".format(session.pulls))
+    print("Events per second:  {:.0f}".format(handled / elapsed))
+    print("Latency p50:        {:.2f} ms".format(percentile(latencies, 0.5) * 1000))
+    print("Latency p99:        {:.2f} ms".format(percentile(latencies, 0.99) * 1000))
+    print("CPU time per event: {:.1f} us".format(cpu_time / handled * 1000000))
+    print(
+        "RSS:                {:.1f} MiB -> {:.1f} MiB ({:+.1f} MiB)".format(
+            rss_before / 2 ** 20,
+            rss_after / 2 ** 20,
+            (rss_after - rss_before) / 2 ** 20,
+        )
+    )
+    print(
+        "Accounts per core:  ~{:.0f}, at {:g} events per second per account".format(
+            events_per_cpu_second / args.account_rate, args.account_rate
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark the parsers, using the recorded payloads in ``payloads/``.
+
+Measures the throughput of each parser, and the memory it allocates per call, and
+compares the results to ``parsers_baseline.json``. Run from the repository root::
+
+    python benchmarks/parsers.py          # Compare to the baseline
+    python benchmarks/parsers.py --save   # Store the results as the new baseline
+    python benchmarks/parsers.py -k pull  # Only run benchmarks matching "pull"
+
+Exits with an error if a benchmark regressed by more than the tolerances.
+"""
+import argparse
+import os
+import timeit
+import tracemalloc
+
+from fbchat import _graphql, Group, Message, User
+from utils import OfflineClient, load_payload, load_baseline, save_baseline
+from utils import compare, report
+
+BASELINE = os.path.join(os.path.dirname(__file__), "parsers_baseline.json")
+# Throughput tolerances of benchmarks that vary more than the others between runs.
+# Parsing a page of read receipts allocates a lot, so its speed depends on the state
+# of the allocator, and varies by over 30%
+TOLERANCES = {"Client._parse_messages_page[read receipts]": {"calls_per_second": 0.5}}
+
+
+def get_benchmarks():
+    """Return a dictionary of benchmark names mapped to functions to measure."""
+    text = load_payload("graphql_message_text.json")
+    attachments = load_payload("graphql_message_attachments.json")
+    reply = load_payload("reply.json")
+    pull = load_payload("pull_attachments.json")
+    mixed = load_payload("pull_mixed.json")
+    thread_list = load_payload("thread_list.txt")
+
+    threads = _graphql.response_to_json(thread_list)[0]["viewer"]["message_threads"]
+    group = next(n for n in threads["nodes"] if n["thread_type"] == "GROUP")
+    user = next(n for n in threads["nodes"] if n["thread_type"] == "ONE_TO_ONE")
+
+    delta = pull["delta"]
+    metadata = delta["messageMetadata"]
+    reaction = next(
+        m for m in mixed["ms"] if m.get("delta", {}).get("class") == "ClientPayload"
+    )
+
+    # A page of 200 messages in a group where 200 people have read up to some point
+    page = {
+        "messages": {
+            "nodes": [
+                dict(text, timestamp_precise=str(1500000000000 + 1000 * i))
+                for i in range(200)
+            ]
+        },
+        "read_receipts": {
+            "nodes": [
+                {"watermark": str(1500000000000 + 1000 * i), "actor": {"id": str(i)}}
+                for i in range(200)
+            ]
+        },
+    }
+
+    client = OfflineClient()
+    # Otherwise, repeatedly parsing the same messages would skip them
+    client.set_event_deduplication(0)
+
+    return {
+        "Message._from_graphql[text]": lambda: Message._from_graphql(text),
+        "Message._from_graphql[attachments]": lambda: Message._from_graphql(
+            attachments
+        ),
+        "Message._from_reply[reply]": lambda: Message._from_reply(reply["message"]),
+        "Message._from_pull[attachments]": lambda: Message._from_pull(
+            delta,
+            mid=metadata["messageId"],
+            tags=metadata["tags"],
+            author=str(metadata["actorFbId"]),
+        ),
+        "Group._from_graphql[large group]": lambda: Group._from_graphql(group),
+        "User._from_thread_fetch": lambda: User._from_thread_fetch(user),
+        "_graphql.response_to_json[thread list]": lambda: _graphql.response_to_json(
+            thread_list
+        ),
+        "Client._parse_delta[new message]": lambda: list(client._parse_delta(pull)),
+        "Client._parse_delta[reaction]": lambda: list(client._parse_delta(reaction)),
+        "Client._parse_message[mixed pull]": lambda: client._parse_message(mixed),
+        "Client._parse_messages_page[read receipts]": lambda: (
+            client._parse_messages_page(page)
+        ),
+    }
+
+
+def measure_throughput(func, repeat=5):
+    """Return the number of calls per second, in the best of ``repeat`` runs."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return number / min(timer.repeat(repeat=repeat, number=number))
+
+
+def measure_allocations(func, repeat=3):
+    """Return the peak number of bytes allocated during a call."""
+    func()  # Warm up caches, e.g. for compiled regexes
+    peaks = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak - start)
+    return min(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", help="Only run benchmarks containing this string")
+    parser.add_argument("--save", action="store_true", help="Save as the baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative decrease in throughput (default: 0.25), except for "
+        "benchmarks known to be noisy",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    print("{:<42} {:>12} {:>14}".format("Benchmark", "Calls/s", "Peak KiB/call"))
+    for name, func in get_benchmarks().items():
+        if args.k and args.k not in name:
+            continue
+        results[name] = {
+            "calls_per_second": measure_throughput(func),
+            "peak_bytes": measure_allocations(func),
+        }
+        print(
+            "{:<42} {:>12.0f} {:>14.1f}".format(
+                name,
+                results[name]["calls_per_second"],
+                results[name]["peak_bytes"] / 1024,
+            )
+        )
+
+    if args.save:
+        save_baseline(BASELINE, dict(load_baseline(BASELINE), **results))
+        print("Saved baseline to {}".format(BASELINE))
+        return
+    # Allocations are deterministic, so they can be compared more strictly
+    tolerances = {"calls_per_second": args.tolerance, "peak_bytes": -0.1}
+    report(compare(results, load_baseline(BASELINE), tolerances, TOLERANCES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Helpers shared by the benchmarks."""
+import json
+import os
+import sys
+
+from fbchat import Client
+from fbchat._state import State
+
+PAYLOADS_DIR = os.path.join(os.path.dirname(__file__), "payloads")
+
+
+def load_payload(name):
+    """Load a payload from the corpus, parsed if it's JSON."""
+    with open(os.path.join(PAYLOADS_DIR, name), encoding="utf-8") as f:
+        if name.endswith(".json"):
+            return json.load(f)
+        return f.read()
+
+
+class OfflineClient(Client):
+    """A client that's "logged in" without sending any requests."""
+
+    def __init__(self):
+        super().__init__("email", "password", session_cookies={"c_user": "1234"})
+
+    def set_session(self, session_cookies):
+        self._state = State(user_id="1234", fb_dtsg="", revision=1)
+        self._uid = self._state.user_id
+        return True
+
+    def is_logged_in(self):
+        return True
+
+    def on_message_error(self, exception=None, msg=None):
+        # Parsing errors would make the benchmarks meaningless
+        raise exception
+
+    def on_listen_error(self, exception=None):
+        raise exception
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results, baseline, tolerances, overrides=None):
+    """Compare results to a baseline.
+
+    Args:
+        results: Dictionary of benchmark names mapped to dictionaries of metrics
+        baseline: Results to compare to
+        tolerances: Dictionary of metric names mapped to the allowed relative change.
+            A positive tolerance means higher is better, negative means lower is
+            better
+        overrides: Dictionary of benchmark names mapped to dictionaries of
+            tolerances, used instead of ``tolerances`` for those metrics
+
+    Returns:
+        list: Descriptions of the regressions
+    """
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        for metric, tolerance in tolerances.items():
+            tolerance = (overrides or {}).get(name, {}).get(metric, tolerance)
+            old = baseline.get(name, {}).get(metric)
+            new = metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (tolerance > 0 and change < -tolerance) or (
+                tolerance < 0 and change > -tolerance
+            ):
+                regressions.append(
+                    "{}: {} went from {:.6g} to {:.6g} ({:+.0%})".format(
+                        name, metric, old, new, change
+                    )
+                )
+    return regressions
+
+
+def report(regressions):
+    """Print regressions, and exit with an error if there are any."""
+    if not regressions:
+        print("No regressions.")
+        return
+    print("Regressions:")
+    for regression in regressions:
+        print("  " + regression)
+    sys.exit(1)
@@ -30,8 +30,55 @@ from ._quick_reply import (
 )
 from ._poll import Poll, PollOption
 from ._plan import GuestStatus, Plan
+from ._metrics import Histogram, RequestSample, EndpointStats, RequestMetrics
+from ._event import (
+    Event,
+    MessageEvent,
+    ColorChangeEvent,
+    EmojiChangeEvent,
+    TitleChangeEvent,
+    ImageChangeEvent,
+    NicknameChangeEvent,
+    AdminAddedEvent,
+    AdminRemovedEvent,
+    ApprovalModeChangeEvent,
+    MessageSeenEvent,
+    MessageDeliveredEvent,
+    MarkedSeenEvent,
+    MessageUnsentEvent,
+    PeopleAddedEvent,
+    PersonRemovedEvent,
+    FriendRequestEvent,
+    InboxEvent,
+    TypingEvent,
+    GamePlayedEvent,
+    ReactionAddedEvent,
+    ReactionRemovedEvent,
+    BlockEvent,
+    UnblockEvent,
+    LiveLocationEvent,
+    CallStartedEvent,
+    CallEndedEvent,
+    UserJoinedCallEvent,
+    PollCreatedEvent,
+    PollVotedEvent,
+    PlanCreatedEvent,
+    PlanEndedEvent,
+    PlanEditedEvent,
+    PlanDeletedEvent,
+    PlanParticipationEvent,
+    QprimerEvent,
+    ChatTimestampEvent,
+    BuddylistOverlayEvent,
+    UnknownEvent,
+)
 
 from ._client import Client
+from ._listener import Listener
+from ._prometheus import MetricsServer
+from ._trace import Span, Tracer, OpenTelemetryTracer
+from ._iterators import ThreadIterator, MessageIterator
+from ._thread_index import ThreadIndex
 
 __title__ = "fbchat"
 __version__ = "1.8.1"
@@ -0,0 +1,103 @@
+import attr
+import threading
+import time
+from collections import OrderedDict
+
+
+@attr.s(slots=True)
+class LRUCache:
+    """A size-bounded mapping, where entries optionally expire after ``ttl`` seconds.
+
+    When more than ``maxsize`` entries are stored, the least recently used ones are
+    evicted first. Safe to use from multiple threads.
+    """
+
+    #: The max. number of entries to keep
+    maxsize = attr.ib(1024)
+    #: Seconds before an entry expires, or ``None`` to never expire entries
+    ttl = attr.ib(None)
+    _clock = attr.ib(time.monotonic, repr=False)
+    _data = attr.ib(factory=OrderedDict, init=False, repr=False)
+    _lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key, self._clock()) is not None
+
+    def _is_expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _lookup(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if self._is_expired(entry[1], now):
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _evict(self, now):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        # Entries are ordered by use, so this won't catch every expired entry. The
+        # rest are bounded by `maxsize`, and dropped lazily when looked up.
+        while self._data:
+            key, (_, stored_at) = next(iter(self._data.items()))
+            if not self._is_expired(stored_at, now):
+                break
+            del self._data[key]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._lookup(key, self._clock())
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            now = self._clock()
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            self._evict(now)
+
+    def replace(self, key, value):
+        """Replace the value of ``key``, if it's cached, without renewing it.
+
+        Returns:
+            bool: False if ``key`` wasn't in the cache
+        """
+        with self._lock:
+            entry = self._lookup(key, self._clock())
+            if entry is None:
+                return False
+            self._data[key] = (value, entry[1])
+            return True
+
+    def add(self, key):
+        """Remember ``key``.
+
+        Returns:
+            bool: False if ``key`` was already in the cache
+        """
+        with self._lock:
+            now = self._clock()
+            if self._lookup(key, now) is not None:
+                return False
+            self._data[key] = (None, now)
+            self._evict(now)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or self._is_expired(entry[1], self._clock()):
+            return default
+        return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
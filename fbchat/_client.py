@@ -1,11 +1,19 @@
+import bisect
+import concurrent.futures
+import copy
 import datetime
+import itertools
 import time
 import json
+import queue
+import threading
+import collections
 import requests
 from collections import OrderedDict
 
 from ._core import log
-from . import _util, _graphql, _state
+from . import _util, _graphql, _state, _cache, _presence, _event, _watchdog, _trace
+from . import _iterators, _thread_index
 
 from ._exception import FBchatException, FBchatFacebookError
 from ._thread import ThreadType, ThreadLocation, ThreadColor
@@ -34,6 +42,20 @@ ACONTEXT = {
     ]
 }
 
+# Events that change a thread, see `Client._update_entity_cache`
+_THREAD_CHANGE_EVENTS = (
+    _event.ColorChangeEvent,
+    _event.EmojiChangeEvent,
+    _event.TitleChangeEvent,
+    _event.NicknameChangeEvent,
+    _event.ImageChangeEvent,
+    _event.PeopleAddedEvent,
+    _event.PersonRemovedEvent,
+    _event.AdminAddedEvent,
+    _event.AdminRemovedEvent,
+    _event.ApprovalModeChangeEvent,
+)
+
 
 class Client:
     """A client for the Facebook Chat (Messenger).
@@ -64,9 +86,24 @@ class Client:
         """
         self._sticky, self._pool = (None, None)
         self._seq = "0"
+        # Whether `listen`, `events` or a `Listener` is receiving events
+        self._listening = False
         self._pull_channel = 0
         self._mark_alive = True
-        self._buddylist = dict()
+        self._ping_interval = 60
+        self._presence = _presence.PresenceStore()
+        self._seen_events = _cache.LRUCache(maxsize=1024, ttl=10 * 60)
+        self._watchdog = _watchdog.Watchdog()
+        # Number of events received, by type. Used for metrics
+        self._event_counts = collections.Counter()
+        # Events received by `events`, but not yet consumed
+        self._event_backlog = None
+        # Threads fetched by `fetch_thread_info`, see `set_entity_cache`
+        self._entity_cache = None
+        # Threads indexed by `create_thread_index`, updated while listening
+        self._thread_index = None
+        # Tracer of the public methods, see `set_tracer`
+        self._tracer = None
 
         # If session cookies aren't set, not properly loaded or gives us an invalid session, then do the login
         if (
@@ -80,8 +117,8 @@ class Client:
     INTERNAL REQUEST METHODS
     """
 
-    def _get(self, url, params):
-        return self._state._get(url, params)
+    def _get(self, url, params, timeout=None):
+        return self._state._get(url, params, timeout=timeout)
 
     def _post(self, url, params, files=None):
         return self._state._post(url, params, files=files)
@@ -89,6 +126,7 @@ class Client:
     def _payload_post(self, url, data, files=None):
         return self._state._payload_post(url, data, files=files)
 
+    @_trace.traced
     def graphql_requests(self, *queries):
         """Execute GraphQL queries.
 
@@ -103,6 +141,7 @@ class Client:
         """
         return tuple(self._state._graphql_requests(*queries))
 
+    @_trace.traced
     def graphql_request(self, query):
         """Shorthand for ``graphql_requests(query)[0]``.
 
@@ -111,6 +150,65 @@ class Client:
         """
         return self.graphql_requests(query)[0]
 
+    def add_request_callback(self, callback):
+        """Call a function after each request sent to Facebook.
+
+        Useful for e.g. exporting metrics, or logging slow requests.
+
+        Args:
+            callback: Function called with a `RequestSample` describing the request,
+                in the thread that sent it. Exceptions it raises are logged
+        """
+        self._state._request_callbacks.append(callback)
+
+    def remove_request_callback(self, callback):
+        """Stop calling a function added with `add_request_callback`.
+
+        Args:
+            callback: The function to remove
+        """
+        self._state._request_callbacks.remove(callback)
+
+    def set_tracer(self, tracer):
+        """Trace calls to the client's methods, and the requests they send.
+
+        Args:
+            tracer (Tracer): The tracer to use, or ``None`` to disable tracing
+        """
+        self._tracer = tracer
+
+    def set_payload_logging(self, sample_rate=1, max_size=4096, endpoints=None):
+        """Configure how responses from Facebook are logged, at the ``DEBUG`` level.
+
+        Use this to keep debug logging affordable in production, e.g. only logging
+        the start of every 100th response from ``/pull``.
+
+        Args:
+            sample_rate (int): Log one in every ``sample_rate`` responses from each
+                endpoint
+            max_size (int): The max. number of characters of a response to log
+            endpoints: Paths of the endpoints to log responses from, e.g.
+                ``["/pull", "/api/graphqlbatch/"]``. ``None`` logs all endpoints
+
+        Raises:
+            ValueError: If ``sample_rate`` is less than 1
+        """
+        if sample_rate < 1:
+            raise ValueError("`sample_rate` should be at least 1")
+        logger = self._state._payload_logger
+        logger.sample_rate = sample_rate
+        logger.max_size = max_size
+        logger.endpoints = None if endpoints is None else set(endpoints)
+
+    def get_request_metrics(self):
+        """Get statistics of the requests sent to Facebook, by endpoint.
+
+        Returns:
+            RequestMetrics: Latency, sizes, status codes and Facebook error codes of
+            the requests sent
+        """
+        return self._state._request_metrics
+
     """
     END INTERNAL REQUEST METHODS
     """
@@ -119,6 +217,7 @@ class Client:
     LOGIN METHODS
     """
 
+    @_trace.traced
     def is_logged_in(self):
         """Send a request to Facebook to check the login status.
 
@@ -135,6 +234,7 @@ class Client:
         """
         return self._state.get_cookies()
 
+    @_trace.traced
     def set_session(self, session_cookies):
         """Load session cookies.
 
@@ -153,6 +253,7 @@ class Client:
             return False
         return True
 
+    @_trace.traced
     def login(self, email, password):
         """Login the user, using ``email`` and ``password``.
 
@@ -176,6 +277,7 @@ class Client:
         self._uid = self._state.user_id
         self.on_logged_in(email=email)
 
+    @_trace.traced
     def logout(self):
         """Safely log out the client.
 
@@ -196,11 +298,95 @@ class Client:
     FETCH METHODS
     """
 
-    def _forced_fetch(self, thread_id, mid):
+    def _forced_fetch_query(self, thread_id, mid):
         params = {"thread_and_message_id": {"thread_id": thread_id, "message_id": mid}}
-        j, = self.graphql_requests(_graphql.from_doc_id("1768656253222505", params))
+        return _graphql.from_doc_id("1768656253222505", params)
+
+    def _forced_fetch(self, thread_id, mid):
+        j, = self.graphql_requests(self._forced_fetch_query(thread_id, mid))
         return j
 
+    def iter_threads(self, thread_location, before=None, after=None, cursor=None):
+        """Iterate over threads in ``thread_location``, from newest to oldest.
+
+        Threads are fetched lazily, 20 at a time, and the next page is fetched in the
+        background while the current one is consumed.
+
+        Example:
+            Process an inbox in batches, resuming where the last batch stopped::
+
+                threads = client.iter_threads(ThreadLocation.INBOX, cursor=cursor)
+                for thread in itertools.islice(threads, 100):
+                    process(thread)
+                cursor = threads.cursor
+
+        Args:
+            thread_location (ThreadLocation): INBOX, PENDING, ARCHIVED or OTHER
+            before (datetime.datetime): Iterate only over threads before this (default
+                all threads). Must be timezone-aware!
+            after (datetime.datetime): Iterate only over threads after this (default
+                all threads). Must be timezone-aware!
+            cursor (str): ``cursor`` of a previous iterator, to resume after the last
+                thread it returned. Overrides ``before``
+
+        Returns:
+            ThreadIterator: Iterator over :class:`Thread` objects
+
+        Raises:
+            FBchatException: If request failed
+        """
+        return _iterators.ThreadIterator(
+            self, thread_location, before=before, after=after, cursor=cursor
+        )
+
+    @_trace.traced
+    def create_thread_index(self, thread_locations=(ThreadLocation.INBOX,)):
+        """Fetch the threads in ``thread_locations``, and keep them indexed in memory.
+
+        While listening, the index is kept up to date with the events received, so
+        e.g. the most recent or unread threads can be found without sending any
+        requests. Listening resumes from the snapshot, so no changes made after it
+        are missed.
+
+        Example:
+            Show the unread threads, while listening::
+
+                index = client.create_thread_index()
+                listener = threading.Thread(target=client.listen)
+                listener.start()
+                ...
+                for thread in index.unread(limit=10):
+                    print(thread.name)
+
+        Args:
+            thread_locations: `ThreadLocation` values to fetch the threads of
+
+        Returns:
+            ThreadIndex: The index
+
+        Raises:
+            ValueError: If the client is listening, since the events received while
+                fetching the snapshot would be missed
+            FBchatException: If request failed
+        """
+        if self._listening:
+            raise ValueError("Can't create a thread index while listening")
+        index = _thread_index.ThreadIndex(self._uid)
+        sequence_id = None
+        for thread_location in thread_locations:
+            snapshot = _thread_index._SnapshotIterator(self, thread_location)
+            for thread in snapshot:
+                index._add(thread, thread_location, thread.uid in snapshot.unread)
+            # The earliest snapshot is where events have to be pulled from
+            if sequence_id is None:
+                sequence_id = snapshot.sequence_id
+
+        if sequence_id is not None:
+            self._seq = str(sequence_id)
+        self._thread_index = index
+        return index
+
+    @_trace.traced
     def fetch_threads(self, thread_location, before=None, after=None, limit=None):
         """Fetch all threads in ``thread_location``.
 
@@ -220,50 +406,59 @@ class Client:
         Raises:
             FBchatException: If request failed
         """
-        threads = []
-
-        last_thread_dt = None
-        while True:
-            # break if limit is exceeded
-            if limit and len(threads) >= limit:
-                break
-
-            # fetch_thread_list returns at max 20 threads before last_thread_dt (included)
-            candidates = self.fetch_thread_list(
-                before=last_thread_dt, thread_location=thread_location
-            )
-
-            if len(candidates) > 1:
-                threads += candidates[1:]
-            else:  # End of threads
-                break
+        threads = _iterators.ThreadIterator(
+            self, thread_location, before=before, after=after, prefetch=not limit
+        )
+        return list(itertools.islice(threads, limit or None))
 
-            last_thread_dt = threads[-1].last_active
+    def iter_users_from_threads(self, threads, batch_size=50, executor=None):
+        """Iterate over all users involved in given threads, fetching them in batches.
 
-            # FB returns a sorted list of threads
-            if (before is not None and last_thread_dt > before) or (
-                after is not None and last_thread_dt < after
-            ):
-                break
+        Users are yielded as soon as their batch has been fetched.
 
-        # Return only threads between before and after (if set)
-        if before is not None or after is not None:
-            for t in threads:
-                if (before is not None and t.last_active > before) or (
-                    after is not None and t.last_active < after
-                ):
-                    threads.remove(t)
-
-        if limit and len(threads) > limit:
-            return threads[:limit]
+        Args:
+            threads: Thread: List of threads to check for users
+            batch_size (int): Max. number of users to fetch per request
+            executor (concurrent.futures.Executor): If set, used to fetch the batches
+                in parallel
 
-        return threads
+        Returns:
+            Iterator over :class:`User` objects
 
-    def fetch_all_users_from_threads(self, threads):
+        Raises:
+            FBchatException: If request failed
+        """
+        users = OrderedDict()
+        participants = OrderedDict()
+        for thread in threads:
+            if thread.type == ThreadType.USER:
+                users.setdefault(thread.uid, thread)
+            elif thread.type == ThreadType.GROUP:
+                participants.update(dict.fromkeys(thread.participants))
+        for user in users.values():
+            yield user
+
+        user_ids = [user_id for user_id in participants if user_id not in users]
+        batches = _util.chunks(user_ids, batch_size)
+        if executor is None:
+            results = (self.fetch_user_info(*batch) for batch in batches)
+        else:
+            fetch = _trace.propagate(self.fetch_user_info)
+            futures = [executor.submit(fetch, *batch) for batch in batches]
+            results = (f.result() for f in concurrent.futures.as_completed(futures))
+        for fetched in results:
+            for user in fetched.values():
+                yield user
+
+    @_trace.traced
+    def fetch_all_users_from_threads(self, threads, batch_size=50, executor=None):
         """Fetch all users involved in given threads.
 
         Args:
             threads: Thread: List of threads to check for users
+            batch_size (int): Max. number of users to fetch per request
+            executor (concurrent.futures.Executor): If set, used to fetch the batches
+                in parallel
 
         Returns:
             list: :class:`User` objects
@@ -271,23 +466,13 @@ class Client:
         Raises:
             FBchatException: If request failed
         """
-        users = []
-        users_to_fetch = []  # It's more efficient to fetch all users in one request
-        for thread in threads:
-            if thread.type == ThreadType.USER:
-                if thread.uid not in [user.uid for user in users]:
-                    users.append(thread)
-            elif thread.type == ThreadType.GROUP:
-                for user_id in thread.participants:
-                    if (
-                        user_id not in [user.uid for user in users]
-                        and user_id not in users_to_fetch
-                    ):
-                        users_to_fetch.append(user_id)
-        for user_id, user in self.fetch_user_info(*users_to_fetch).items():
-            users.append(user)
-        return users
+        return list(
+            self.iter_users_from_threads(
+                threads, batch_size=batch_size, executor=executor
+            )
+        )
 
+    @_trace.traced
     def fetch_all_users(self):
         """Fetch all users the client is currently chatting with.
 
@@ -309,6 +494,7 @@ class Client:
                 users.append(User._from_all_fetch(data))
         return users
 
+    @_trace.traced
     def search_for_users(self, name, limit=10):
         """Find and get users by their name.
 
@@ -327,6 +513,7 @@ class Client:
 
         return [User._from_graphql(node) for node in j[name]["users"]["nodes"]]
 
+    @_trace.traced
     def search_for_pages(self, name, limit=10):
         """Find and get pages by their name.
 
@@ -344,6 +531,7 @@ class Client:
 
         return [Page._from_graphql(node) for node in j[name]["pages"]["nodes"]]
 
+    @_trace.traced
     def search_for_groups(self, name, limit=10):
         """Find and get group threads by their name.
 
@@ -362,6 +550,7 @@ class Client:
 
         return [Group._from_graphql(node) for node in j["viewer"]["groups"]["nodes"]]
 
+    @_trace.traced
     def search_for_threads(self, name, limit=10):
         """Find and get threads by their name.
 
@@ -397,6 +586,7 @@ class Client:
 
         return rtn
 
+    @_trace.traced
     def search_for_message_ids(self, query, offset=0, limit=5, thread_id=None):
         """Find and get message IDs by query.
 
@@ -426,20 +616,25 @@ class Client:
         for snippet in snippets:
             yield snippet["message_id"]
 
-    def search_for_messages(self, query, offset=0, limit=5, thread_id=None):
+    @_trace.traced
+    def search_for_messages(
+        self, query, offset=0, limit=5, thread_id=None, batch_size=50
+    ):
         """Find and get `Message` objects by query.
 
-        Warning:
-            This method sends request for every found message ID.
+        The found messages are fetched ``batch_size`` at a time, and the next batch
+        is fetched while the current one is consumed.
 
         Args:
             query: Text to search for
             offset (int): Number of messages to skip
             limit (int): Max. number of messages to retrieve
             thread_id: User/Group ID to search in. See :ref:`intro_threads`
+            batch_size (int): Max. number of messages to fetch in one request
 
         Returns:
-            typing.Iterable: Found :class:`Message` objects
+            typing.Iterable: Found :class:`Message` objects, in the order they were
+            found
 
         Raises:
             FBchatException: If request failed
@@ -447,9 +642,23 @@ class Client:
         message_ids = self.search_for_message_ids(
             query, offset=offset, limit=limit, thread_id=thread_id
         )
-        for mid in message_ids:
-            yield self.fetch_message_info(mid, thread_id)
-
+        batches = _util.chunks(message_ids, batch_size)
+        pending = _iterators._Prefetcher(
+            lambda i: self.graphql_requests(
+                *[self._forced_fetch_query(thread_id, mid) for mid in batches[i]]
+            )
+        )
+        try:
+            for i in range(len(batches)):
+                j = pending.get(i)
+                if i + 1 < len(batches):
+                    pending.prefetch(i + 1)
+                for message_info in j:
+                    yield Message._from_graphql(message_info.get("message"))
+        finally:
+            pending.close()
+
+    @_trace.traced
     def search(self, query, fetch_messages=False, thread_limit=5, message_limit=5):
         """Search for messages in all threads.
 
@@ -519,6 +728,7 @@ class Client:
         log.debug(entries)
         return entries
 
+    @_trace.traced
     def fetch_user_info(self, *user_ids):
         """Fetch users' info from IDs, unordered.
 
@@ -544,6 +754,7 @@ class Client:
 
         return users
 
+    @_trace.traced
     def fetch_page_info(self, *page_ids):
         """Fetch pages' info from IDs, unordered.
 
@@ -569,6 +780,7 @@ class Client:
 
         return pages
 
+    @_trace.traced
     def fetch_group_info(self, *group_ids):
         """Fetch groups' info from IDs, unordered.
 
@@ -591,14 +803,21 @@ class Client:
 
         return groups
 
-    def fetch_thread_info(self, *thread_ids):
+    @_trace.traced
+    def fetch_thread_info(self, *thread_ids, batch_size=50, executor=None):
         """Fetch threads' info from IDs, unordered.
 
         Warning:
             Sends two requests if users or pages are present, to fetch all available info!
 
+        The threads are fetched in batches of ``batch_size``. While the users and pages
+        of a batch are fetched, the next batch is fetched in the background.
+
         Args:
             thread_ids: One or more thread ID(s) to query
+            batch_size (int): Max. number of threads to query per request
+            executor (concurrent.futures.Executor): If set, used to fetch the batches
+                in parallel
 
         Returns:
             dict: :class:`Thread` objects, labeled by their ID
@@ -606,6 +825,51 @@ class Client:
         Raises:
             FBchatException: If request failed
         """
+        rtn = {}
+        cache = self._entity_cache
+        if cache is not None:
+            missing = []
+            for thread_id in thread_ids:
+                thread = cache.get(str(thread_id))
+                if thread is None:
+                    missing.append(thread_id)
+                else:
+                    # Copied, so callers can't change the cached threads, and the
+                    # threads they get don't change while listening
+                    rtn[str(thread_id)] = copy.deepcopy(thread)
+            thread_ids = missing
+
+        batches = _util.chunks(thread_ids, batch_size)
+        fetched = {}
+        if executor is not None:
+            fetch = _trace.propagate(self._fetch_thread_info_batch)
+            for threads in executor.map(fetch, batches):
+                fetched.update(threads)
+        else:
+            # Fetch the users and pages of a batch while the next batch is fetched
+            pending = _iterators._Prefetcher(
+                lambda i: self._fetch_thread_info_graphql(batches[i])
+            )
+            try:
+                for i, batch in enumerate(batches):
+                    j = pending.get(i)
+                    if i + 1 < len(batches):
+                        pending.prefetch(i + 1)
+                    fetched.update(self._fetch_thread_info_users(batch, j))
+            finally:
+                pending.close()
+
+        if cache is not None:
+            for thread_id, thread in fetched.items():
+                cache.set(thread_id, copy.deepcopy(thread))
+        rtn.update(fetched)
+        return rtn
+
+    def _fetch_thread_info_batch(self, thread_ids):
+        j = self._fetch_thread_info_graphql(thread_ids)
+        return self._fetch_thread_info_users(thread_ids, j)
+
+    def _fetch_thread_info_graphql(self, thread_ids):
         queries = []
         for thread_id in thread_ids:
             params = {
@@ -626,7 +890,9 @@ class Client:
                     "thread_key": {"other_user_id": thread_ids[i]},
                     "thread_type": "ONE_TO_ONE",
                 }
+        return j
 
+    def _fetch_thread_info_users(self, thread_ids, j):
         pages_and_user_ids = [
             k["message_thread"]["thread_key"]["other_user_id"]
             for k in j
@@ -637,34 +903,40 @@ class Client:
             pages_and_users = self._fetch_info(*pages_and_user_ids)
 
         rtn = {}
-        for i, entry in enumerate(j):
-            entry = entry["message_thread"]
-            if entry.get("thread_type") == "GROUP":
-                _id = entry["thread_key"]["thread_fbid"]
-                rtn[_id] = Group._from_graphql(entry)
-            elif entry.get("thread_type") == "ONE_TO_ONE":
-                _id = entry["thread_key"]["other_user_id"]
-                if pages_and_users.get(_id) is None:
-                    raise FBchatException("Could not fetch thread {}".format(_id))
-                entry.update(pages_and_users[_id])
-                if entry["type"] == ThreadType.USER:
-                    rtn[_id] = User._from_graphql(entry)
+        with _trace.span("parse threads", count=len(j)):
+            for i, entry in enumerate(j):
+                entry = entry["message_thread"]
+                if entry.get("thread_type") == "GROUP":
+                    _id = entry["thread_key"]["thread_fbid"]
+                    rtn[_id] = Group._from_graphql(entry)
+                elif entry.get("thread_type") == "ONE_TO_ONE":
+                    _id = entry["thread_key"]["other_user_id"]
+                    if pages_and_users.get(_id) is None:
+                        raise FBchatException("Could not fetch thread {}".format(_id))
+                    entry.update(pages_and_users[_id])
+                    if entry["type"] == ThreadType.USER:
+                        rtn[_id] = User._from_graphql(entry)
+                    else:
+                        rtn[_id] = Page._from_graphql(entry)
                 else:
-                    rtn[_id] = Page._from_graphql(entry)
-            else:
-                raise FBchatException(
-                    "{} had an unknown thread type: {}".format(thread_ids[i], entry)
-                )
+                    raise FBchatException(
+                        "{} had an unknown thread type: {}".format(thread_ids[i], entry)
+                    )
 
         return rtn
 
-    def fetch_thread_messages(self, thread_id=None, limit=20, before=None):
+    @_trace.traced
+    def fetch_thread_messages(
+        self, thread_id=None, limit=20, before=None, load_read_receipts=True
+    ):
         """Fetch messages in a thread, ordered by most recent.
 
         Args:
             thread_id: User/Group ID to get messages from. See :ref:`intro_threads`
             limit (int): Max. number of messages to retrieve
             before (datetime.datetime): The point from which to retrieve messages
+            load_read_receipts (bool): Whether to fetch who has read the messages, see
+                `Message.read_by`
 
         Returns:
             list: :class:`Message` objects
@@ -672,36 +944,155 @@ class Client:
         Raises:
             FBchatException: If request failed
         """
+        before = _util.datetime_to_millis(before) if before else None
+        thread = self._fetch_messages_page(thread_id, limit, before, load_read_receipts)
+        return self._parse_messages_page(thread)
+
+    def _messages_query(self, thread_id, limit, before, load_read_receipts=True):
         params = {
             "id": thread_id,
             "message_limit": limit,
             "load_messages": True,
-            "load_read_receipts": True,
-            "before": _util.datetime_to_millis(before) if before else None,
+            "load_read_receipts": load_read_receipts,
+            "before": before,
         }
-        j, = self.graphql_requests(_graphql.from_doc_id("1860982147341344", params))
+        return _graphql.from_doc_id("1860982147341344", params)
+
+    def _fetch_messages_page(self, thread_id, limit, before, load_read_receipts=True):
+        query = self._messages_query(thread_id, limit, before, load_read_receipts)
+        j, = self.graphql_requests(query)
 
         if j.get("message_thread") is None:
             raise FBchatException("Could not fetch thread {}: {}".format(thread_id, j))
+        return j["message_thread"]
+
+    def _parse_messages_page(self, thread):
+        nodes = thread["messages"]["nodes"]
+        messages = [Message._from_graphql(message) for message in nodes]
+
+        # Missing if not loaded. A message is read by everyone whose watermark is at
+        # or after the time it was sent
+        read_receipts = (thread.get("read_receipts") or {}).get("nodes")
+        if read_receipts:
+            receipts = sorted(
+                (int(receipt["watermark"]), receipt["actor"]["id"])
+                for receipt in read_receipts
+            )
+            watermarks = [watermark for watermark, _ in receipts]
+            for node, message in zip(nodes, messages):
+                index = bisect.bisect_left(watermarks, int(node["timestamp_precise"]))
+                message.read_by.extend(actor for _, actor in receipts[index:])
 
-        messages = [
-            Message._from_graphql(message)
-            for message in j["message_thread"]["messages"]["nodes"]
-        ]
         messages.reverse()
+        return messages
 
-        read_receipts = j["message_thread"]["read_receipts"]["nodes"]
+    def iter_thread_messages(
+        self, thread_id, before=None, page_size=100, load_read_receipts=True
+    ):
+        """Iterate over all messages in a thread, from newest to oldest.
 
-        for message in messages:
-            for receipt in read_receipts:
-                if (
-                    _util.millis_to_datetime(int(receipt["watermark"]))
-                    >= message.created_at
-                ):
-                    message.read_by.append(receipt["actor"]["id"])
+        Messages are fetched lazily, ``page_size`` at a time, and the next page is
+        fetched in the background while the current one is parsed and consumed.
 
-        return messages
+        Args:
+            thread_id: User/Group ID to get messages from. See :ref:`intro_threads`
+            before (datetime.datetime): The point from which to retrieve messages
+            page_size (int): Number of messages to fetch per request
+            load_read_receipts (bool): Whether to fetch who has read the messages, see
+                `Message.read_by`
+
+        Returns:
+            MessageIterator: Iterator over :class:`Message` objects
+
+        Raises:
+            FBchatException: If request failed
+        """
+        return _iterators.MessageIterator(
+            self,
+            thread_id,
+            before=before,
+            page_size=page_size,
+            load_read_receipts=load_read_receipts,
+        )
+
+    @_trace.traced
+    def fetch_messages_for_threads(
+        self,
+        thread_ids,
+        limit=20,
+        batch_size=50,
+        executor=None,
+        load_read_receipts=True,
+    ):
+        """Fetch the latest messages of multiple threads.
 
+        The threads are queried in batches of ``batch_size`` per request, instead of
+        sending a request per thread. A thread that could not be fetched doesn't fail
+        the other threads; instead, its error is returned.
+
+        Example:
+            Fetch the latest messages of 200 threads, sending 4 requests in parallel::
+
+                with concurrent.futures.ThreadPoolExecutor(4) as executor:
+                    messages, errors = client.fetch_messages_for_threads(
+                        thread_ids, executor=executor
+                    )
+
+        Args:
+            thread_ids: User/Group IDs to get messages from. See :ref:`intro_threads`
+            limit (int): Max. number of messages to retrieve per thread
+            batch_size (int): Max. number of threads to query per request
+            executor (concurrent.futures.Executor): If set, used to send the requests
+                in parallel
+            load_read_receipts (bool): Whether to fetch who has read the messages, see
+                `Message.read_by`
+
+        Returns:
+            tuple: A dictionary of lists of :class:`Message` objects, ordered by most
+            recent, and a dictionary of the errors of the threads that could not be
+            fetched, e.g. `FBchatException` or ``requests.Timeout`` objects. Both
+            labeled by thread ID
+        """
+        thread_ids = list(OrderedDict.fromkeys(str(id_) for id_ in thread_ids))
+        batches = _util.chunks(thread_ids, batch_size)
+        map_ = executor.map if executor else map
+        results = map_(
+            _trace.propagate(self._fetch_messages_batch),
+            batches,
+            [limit] * len(batches),
+            [load_read_receipts] * len(batches),
+        )
+
+        messages, errors = {}, {}
+        for batch_messages, batch_errors in results:
+            messages.update(batch_messages)
+            errors.update(batch_errors)
+        return messages, errors
+
+    def _fetch_messages_batch(self, thread_ids, limit, load_read_receipts):
+        queries = [
+            self._messages_query(thread_id, limit, None, load_read_receipts)
+            for thread_id in thread_ids
+        ]
+        try:
+            j = self._state._graphql_requests(*queries, return_errors=True)
+        except (FBchatException, requests.RequestException) as e:
+            # Only fail the threads of this batch
+            return {}, {thread_id: e for thread_id in thread_ids}
+
+        messages, errors = {}, {}
+        for thread_id, entry in zip(thread_ids, j):
+            if isinstance(entry, FBchatException):
+                errors[thread_id] = entry
+            elif entry.get("message_thread") is None:
+                errors[thread_id] = FBchatException(
+                    "Could not fetch thread {}: {}".format(thread_id, entry)
+                )
+            else:
+                messages[thread_id] = self._parse_messages_page(entry["message_thread"])
+        return messages, errors
+
+    @_trace.traced
     def fetch_thread_list(
         self, limit=20, thread_location=ThreadLocation.INBOX, before=None
     ):
@@ -721,33 +1112,39 @@ class Client:
         if limit > 20 or limit < 1:
             raise ValueError("`limit` should be between 1 and 20")
 
-        if thread_location in ThreadLocation:
-            loc_str = thread_location.value
-        else:
+        if thread_location not in ThreadLocation:
             raise TypeError('"thread_location" must be a value of ThreadLocation')
 
+        j = self._fetch_thread_list(limit, thread_location, before)
+        return self._parse_thread_list(j["nodes"])
+
+    def _fetch_thread_list(self, limit, thread_location, before, include_seq_id=False):
         params = {
             "limit": limit,
-            "tags": [loc_str],
+            "tags": [thread_location.value],
             "before": _util.datetime_to_millis(before) if before else None,
             "includeDeliveryReceipts": True,
-            "includeSeqID": False,
+            "includeSeqID": include_seq_id,
         }
         j, = self.graphql_requests(_graphql.from_doc_id("1349387578499440", params))
+        return j["viewer"]["message_threads"]
 
+    def _parse_thread_list(self, nodes):
         rtn = []
-        for node in j["viewer"]["message_threads"]["nodes"]:
-            _type = node.get("thread_type")
-            if _type == "GROUP":
-                rtn.append(Group._from_graphql(node))
-            elif _type == "ONE_TO_ONE":
-                rtn.append(User._from_thread_fetch(node))
-            else:
-                raise FBchatException(
-                    "Unknown thread type: {}, with data: {}".format(_type, node)
-                )
+        with _trace.span("parse threads", count=len(nodes)):
+            for node in nodes:
+                _type = node.get("thread_type")
+                if _type == "GROUP":
+                    rtn.append(Group._from_graphql(node))
+                elif _type == "ONE_TO_ONE":
+                    rtn.append(User._from_thread_fetch(node))
+                else:
+                    raise FBchatException(
+                        "Unknown thread type: {}, with data: {}".format(_type, node)
+                    )
         return rtn
 
+    @_trace.traced
     def fetch_unread(self):
         """Fetch unread threads.
 
@@ -768,6 +1165,7 @@ class Client:
         result = j["unread_thread_fbids"][0]
         return result["thread_fbids"] + result["other_user_fbids"]
 
+    @_trace.traced
     def fetch_unseen(self):
         """Fetch unseen / new threads.
 
@@ -782,6 +1180,7 @@ class Client:
         result = j["unseen_thread_fbids"][0]
         return result["thread_fbids"] + result["other_user_fbids"]
 
+    @_trace.traced
     def fetch_image_url(self, image_id):
         """Fetch URL to download the original image from an image attachment ID.
 
@@ -804,6 +1203,7 @@ class Client:
             raise FBchatException("Could not fetch image URL from: {}".format(j))
         return url
 
+    @_trace.traced
     def fetch_message_info(self, mid, thread_id=None):
         """Fetch `Message` object from the given message id.
 
@@ -820,6 +1220,7 @@ class Client:
         message_info = self._forced_fetch(thread_id, mid).get("message")
         return Message._from_graphql(message_info)
 
+    @_trace.traced
     def fetch_poll_options(self, poll_id):
         """Fetch list of `PollOption` objects from the poll id.
 
@@ -836,6 +1237,7 @@ class Client:
         j = self._payload_post("/ajax/mercury/get_poll_options", data)
         return [PollOption._from_graphql(m) for m in j]
 
+    @_trace.traced
     def fetch_plan_info(self, plan_id):
         """Fetch `Plan` object from the plan id.
 
@@ -856,6 +1258,7 @@ class Client:
         j, = self.graphql_requests(_graphql.from_doc_id("1868889766468115", {}))
         return j["viewer"]
 
+    @_trace.traced
     def get_phone_numbers(self):
         """Fetch list of user's phone numbers.
 
@@ -867,6 +1270,7 @@ class Client:
             j["phone_number"]["universal_number"] for j in data["user"]["all_phones"]
         ]
 
+    @_trace.traced
     def get_emails(self):
         """Fetch list of user's emails.
 
@@ -890,8 +1294,40 @@ class Client:
         Returns:
             ActiveStatus: Given user active status
         """
-        return self._buddylist.get(str(user_id))
+        return self._presence.get(user_id)
+
+    def get_users_active_status(self, *user_ids):
+        """Fetch multiple friends' active status as `ActiveStatus` objects.
+
+        Users whose status isn't known are left out.
 
+        Warning:
+            Only works when listening.
+
+        Args:
+            user_ids: One or more user ID(s) to query
+
+        Returns:
+            dict: :class:`ActiveStatus` objects, labeled by their user ID
+        """
+        return self._presence.get_many(user_ids)
+
+    def get_active_users(self, since):
+        """Fetch the IDs of friends who have been active since ``since``.
+
+        Warning:
+            Only works when listening.
+
+        Args:
+            since (datetime.datetime): The point from which users should have been
+                active. Must be timezone-aware!
+
+        Returns:
+            list: User IDs
+        """
+        return self._presence.active_since(_util.datetime_to_millis(since))
+
+    @_trace.traced
     def fetch_thread_images(self, thread_id=None):
         """Fetch images posted in thread.
 
@@ -948,6 +1384,7 @@ class Client:
         else:
             return mid
 
+    @_trace.traced
     def send(self, message, thread_id=None, thread_type=ThreadType.USER):
         """Send message to a thread.
 
@@ -967,6 +1404,7 @@ class Client:
         data.update(message._to_send_data())
         return self._do_send_request(data)
 
+    @_trace.traced
     def wave(self, wave_first=True, thread_id=None, thread_type=None):
         """Wave hello to a thread.
 
@@ -992,6 +1430,7 @@ class Client:
             data["specific_to_list[0]"] = "fbid:{}".format(thread_id)
         return self._do_send_request(data)
 
+    @_trace.traced
     def quick_reply(self, quick_reply, payload=None, thread_id=None, thread_type=None):
         """Reply to chosen quick reply.
 
@@ -1033,6 +1472,7 @@ class Client:
             quick_reply.payload = payload
             return self.send(Message(text=payload, quick_replies=[quick_reply]))
 
+    @_trace.traced
     def unsend(self, mid):
         """Unsend message by it's ID (removes it for everyone).
 
@@ -1055,6 +1495,7 @@ class Client:
         data["location_attachment[is_current_location]"] = current
         return self._do_send_request(data)
 
+    @_trace.traced
     def send_location(self, location, message=None, thread_id=None, thread_type=None):
         """Send a given location to a thread as the user's current location.
 
@@ -1078,6 +1519,7 @@ class Client:
             thread_type=thread_type,
         )
 
+    @_trace.traced
     def send_pinned_location(
         self, location, message=None, thread_id=None, thread_type=None
     ):
@@ -1124,6 +1566,7 @@ class Client:
 
         return self._do_send_request(data)
 
+    @_trace.traced
     def send_remote_files(
         self, file_urls, message=None, thread_id=None, thread_type=ThreadType.USER
     ):
@@ -1147,6 +1590,7 @@ class Client:
             files=files, message=message, thread_id=thread_id, thread_type=thread_type
         )
 
+    @_trace.traced
     def send_local_files(
         self, file_paths, message=None, thread_id=None, thread_type=ThreadType.USER
     ):
@@ -1171,6 +1615,7 @@ class Client:
             files=files, message=message, thread_id=thread_id, thread_type=thread_type
         )
 
+    @_trace.traced
     def send_remote_voice_clips(
         self, clip_urls, message=None, thread_id=None, thread_type=ThreadType.USER
     ):
@@ -1194,6 +1639,7 @@ class Client:
             files=files, message=message, thread_id=thread_id, thread_type=thread_type
         )
 
+    @_trace.traced
     def send_local_voice_clips(
         self, clip_paths, message=None, thread_id=None, thread_type=ThreadType.USER
     ):
@@ -1218,6 +1664,7 @@ class Client:
             files=files, message=message, thread_id=thread_id, thread_type=thread_type
         )
 
+    @_trace.traced
     def forward_attachment(self, attachment_id, thread_id=None):
         """Forward an attachment.
 
@@ -1241,6 +1688,7 @@ class Client:
                 fb_error_message=j["error"],
             )
 
+    @_trace.traced
     def create_group(self, message, user_ids):
         """Create a group with the given user ids.
 
@@ -1269,6 +1717,7 @@ class Client:
             )
         return thread_id
 
+    @_trace.traced
     def add_users_to_group(self, user_ids, thread_id=None):
         """Add users to a group.
 
@@ -1298,6 +1747,7 @@ class Client:
 
         return self._do_send_request(data)
 
+    @_trace.traced
     def remove_user_from_group(self, user_id, thread_id=None):
         """Remove user from a group.
 
@@ -1321,6 +1771,7 @@ class Client:
 
         j = self._payload_post("/messaging/save_admins/?dpr=1", data)
 
+    @_trace.traced
     def add_group_admins(self, admin_ids, thread_id=None):
         """Set specified users as group admins.
 
@@ -1333,6 +1784,7 @@ class Client:
         """
         self._admin_status(admin_ids, True, thread_id)
 
+    @_trace.traced
     def remove_group_admins(self, admin_ids, thread_id=None):
         """Remove admin status from specified users.
 
@@ -1345,6 +1797,7 @@ class Client:
         """
         self._admin_status(admin_ids, False, thread_id)
 
+    @_trace.traced
     def change_group_approval_mode(self, require_admin_approval, thread_id=None):
         """Change group's approval mode.
 
@@ -1373,6 +1826,7 @@ class Client:
             _graphql.from_doc_id("1574519202665847", {"data": data})
         )
 
+    @_trace.traced
     def accept_users_to_group(self, user_ids, thread_id=None):
         """Accept users to the group from the group's approval.
 
@@ -1385,6 +1839,7 @@ class Client:
         """
         self._users_approval(user_ids, True, thread_id)
 
+    @_trace.traced
     def deny_users_from_group(self, user_ids, thread_id=None):
         """Deny users from joining the group.
 
@@ -1412,6 +1867,7 @@ class Client:
         j = self._payload_post("/messaging/set_thread_image/?dpr=1", data)
         return image_id
 
+    @_trace.traced
     def change_group_image_remote(self, image_url, thread_id=None):
         """Change a thread image from a URL.
 
@@ -1425,6 +1881,7 @@ class Client:
         (image_id, mimetype), = self._upload(_util.get_files_from_urls([image_url]))
         return self._change_group_image(image_id, thread_id)
 
+    @_trace.traced
     def change_group_image_local(self, image_path, thread_id=None):
         """Change a thread image from a local path.
 
@@ -1440,6 +1897,7 @@ class Client:
 
         return self._change_group_image(image_id, thread_id)
 
+    @_trace.traced
     def change_thread_title(self, title, thread_id=None, thread_type=ThreadType.USER):
         """Change title of a thread.
 
@@ -1463,6 +1921,7 @@ class Client:
         data = {"thread_name": title, "thread_id": thread_id}
         j = self._payload_post("/messaging/set_thread_name/?dpr=1", data)
 
+    @_trace.traced
     def change_nickname(
         self, nickname, user_id, thread_id=None, thread_type=ThreadType.USER
     ):
@@ -1486,6 +1945,7 @@ class Client:
             "/messaging/save_thread_nickname/?source=thread_settings&dpr=1", data
         )
 
+    @_trace.traced
     def change_thread_color(self, color, thread_id=None):
         """Change thread color.
 
@@ -1504,6 +1964,7 @@ class Client:
             "/messaging/save_thread_color/?source=thread_settings&dpr=1", data
         )
 
+    @_trace.traced
     def change_thread_emoji(self, emoji, thread_id=None):
         """Change thread color.
 
@@ -1523,6 +1984,7 @@ class Client:
             "/messaging/save_thread_emoji/?source=thread_settings&dpr=1", data
         )
 
+    @_trace.traced
     def react_to_message(self, message_id, reaction):
         """React to a message, or removes reaction.
 
@@ -1544,6 +2006,7 @@ class Client:
         j = self._payload_post("/webgraphql/mutation", data)
         _util.handle_graphql_errors(j)
 
+    @_trace.traced
     def create_plan(self, plan, thread_id=None):
         """Set a plan.
 
@@ -1570,6 +2033,7 @@ class Client:
                 fb_error_message=j["error"],
             )
 
+    @_trace.traced
     def edit_plan(self, plan, new_plan):
         """Edit a plan.
 
@@ -1591,6 +2055,7 @@ class Client:
         }
         j = self._payload_post("/ajax/eventreminder/submit", data)
 
+    @_trace.traced
     def delete_plan(self, plan):
         """Delete a plan.
 
@@ -1603,6 +2068,7 @@ class Client:
         data = {"event_reminder_id": plan.uid, "delete": "true", "acontext": ACONTEXT}
         j = self._payload_post("/ajax/eventreminder/submit", data)
 
+    @_trace.traced
     def change_plan_participation(self, plan, take_part=True):
         """Change participation in a plan.
 
@@ -1620,6 +2086,7 @@ class Client:
         }
         j = self._payload_post("/ajax/eventreminder/rsvp", data)
 
+    @_trace.traced
     def create_poll(self, poll, thread_id=None):
         """Create poll in a group thread.
 
@@ -1647,6 +2114,7 @@ class Client:
                 fb_error_message=j.get("errorMessage"),
             )
 
+    @_trace.traced
     def update_poll_vote(self, poll_id, option_ids=[], new_options=[]):
         """Update a poll vote.
 
@@ -1675,6 +2143,7 @@ class Client:
                 fb_error_message=j.get("errorMessage"),
             )
 
+    @_trace.traced
     def set_typing_status(self, status, thread_id=None, thread_type=None):
         """Set users typing status in a thread.
 
@@ -1698,6 +2167,7 @@ class Client:
     END SEND METHODS
     """
 
+    @_trace.traced
     def mark_as_delivered(self, thread_id, message_id):
         """Mark a message as delivered.
 
@@ -1729,6 +2199,7 @@ class Client:
 
         j = self._payload_post("/ajax/mercury/change_read_status.php", data)
 
+    @_trace.traced
     def mark_as_read(self, thread_ids=None):
         """Mark threads as read.
 
@@ -1742,6 +2213,7 @@ class Client:
         """
         self._read_status(True, thread_ids)
 
+    @_trace.traced
     def mark_as_unread(self, thread_ids=None):
         """Mark threads as unread.
 
@@ -1755,6 +2227,7 @@ class Client:
         """
         self._read_status(False, thread_ids)
 
+    @_trace.traced
     def mark_as_seen(self):
         """
         Todo:
@@ -1764,6 +2237,7 @@ class Client:
             "/ajax/mercury/mark_seen.php", {"seen_timestamp": _util.now()}
         )
 
+    @_trace.traced
     def friend_connect(self, friend_id):
         """
         Todo:
@@ -1773,6 +2247,7 @@ class Client:
 
         j = self._payload_post("/ajax/add_friend/action.php?dpr=1", data)
 
+    @_trace.traced
     def remove_friend(self, friend_id=None):
         """Remove a specified friend from the client's friend list.
 
@@ -1789,6 +2264,7 @@ class Client:
         j = self._payload_post("/ajax/profile/removefriendconfirm.php", data)
         return True
 
+    @_trace.traced
     def block_user(self, user_id):
         """Block messages from a specified user.
 
@@ -1805,6 +2281,7 @@ class Client:
         j = self._payload_post("/messaging/block_messages/?dpr=1", data)
         return True
 
+    @_trace.traced
     def unblock_user(self, user_id):
         """Unblock a previously blocked user.
 
@@ -1821,6 +2298,7 @@ class Client:
         j = self._payload_post("/messaging/unblock_messages/?dpr=1", data)
         return True
 
+    @_trace.traced
     def move_threads(self, location, thread_ids):
         """Move threads to specified location.
 
@@ -1858,6 +2336,7 @@ class Client:
             j = self._payload_post("/ajax/mercury/move_thread.php", data)
         return True
 
+    @_trace.traced
     def delete_threads(self, thread_ids):
         """Delete threads.
 
@@ -1885,6 +2364,7 @@ class Client:
         )
         return True
 
+    @_trace.traced
     def mark_as_spam(self, thread_id=None):
         """Mark a thread as spam, and delete it.
 
@@ -1900,6 +2380,7 @@ class Client:
         j = self._payload_post("/ajax/mercury/mark_spam.php?dpr=1", {"id": thread_id})
         return True
 
+    @_trace.traced
     def delete_messages(self, message_ids):
         """Delete specified messages.
 
@@ -1919,6 +2400,7 @@ class Client:
         j = self._payload_post("/ajax/mercury/delete_messages.php?dpr=1", data)
         return True
 
+    @_trace.traced
     def mute_thread(self, mute_time=None, thread_id=None):
         """Mute thread.
 
@@ -1933,6 +2415,7 @@ class Client:
         data = {"mute_settings": str(mute_settings), "thread_fbid": thread_id}
         j = self._payload_post("/ajax/mercury/change_mute_thread.php?dpr=1", data)
 
+    @_trace.traced
     def unmute_thread(self, thread_id=None):
         """Unmute thread.
 
@@ -1941,6 +2424,7 @@ class Client:
         """
         return self.mute_thread(datetime.timedelta(0), thread_id)
 
+    @_trace.traced
     def mute_thread_reactions(self, mute=True, thread_id=None):
         """Mute thread reactions.
 
@@ -1953,6 +2437,7 @@ class Client:
             "/ajax/mercury/change_reactions_mute_thread/?dpr=1", data
         )
 
+    @_trace.traced
     def unmute_thread_reactions(self, thread_id=None):
         """Unmute thread reactions.
 
@@ -1961,6 +2446,7 @@ class Client:
         """
         return self.mute_thread_reactions(False, thread_id)
 
+    @_trace.traced
     def mute_thread_mentions(self, mute=True, thread_id=None):
         """Mute thread mentions.
 
@@ -1971,6 +2457,7 @@ class Client:
         data = {"mentions_mute_mode": int(mute), "thread_fbid": thread_id}
         j = self._payload_post("/ajax/mercury/change_mentions_mute_thread/?dpr=1", data)
 
+    @_trace.traced
     def unmute_thread_mentions(self, thread_id=None):
         """Unmute thread mentions.
 
@@ -2002,9 +2489,42 @@ class Client:
         )
         _util.handle_payload_error(j)
 
-    def _pull_message(self):
-        """Call pull api to fetch message data."""
-        data = {
+    def _ping_quietly(self):
+        """Ping Facebook, logging instead of raising errors."""
+        try:
+            self._ping()
+        except Exception as e:
+            # Connection errors are noticed and handled by the next pull
+            log.debug("Active ping failed: {}".format(e))
+
+    def _ping_periodically(self, stop):
+        while True:
+            if self._mark_alive:
+                self._ping_quietly()
+            if stop.wait(self._ping_interval):
+                return
+
+    def _start_pinging(self):
+        """Start pinging Facebook in the background, while markAlive is set.
+
+        Returns:
+            threading.Event: Set this to stop pinging
+        """
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._ping_periodically,
+            args=(stop,),
+            name="fbchat-ping",
+            daemon=True,
+        )
+        thread.start()
+        return stop
+
+    def _pull_url(self):
+        return "https://{}-edge-chat.facebook.com/pull".format(self._pull_channel)
+
+    def _pull_params(self):
+        return {
             "seq": self._seq,
             "msgs_recv": 0,
             "sticky_token": self._sticky,
@@ -2012,12 +2532,33 @@ class Client:
             "clientid": self._state._client_id,
             "state": "active" if self._mark_alive else "offline",
         }
-        j = self._get(
-            "https://{}-edge-chat.facebook.com/pull".format(self._pull_channel), data
-        )
-        _util.handle_payload_error(j)
+
+    def _pull_message(self):
+        """Call pull api to fetch message data."""
+        timeouts = self._state._timeouts
+        timeout = timeouts.get_pull()
+        started_at = time.monotonic()
+        try:
+            j = self._get(self._pull_url(), self._pull_params(), timeout=timeout)
+        except requests.Timeout:
+            timeouts.observe_pull_timeout(timeout)
+            raise
+        self._check_pull(j, started_at)
         return j
 
+    def _check_pull(self, j, started_at):
+        """Check the response to a pull request sent at ``started_at``."""
+        _util.handle_payload_error(j)
+        # Without a sticky token, Facebook responds at once with one (``t: lb``)
+        if (
+            self._sticky is not None
+            and j.get("t") != "lb"
+            and "ms" not in j
+            and "batches" not in j
+        ):
+            # Nothing happened, so Facebook held the request for as long as it could
+            self._state._timeouts.observe_pull_hold(time.monotonic() - started_at)
+
     def _parse_delta(self, m):
         def get_thread_id_and_thread_type(msg_metadata):
             """Return a tuple consisting of thread ID and thread type."""
@@ -2045,7 +2586,7 @@ class Client:
         if "addedParticipants" in delta:
             added_ids = [str(x["userFbId"]) for x in delta["addedParticipants"]]
             thread_id = str(metadata["threadKey"]["threadFbId"])
-            self.on_people_added(
+            yield _event.PeopleAddedEvent(
                 mid=mid,
                 added_ids=added_ids,
                 author_id=author_id,
@@ -2058,7 +2599,7 @@ class Client:
         elif "leftParticipantFbId" in delta:
             removed_id = str(delta["leftParticipantFbId"])
             thread_id = str(metadata["threadKey"]["threadFbId"])
-            self.on_person_removed(
+            yield _event.PersonRemovedEvent(
                 mid=mid,
                 removed_id=removed_id,
                 author_id=author_id,
@@ -2071,7 +2612,7 @@ class Client:
         elif delta_type == "change_thread_theme":
             new_color = ThreadColor._from_graphql(delta["untypedData"]["theme_color"])
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_color_change(
+            yield _event.ColorChangeEvent(
                 mid=mid,
                 author_id=author_id,
                 new_color=new_color,
@@ -2086,7 +2627,7 @@ class Client:
         elif delta_type == "change_thread_icon":
             new_emoji = delta["untypedData"]["thread_icon"]
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_emoji_change(
+            yield _event.EmojiChangeEvent(
                 mid=mid,
                 author_id=author_id,
                 new_emoji=new_emoji,
@@ -2101,7 +2642,7 @@ class Client:
         elif delta_class == "ThreadName":
             new_title = delta["name"]
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_title_change(
+            yield _event.TitleChangeEvent(
                 mid=mid,
                 author_id=author_id,
                 new_title=new_title,
@@ -2116,7 +2657,7 @@ class Client:
         elif delta_class == "ForcedFetch":
             mid = delta.get("messageId")
             if mid is None:
-                self.on_unknown_messsage_type(msg=m)
+                yield _event.UnknownEvent(msg=m)
             else:
                 thread_id = str(delta["threadKey"]["threadFbId"])
                 fetch_info = self._forced_fetch(thread_id, mid)
@@ -2131,7 +2672,7 @@ class Client:
                         if image_metadata
                         else None
                     )
-                    self.on_image_change(
+                    yield _event.ImageChangeEvent(
                         mid=mid,
                         author_id=author_id,
                         new_image=image_id,
@@ -2146,7 +2687,7 @@ class Client:
             changed_for = str(delta["untypedData"]["participant_id"])
             new_nickname = delta["untypedData"]["nickname"]
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_nickname_change(
+            yield _event.NicknameChangeEvent(
                 mid=mid,
                 author_id=author_id,
                 changed_for=changed_for,
@@ -2164,7 +2705,7 @@ class Client:
             target_id = delta["untypedData"]["TARGET_ID"]
             admin_event = delta["untypedData"]["ADMIN_EVENT"]
             if admin_event == "add_admin":
-                self.on_admin_added(
+                yield _event.AdminAddedEvent(
                     mid=mid,
                     added_id=target_id,
                     author_id=author_id,
@@ -2174,7 +2715,7 @@ class Client:
                     msg=m,
                 )
             elif admin_event == "remove_admin":
-                self.on_admin_removed(
+                yield _event.AdminRemovedEvent(
                     mid=mid,
                     removed_id=target_id,
                     author_id=author_id,
@@ -2188,7 +2729,7 @@ class Client:
         elif delta_type == "change_thread_approval_mode":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
             approval_mode = bool(int(delta["untypedData"]["APPROVAL_MODE"]))
-            self.on_approval_mode_change(
+            yield _event.ApprovalModeChangeEvent(
                 mid=mid,
                 approval_mode=approval_mode,
                 author_id=author_id,
@@ -2206,7 +2747,7 @@ class Client:
             )
             at = _util.millis_to_datetime(int(delta["deliveredWatermarkTimestampMs"]))
             thread_id, thread_type = get_thread_id_and_thread_type(delta)
-            self.on_message_delivered(
+            yield _event.MessageDeliveredEvent(
                 msg_ids=message_ids,
                 delivered_for=delivered_for,
                 thread_id=thread_id,
@@ -2222,7 +2763,7 @@ class Client:
             seen_at = _util.millis_to_datetime(int(delta["actionTimestampMs"]))
             at = _util.millis_to_datetime(int(delta["watermarkTimestampMs"]))
             thread_id, thread_type = get_thread_id_and_thread_type(delta)
-            self.on_message_seen(
+            yield _event.MessageSeenEvent(
                 seen_by=seen_by,
                 thread_id=thread_id,
                 thread_type=thread_type,
@@ -2250,7 +2791,7 @@ class Client:
                 ]
 
             # thread_id, thread_type = get_thread_id_and_thread_type(delta)
-            self.on_marked_seen(
+            yield _event.MarkedSeenEvent(
                 threads=threads, seen_at=seen_at, at=at, metadata=delta, msg=m
             )
 
@@ -2265,7 +2806,7 @@ class Client:
             if leaderboard is not None:
                 leaderboard = json.loads(leaderboard)["scores"]
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_game_played(
+            yield _event.GamePlayedEvent(
                 mid=mid,
                 author_id=author_id,
                 game_id=game_id,
@@ -2288,7 +2829,7 @@ class Client:
             )
             is_video_call = bool(int(delta["untypedData"]["is_video_call"]))
             if call_status == "call_started":
-                self.on_call_started(
+                yield _event.CallStartedEvent(
                     mid=mid,
                     caller_id=author_id,
                     is_video_call=is_video_call,
@@ -2299,7 +2840,7 @@ class Client:
                     msg=m,
                 )
             elif call_status == "call_ended":
-                self.on_call_ended(
+                yield _event.CallEndedEvent(
                     mid=mid,
                     caller_id=author_id,
                     is_video_call=is_video_call,
@@ -2315,7 +2856,7 @@ class Client:
         elif delta_type == "participant_joined_group_call":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
             is_video_call = bool(int(delta["untypedData"]["group_call_type"]))
-            self.on_user_joined_call(
+            yield _event.UserJoinedCallEvent(
                 mid=mid,
                 joined_id=author_id,
                 is_video_call=is_video_call,
@@ -2334,7 +2875,7 @@ class Client:
             poll = Poll._from_graphql(poll_json)
             if event_type == "question_creation":
                 # User created group poll
-                self.on_poll_created(
+                yield _event.PollCreatedEvent(
                     mid=mid,
                     poll=poll,
                     author_id=author_id,
@@ -2348,7 +2889,7 @@ class Client:
                 # User voted on group poll
                 added_options = json.loads(delta["untypedData"]["added_option_ids"])
                 removed_options = json.loads(delta["untypedData"]["removed_option_ids"])
-                self.on_poll_voted(
+                yield _event.PollVotedEvent(
                     mid=mid,
                     poll=poll,
                     added_options=added_options,
@@ -2364,7 +2905,7 @@ class Client:
         # Plan created
         elif delta_type == "lightweight_event_create":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_plan_created(
+            yield _event.PlanCreatedEvent(
                 mid=mid,
                 plan=Plan._from_pull(delta["untypedData"]),
                 author_id=author_id,
@@ -2378,7 +2919,7 @@ class Client:
         # Plan ended
         elif delta_type == "lightweight_event_notify":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_plan_ended(
+            yield _event.PlanEndedEvent(
                 mid=mid,
                 plan=Plan._from_pull(delta["untypedData"]),
                 thread_id=thread_id,
@@ -2391,7 +2932,7 @@ class Client:
         # Plan edited
         elif delta_type == "lightweight_event_update":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_plan_edited(
+            yield _event.PlanEditedEvent(
                 mid=mid,
                 plan=Plan._from_pull(delta["untypedData"]),
                 author_id=author_id,
@@ -2405,7 +2946,7 @@ class Client:
         # Plan deleted
         elif delta_type == "lightweight_event_delete":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_plan_deleted(
+            yield _event.PlanDeletedEvent(
                 mid=mid,
                 plan=Plan._from_pull(delta["untypedData"]),
                 author_id=author_id,
@@ -2420,7 +2961,7 @@ class Client:
         elif delta_type == "lightweight_event_rsvp":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
             take_part = delta["untypedData"]["guest_status"] == "GOING"
-            self.on_plan_participation(
+            yield _event.PlanParticipationEvent(
                 mid=mid,
                 plan=Plan._from_pull(delta["untypedData"]),
                 take_part=take_part,
@@ -2449,7 +2990,7 @@ class Client:
                     )
                     add_reaction = not bool(i["action"])
                     if add_reaction:
-                        self.on_reaction_added(
+                        yield _event.ReactionAddedEvent(
                             mid=mid,
                             reaction=reaction,
                             author_id=author_id,
@@ -2459,7 +3000,7 @@ class Client:
                             msg=m,
                         )
                     else:
-                        self.on_reaction_removed(
+                        yield _event.ReactionRemovedEvent(
                             mid=mid,
                             author_id=author_id,
                             thread_id=thread_id,
@@ -2477,7 +3018,7 @@ class Client:
                     can_reply = i["canViewerReply"]
                     if reason == 2:
                         if can_reply:
-                            self.on_unblock(
+                            yield _event.UnblockEvent(
                                 author_id=author_id,
                                 thread_id=thread_id,
                                 thread_type=thread_type,
@@ -2485,7 +3026,7 @@ class Client:
                                 msg=m,
                             )
                         else:
-                            self.on_block(
+                            yield _event.BlockEvent(
                                 author_id=author_id,
                                 thread_id=thread_id,
                                 thread_type=thread_type,
@@ -2501,7 +3042,7 @@ class Client:
                         mid = l["messageId"]
                         author_id = str(l["senderId"])
                         location = LiveLocationAttachment._from_pull(l)
-                        self.on_live_location(
+                        yield _event.LiveLocationEvent(
                             mid=mid,
                             location=location,
                             author_id=author_id,
@@ -2518,7 +3059,7 @@ class Client:
                     mid = i["messageID"]
                     at = _util.millis_to_datetime(i["deletionTimestamp"])
                     author_id = str(i["senderID"])
-                    self.on_message_unsent(
+                    yield _event.MessageUnsentEvent(
                         mid=mid,
                         author_id=author_id,
                         thread_id=thread_id,
@@ -2530,11 +3071,13 @@ class Client:
                 elif d.get("deltaMessageReply"):
                     i = d["deltaMessageReply"]
                     metadata = i["message"]["messageMetadata"]
+                    if self._is_duplicate("deltaMessageReply", metadata["messageId"]):
+                        continue
                     thread_id, thread_type = get_thread_id_and_thread_type(metadata)
                     message = Message._from_reply(i["message"])
                     message.replied_to = Message._from_reply(i["repliedToMessage"])
                     message.reply_to_id = message.replied_to.uid
-                    self.on_message(
+                    yield _event.MessageEvent(
                         mid=message.uid,
                         author_id=message.author,
                         message_object=message,
@@ -2548,7 +3091,7 @@ class Client:
         # New message
         elif delta.get("class") == "NewMessage":
             thread_id, thread_type = get_thread_id_and_thread_type(metadata)
-            self.on_message(
+            yield _event.MessageEvent(
                 mid=mid,
                 author_id=author_id,
                 message_object=Message._from_pull(
@@ -2567,12 +3110,19 @@ class Client:
 
         # Unknown message type
         else:
-            self.on_unknown_messsage_type(msg=m)
+            yield _event.UnknownEvent(msg=m)
+
+    def _is_duplicate(self, *key):
+        """Check whether an event with ``key`` has been received recently."""
+        return self._seen_events is not None and not self._seen_events.add(key)
 
     def _parse_message(self, content):
-        """Get message and author name from content.
+        """Parse the events received in a pull response.
 
         May contain multiple messages in the content.
+
+        Returns:
+            list: :class:`Event` objects
         """
         self._seq = content.get("seq", "0")
 
@@ -2580,123 +3130,234 @@ class Client:
             self._sticky = content["lb_info"]["sticky"]
             self._pool = content["lb_info"]["pool"]
 
+        events = []
         if "batches" in content:
             for batch in content["batches"]:
-                self._parse_message(batch)
+                events.extend(self._parse_message(batch))
 
-        if "ms" not in content:
-            return
-
-        for m in content["ms"]:
-            mtype = m.get("type")
+        for m in content.get("ms", ()):
             try:
-                # Things that directly change chat
-                if mtype == "delta":
-                    self._parse_delta(m)
-                # Inbox
-                elif mtype == "inbox":
-                    self.on_inbox(
-                        unseen=m["unseen"],
-                        unread=m["unread"],
-                        recent_unread=m["recent_unread"],
-                        msg=m,
-                    )
+                for event in self._parse_events(m):
+                    events.append(event)
+            except Exception as e:
+                self.on_message_error(exception=e, msg=m)
 
-                # Typing
-                elif mtype == "typ" or mtype == "ttyp":
-                    author_id = str(m.get("from"))
-                    thread_id = m.get("thread_fbid")
-                    if thread_id:
-                        thread_type = ThreadType.GROUP
-                        thread_id = str(thread_id)
-                    else:
-                        thread_type = ThreadType.USER
-                        if author_id == self._uid:
-                            thread_id = m.get("to")
-                        else:
-                            thread_id = author_id
-                    typing_status = TypingStatus(m.get("st"))
-                    self.on_typing(
-                        author_id=author_id,
-                        status=typing_status,
-                        thread_id=thread_id,
-                        thread_type=thread_type,
-                        msg=m,
-                    )
+        return events
 
-                # Delivered
+    def _parse_events(self, m):
+        """Parse one of the messages in a pull response, yielding its events."""
+        mtype = m.get("type")
 
-                # Seen
-                # elif mtype == "m_read_receipt":
-                #
-                #     self.on_seen(m.get('realtime_viewer_fbid'), m.get('reader'), m.get('time'))
+        # Things that directly change chat
+        if mtype == "delta":
+            delta = m["delta"]
+            metadata = delta.get("messageMetadata")
+            if metadata and self._is_duplicate(
+                delta.get("class"), delta.get("type"), metadata["messageId"]
+            ):
+                return
+            yield from self._parse_delta(m)
+        # Inbox
+        elif mtype == "inbox":
+            yield _event.InboxEvent(
+                unseen=m["unseen"],
+                unread=m["unread"],
+                recent_unread=m["recent_unread"],
+                msg=m,
+            )
 
-                elif mtype in ["jewel_requests_add"]:
-                    from_id = m["from"]
-                    self.on_friend_request(from_id=from_id, msg=m)
+        # Typing
+        elif mtype == "typ" or mtype == "ttyp":
+            author_id = str(m.get("from"))
+            thread_id = m.get("thread_fbid")
+            if thread_id:
+                thread_type = ThreadType.GROUP
+                thread_id = str(thread_id)
+            else:
+                thread_type = ThreadType.USER
+                if author_id == self._uid:
+                    thread_id = m.get("to")
+                else:
+                    thread_id = author_id
+            typing_status = TypingStatus(m.get("st"))
+            yield _event.TypingEvent(
+                author_id=author_id,
+                status=typing_status,
+                thread_id=thread_id,
+                thread_type=thread_type,
+                msg=m,
+            )
 
-                # Happens on every login
-                elif mtype == "qprimer":
-                    self.on_qprimer(
-                        at=_util.millis_to_datetime(int(m.get("made"))), msg=m
-                    )
+        # Delivered
 
-                # Is sent before any other message
-                elif mtype == "deltaflow":
-                    pass
-
-                # Chat timestamp
-                elif mtype == "chatproxy-presence":
-                    statuses = dict()
-                    for id_, data in m.get("buddyList", {}).items():
-                        statuses[id_] = ActiveStatus._from_chatproxy_presence(id_, data)
-                        self._buddylist[id_] = statuses[id_]
-
-                    self.on_chat_timestamp(buddylist=statuses, msg=m)
-
-                # Buddylist overlay
-                elif mtype == "buddylist_overlay":
-                    statuses = dict()
-                    for id_, data in m.get("overlay", {}).items():
-                        old_in_game = None
-                        if id_ in self._buddylist:
-                            old_in_game = self._buddylist[id_].in_game
-
-                        statuses[id_] = ActiveStatus._from_buddylist_overlay(
-                            data, old_in_game
-                        )
-                        self._buddylist[id_] = statuses[id_]
+        # Seen
+        # elif mtype == "m_read_receipt":
+        #
+        #     self.on_seen(m.get('realtime_viewer_fbid'), m.get('reader'), m.get('time'))
 
-                    self.on_buddylist_overlay(statuses=statuses, msg=m)
+        elif mtype in ["jewel_requests_add"]:
+            from_id = m["from"]
+            yield _event.FriendRequestEvent(from_id=from_id, msg=m)
 
-                # Unknown message type
-                else:
-                    self.on_unknown_messsage_type(msg=m)
+        # Happens on every login
+        elif mtype == "qprimer":
+            yield _event.QprimerEvent(
+                at=_util.millis_to_datetime(int(m.get("made"))), msg=m
+            )
 
-            except Exception as e:
-                self.on_message_error(exception=e, msg=m)
+        # Is sent before any other message
+        elif mtype == "deltaflow":
+            pass
 
-    def _do_one_listen(self):
+        # Chat timestamp
+        elif mtype == "chatproxy-presence":
+            statuses = dict()
+            for id_, data in m.get("buddyList", {}).items():
+                statuses[id_] = ActiveStatus._from_chatproxy_presence(id_, data)
+                self._presence.update(
+                    id_,
+                    active=statuses[id_].active,
+                    last_active=data.get("lat"),
+                    in_game=statuses[id_].in_game,
+                )
+            self._presence.evict_expired()
+
+            yield _event.ChatTimestampEvent(buddylist=statuses, msg=m)
+
+        # Buddylist overlay
+        elif mtype == "buddylist_overlay":
+            statuses = dict()
+            for id_, data in m.get("overlay", {}).items():
+                old_in_game = None
+                old_status = self._presence.get(id_)
+                if old_status is not None:
+                    old_in_game = old_status.in_game
+
+                statuses[id_] = ActiveStatus._from_buddylist_overlay(data, old_in_game)
+                self._presence.update(
+                    id_,
+                    active=statuses[id_].active,
+                    last_active=data.get("la"),
+                    in_game=old_in_game,
+                )
+
+            yield _event.BuddylistOverlayEvent(statuses=statuses, msg=m)
+
+        # Unknown message type
+        else:
+            yield _event.UnknownEvent(msg=m)
+
+    def _receive_events(self):
+        """Receive and parse events from Facebook.
+
+        Timeouts and unavailable pull channels are handled here, and result in no
+        events.
+
+        Returns:
+            list: :class:`Event` objects
+
+        Raises:
+            requests.ConnectionError: If the connection to Facebook was lost
+        """
         try:
-            if self._mark_alive:
-                self._ping()
             content = self._pull_message()
-            if content:
-                self._parse_message(content)
-        except KeyboardInterrupt:
-            return False
         except requests.Timeout:
-            pass
+            return []
+        except FBchatFacebookError as e:
+            if self._switch_pull_channel(e):
+                return []
+            raise e
+        return self._events_from_pull(content)
+
+    def _switch_pull_channel(self, exception):
+        """Switch to another pull channel, if ``exception`` says it's unavailable.
+
+        Returns:
+            bool: Whether the channel was switched
+        """
+        # Fix 502 and 503 pull errors
+        if exception.request_status_code in [502, 503]:
+            # Bump pull channel, while contraining withing 0-4
+            self._pull_channel = (self._pull_channel + 1) % 5
+            return True
+        return False
+
+    def _events_from_pull(self, content):
+        """Parse the events in the response to a pull request, and record them."""
+        if not content:
+            return []
+        events = self._parse_message(content)
+        self._event_counts.update(type(event).__name__ for event in events)
+        if self._entity_cache is not None:
+            self._update_entity_cache(events)
+        if self._thread_index is not None:
+            self._thread_index._apply(events)
+        return events
+
+    def _update_entity_cache(self, events):
+        """Update or evict the cached threads that were changed by events.
+
+        Cached threads are replaced by updated copies, not changed in place, since
+        another thread may be copying them.
+        """
+        for event in events:
+            if not isinstance(event, _THREAD_CHANGE_EVENTS):
+                continue
+            thread = self._entity_cache.get(str(event.thread_id))
+            if thread is None:
+                continue
+            thread = copy.deepcopy(thread)
+            is_group = thread.type == ThreadType.GROUP
+            if isinstance(event, _event.ColorChangeEvent):
+                thread.color = event.new_color
+            elif isinstance(event, _event.EmojiChangeEvent):
+                thread.emoji = event.new_emoji
+            elif isinstance(event, _event.TitleChangeEvent) and is_group:
+                thread.name = event.new_title
+            elif isinstance(event, _event.NicknameChangeEvent) and is_group:
+                thread.nicknames[event.changed_for] = event.new_nickname
+            elif isinstance(event, _event.PeopleAddedEvent) and is_group:
+                thread.participants.update(event.added_ids)
+            elif isinstance(event, _event.PersonRemovedEvent) and is_group:
+                thread.participants.discard(event.removed_id)
+                thread.admins.discard(event.removed_id)
+            elif isinstance(event, _event.AdminAddedEvent) and is_group:
+                thread.admins.add(event.added_id)
+            elif isinstance(event, _event.AdminRemovedEvent) and is_group:
+                thread.admins.discard(event.removed_id)
+            elif isinstance(event, _event.ApprovalModeChangeEvent) and is_group:
+                thread.approval_mode = event.approval_mode
+            elif isinstance(
+                event,
+                (
+                    _event.TitleChangeEvent,
+                    _event.NicknameChangeEvent,
+                    _event.ImageChangeEvent,
+                ),
+            ):
+                # Can't be applied to the cached thread, so it's fetched again
+                self._entity_cache.pop(str(event.thread_id))
+                continue
+            self._entity_cache.replace(str(event.thread_id), thread)
+
+    def _pull_events(self):
+        """Like `_receive_events`, but waits and retries if the connection is lost."""
+        try:
+            return self._receive_events()
         except requests.ConnectionError:
             # If the client has lost their internet connection, keep trying every 30 seconds
             time.sleep(30)
-        except FBchatFacebookError as e:
-            # Fix 502 and 503 pull errors
-            if e.request_status_code in [502, 503]:
-                # Bump pull channel, while contraining withing 0-4
-                self._pull_channel = (self._pull_channel + 1) % 5
-            else:
-                raise e
+            return []
+
+    def _do_one_listen(self):
+        try:
+            events = self._pull_events()
+            if events:
+                self.on_events(events)
+        except KeyboardInterrupt:
+            return False
+        except FBchatFacebookError:
+            raise
         except Exception as e:
             return self.on_listen_error(exception=e)
 
@@ -2706,18 +3367,120 @@ class Client:
         """Initialize and runs the listening loop continually.
 
         Args:
-            markAlive (bool): Whether this should ping the Facebook server each time the loop runs
+            markAlive (bool): Whether this should periodically ping the Facebook server,
+                to show the client as active. See `set_ping_interval`
         """
         if markAlive is not None:
             self.set_active_status(markAlive)
 
         self.on_listening()
 
-        while self._do_one_listen():
-            pass
+        self._listening = True
+        stop_pinging = self._start_pinging()
+        try:
+            while self._do_one_listen():
+                pass
+        finally:
+            stop_pinging.set()
+            self._listening = False
 
         self._sticky, self._pool = (None, None)
 
+    def events(self, batch_size=None, max_wait=None, markAlive=None):
+        """Listen for events, and yield them as they're received.
+
+        This is an alternative to `listen`, for when you'd rather consume the events
+        yourself than overwrite the ``on_*`` methods. Apart from `on_listening`, which
+        is called when this starts, they are not called.
+
+        Events are received in a background thread, which waits for you to consume
+        the previously received events before requesting new ones from Facebook.
+
+        Example:
+            Store incoming messages, in batches of up to 100::
+
+                for events in client.events(batch_size=100, max_wait=0.5):
+                    store([e for e in events if isinstance(e, fbchat.MessageEvent)])
+
+        Args:
+            batch_size (int): If set, yield lists of up to this many events instead
+                of yielding events one by one
+            max_wait (float): Max. number of seconds to wait for a batch to fill up,
+                counted from when the first event in it was received. By default,
+                wait until the batch is full
+            markAlive (bool): Whether this should periodically ping the Facebook
+                server, to show the client as active. See `set_ping_interval`
+
+        Raises:
+            FBchatException: If receiving events failed
+        """
+        if markAlive is not None:
+            self.set_active_status(markAlive)
+
+        self.on_listening()
+
+        received = queue.Queue(maxsize=1)
+        stop = threading.Event()
+
+        def receive():
+            while not stop.is_set():
+                try:
+                    item = self._pull_events()
+                except Exception as e:
+                    item = e
+                # Block until the consumer catches up, unless it's gone
+                while not stop.is_set():
+                    try:
+                        received.put(item, timeout=1)
+                        break
+                    except queue.Full:
+                        pass
+                if isinstance(item, Exception):
+                    return
+
+        self._listening = True
+        thread = threading.Thread(target=receive, name="fbchat-events", daemon=True)
+        thread.start()
+        stop_pinging = self._start_pinging()
+
+        pending = self._event_backlog = collections.deque()
+
+        def wait_for_events(timeout=None):
+            try:
+                item = received.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if isinstance(item, Exception):
+                raise item
+            pending.extend(item)
+
+        try:
+            while True:
+                if batch_size is None:
+                    while not pending:
+                        wait_for_events()
+                    yield pending.popleft()
+                    continue
+
+                deadline = None
+                while len(pending) < batch_size:
+                    if pending and max_wait is not None:
+                        if deadline is None:
+                            deadline = time.monotonic() + max_wait
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        wait_for_events(timeout)
+                    else:
+                        wait_for_events()
+                yield [pending.popleft() for _ in range(min(batch_size, len(pending)))]
+        finally:
+            stop.set()
+            stop_pinging.set()
+            self._listening = False
+            if self._event_backlog is pending:
+                self._event_backlog = None
+
     def set_active_status(self, markAlive):
         """Change active status while listening.
 
@@ -2726,6 +3489,136 @@ class Client:
         """
         self._mark_alive = markAlive
 
+    def set_ping_interval(self, interval):
+        """Change how often Facebook is pinged while listening with markAlive.
+
+        Pings are sent in the background, independently of requests for new events.
+
+        Args:
+            interval (float): Number of seconds between pings
+        """
+        self._ping_interval = interval
+
+    def set_timeouts(
+        self,
+        default=None,
+        pull=None,
+        send=None,
+        upload=None,
+        graphql=None,
+        adaptive_pull=None,
+    ):
+        """Change the timeouts used for requests to Facebook.
+
+        Timeouts are given in seconds, either as a ``(connect, read)`` tuple, or as a
+        single number used for both. Arguments that aren't given are left unchanged.
+
+        Args:
+            default: Used for requests not covered by the other timeouts
+            pull: Used while listening. Facebook holds these requests open until
+                there's new data, so the read timeout should be at least a minute
+            send: Used when sending messages
+            upload: Used when uploading files
+            graphql: Used for GraphQL requests, e.g. when fetching threads
+            adaptive_pull (bool): Whether to derive the read timeout used while
+                listening from how long Facebook has been holding the requests. It's
+                never shorter than the read timeout of ``pull``
+        """
+        timeouts = self._state._timeouts
+        if default is not None:
+            timeouts.default = default
+        if pull is not None:
+            timeouts.pull = pull
+        if send is not None:
+            timeouts.send = send
+        if upload is not None:
+            timeouts.upload = upload
+        if graphql is not None:
+            timeouts.graphql = graphql
+        if adaptive_pull is not None:
+            timeouts.adaptive_pull = adaptive_pull
+
+    def set_handler_budget(self, budget, max_abandoned=8):
+        """Limit how long handling an event may take, before the next one is handled.
+
+        With a budget, handlers are run in a separate thread. If one doesn't finish
+        in time, `on_handler_overrun` is called, and the handler is left running in
+        the background while the client continues listening. This keeps a slow
+        handler (e.g. one waiting for a slow HTTP request) from stalling the client.
+        If an abandoned handler fails, `on_message_error` is called from its thread.
+
+        Args:
+            budget (float): Max. number of seconds `on_event` may take to handle an
+                event. ``None`` to run handlers in the listening thread, without a
+                limit (the default)
+            max_abandoned (int): Max. number of abandoned handlers left running.
+                Once reached, the client waits for one of them to finish before
+                handling more events
+        """
+        self._watchdog.budget = budget
+        self._watchdog.max_abandoned = max_abandoned
+
+    def get_handler_latencies(self):
+        """Get how long event handlers have taken while listening.
+
+        Returns:
+            dict: Handler names (e.g. ``"on_message"``) mapped to a `Histogram` of
+            the number of seconds they took
+        """
+        return dict(self._watchdog.latencies)
+
+    def set_presence_ttl(self, ttl):
+        """Change how long friends' active status is remembered while listening.
+
+        Args:
+            ttl (float): Number of seconds to keep a status after it was last
+                received. ``None`` to keep statuses forever
+        """
+        self._presence.ttl = ttl
+
+    def set_event_deduplication(self, size=1024, ttl=10 * 60):
+        """Configure how events that Facebook delivers more than once are dropped.
+
+        This can e.g. happen after reconnecting, or when the pull channel changes.
+        Events are identified by their message ID, and duplicates are dropped before
+        they're parsed.
+
+        Args:
+            size (int): Max. number of recently seen events to remember. Set to ``0``
+                to disable deduplication
+            ttl (float): Number of seconds to remember an event for. ``None`` to
+                remember events until evicted by ``size``
+        """
+        if size:
+            self._seen_events = _cache.LRUCache(maxsize=size, ttl=ttl)
+        else:
+            self._seen_events = None
+
+    def set_entity_cache(self, size=1024, ttl=10 * 60):
+        """Cache the users, pages and groups fetched with `fetch_thread_info`.
+
+        This also applies to `fetch_user_info`, `fetch_page_info` and
+        `fetch_group_info`. Disabled by default.
+
+        While listening, cached threads are updated when e.g. their title,
+        participants or admins change, or evicted, if the change can't be applied.
+        Changes that aren't received as events, e.g. a user changing their name, are
+        only picked up once the thread expires.
+
+        Copies of the cached threads are returned, so changing them doesn't affect
+        the cache, and they don't change while listening.
+
+        Args:
+            size (int): Max. number of threads to cache. Set to ``0`` to disable the
+                cache
+            ttl (float): Number of seconds to cache a thread for. ``None`` to cache
+                threads until evicted by ``size``
+        """
+        if size:
+            self._entity_cache = _cache.LRUCache(maxsize=size, ttl=ttl)
+        else:
+            self._entity_cache = None
+
     """
     END LISTEN METHODS
     """
@@ -2770,6 +3663,45 @@ class Client:
         log.exception("Got exception while listening")
         return True
 
+    def on_events(self, events):
+        """Called when the client is listening, and events are received.
+
+        ``events`` contains every event received in one response from Facebook, in
+        the order they were received. By default, this calls `on_event` for each of
+        them. Overwrite this to handle events in bulk, e.g. to store all received
+        messages in a single database write.
+
+        The time limit set with `set_handler_budget`, and the latencies returned by
+        `get_handler_latencies`, only apply to the default implementation.
+
+        Args:
+            events (list): :class:`Event` objects
+        """
+        for event in events:
+
+            def on_error(exception, msg=event.msg):
+                self.on_message_error(exception=exception, msg=msg)
+
+            try:
+                if not self._watchdog.run(
+                    event._handler, self.on_event, event, on_error=on_error
+                ):
+                    self.on_handler_overrun(event=event)
+            except Exception as e:
+                on_error(e)
+
+    def on_event(self, event):
+        """Called when the client is listening, and an event is received.
+
+        By default, this calls the ``on_*`` method corresponding to the type of
+        ``event``, e.g. `on_message` for a `MessageEvent`. Overwrite this to handle all
+        events in one place.
+
+        Args:
+            event (Event): The event that was received
+        """
+        getattr(self, event._handler)(**event._to_kwargs())
+
     def on_message(
         self,
         mid=None,
@@ -3673,6 +4605,20 @@ class Client:
         """
         log.exception("Exception in parsing of {}".format(msg))
 
+    def on_handler_overrun(self, event=None):
+        """Called when handling an event took longer than the budget.
+
+        The budget is set with `set_handler_budget`.
+
+        Args:
+            event (Event): The event whose handler was abandoned
+        """
+        log.warning(
+            "{} exceeded its budget, while handling {}".format(
+                event._handler, type(event).__name__
+            )
+        )
+
     """
     END EVENTS
     """
@@ -0,0 +1,568 @@
+import attr
+
+
+@attr.s(slots=True)
+class Event:
+    """Base class for events received while listening.
+
+    Every event has a corresponding ``on_*`` method on `Client`, which documents the
+    attributes of the event. `Client.on_event` calls this method by default.
+    """
+
+    #: Name of the `Client` method that handles this kind of event
+    _handler = None
+
+    def _to_kwargs(self):
+        return attr.asdict(self, recurse=False)
+
+
+@attr.s(slots=True)
+class MessageEvent(Event):
+    """Somebody sent a message. See `Client.on_message`."""
+
+    _handler = "on_message"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    message_object = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class ColorChangeEvent(Event):
+    """Somebody changed a thread's color. See `Client.on_color_change`."""
+
+    _handler = "on_color_change"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    new_color = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class EmojiChangeEvent(Event):
+    """Somebody changed a thread's emoji. See `Client.on_emoji_change`."""
+
+    _handler = "on_emoji_change"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    new_emoji = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class TitleChangeEvent(Event):
+    """Somebody changed a thread's title. See `Client.on_title_change`."""
+
+    _handler = "on_title_change"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    new_title = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class ImageChangeEvent(Event):
+    """Somebody changed a thread's image. See `Client.on_image_change`."""
+
+    _handler = "on_image_change"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    new_image = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class NicknameChangeEvent(Event):
+    """Somebody changed a nickname. See `Client.on_nickname_change`."""
+
+    _handler = "on_nickname_change"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    changed_for = attr.ib(None)
+    new_nickname = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class AdminAddedEvent(Event):
+    """Somebody added an admin to a group. See `Client.on_admin_added`."""
+
+    _handler = "on_admin_added"
+
+    mid = attr.ib(None)
+    added_id = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class AdminRemovedEvent(Event):
+    """Somebody was removed as an admin in a group. See `Client.on_admin_removed`."""
+
+    _handler = "on_admin_removed"
+
+    mid = attr.ib(None)
+    removed_id = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class ApprovalModeChangeEvent(Event):
+    """Somebody changed approval mode in a group. See `Client.on_approval_mode_change`."""
+
+    _handler = "on_approval_mode_change"
+
+    mid = attr.ib(None)
+    approval_mode = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class MessageSeenEvent(Event):
+    """Somebody marked a message as seen. See `Client.on_message_seen`."""
+
+    _handler = "on_message_seen"
+
+    seen_by = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    seen_at = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class MessageDeliveredEvent(Event):
+    """Somebody marked messages as delivered. See `Client.on_message_delivered`."""
+
+    _handler = "on_message_delivered"
+
+    msg_ids = attr.ib(None)
+    delivered_for = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class MarkedSeenEvent(Event):
+    """The client marked threads as seen. See `Client.on_marked_seen`."""
+
+    _handler = "on_marked_seen"
+
+    threads = attr.ib(None)
+    seen_at = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class MessageUnsentEvent(Event):
+    """Somebody unsent (deleted for everyone) a message. See `Client.on_message_unsent`."""
+
+    _handler = "on_message_unsent"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PeopleAddedEvent(Event):
+    """Somebody added people to a group thread. See `Client.on_people_added`."""
+
+    _handler = "on_people_added"
+
+    mid = attr.ib(None)
+    added_ids = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PersonRemovedEvent(Event):
+    """Somebody removed a person from a group thread. See `Client.on_person_removed`."""
+
+    _handler = "on_person_removed"
+
+    mid = attr.ib(None)
+    removed_id = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class FriendRequestEvent(Event):
+    """Somebody sent a friend request. See `Client.on_friend_request`."""
+
+    _handler = "on_friend_request"
+
+    from_id = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class InboxEvent(Event):
+    """The inbox changed. See `Client.on_inbox`."""
+
+    _handler = "on_inbox"
+
+    unseen = attr.ib(None)
+    unread = attr.ib(None)
+    recent_unread = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class TypingEvent(Event):
+    """Somebody started or stopped typing into a chat. See `Client.on_typing`."""
+
+    _handler = "on_typing"
+
+    author_id = attr.ib(None)
+    status = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class GamePlayedEvent(Event):
+    """Somebody played a game. See `Client.on_game_played`."""
+
+    _handler = "on_game_played"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    game_id = attr.ib(None)
+    game_name = attr.ib(None)
+    score = attr.ib(None)
+    leaderboard = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class ReactionAddedEvent(Event):
+    """Somebody reacted to a message. See `Client.on_reaction_added`."""
+
+    _handler = "on_reaction_added"
+
+    mid = attr.ib(None)
+    reaction = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class ReactionRemovedEvent(Event):
+    """Somebody removed a reaction from a message. See `Client.on_reaction_removed`."""
+
+    _handler = "on_reaction_removed"
+
+    mid = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class BlockEvent(Event):
+    """Somebody blocked the client. See `Client.on_block`."""
+
+    _handler = "on_block"
+
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class UnblockEvent(Event):
+    """Somebody unblocked the client. See `Client.on_unblock`."""
+
+    _handler = "on_unblock"
+
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class LiveLocationEvent(Event):
+    """Somebody sent live location info. See `Client.on_live_location`."""
+
+    _handler = "on_live_location"
+
+    mid = attr.ib(None)
+    location = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class CallStartedEvent(Event):
+    """Somebody started a call in a group. See `Client.on_call_started`."""
+
+    _handler = "on_call_started"
+
+    mid = attr.ib(None)
+    caller_id = attr.ib(None)
+    is_video_call = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class CallEndedEvent(Event):
+    """Somebody ended a call in a group. See `Client.on_call_ended`."""
+
+    _handler = "on_call_ended"
+
+    mid = attr.ib(None)
+    caller_id = attr.ib(None)
+    is_video_call = attr.ib(None)
+    call_duration = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class UserJoinedCallEvent(Event):
+    """Somebody joined a group call. See `Client.on_user_joined_call`."""
+
+    _handler = "on_user_joined_call"
+
+    mid = attr.ib(None)
+    joined_id = attr.ib(None)
+    is_video_call = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PollCreatedEvent(Event):
+    """Somebody created a group poll. See `Client.on_poll_created`."""
+
+    _handler = "on_poll_created"
+
+    mid = attr.ib(None)
+    poll = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PollVotedEvent(Event):
+    """Somebody voted in a group poll. See `Client.on_poll_voted`."""
+
+    _handler = "on_poll_voted"
+
+    mid = attr.ib(None)
+    poll = attr.ib(None)
+    added_options = attr.ib(None)
+    removed_options = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PlanCreatedEvent(Event):
+    """Somebody created a plan. See `Client.on_plan_created`."""
+
+    _handler = "on_plan_created"
+
+    mid = attr.ib(None)
+    plan = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PlanEndedEvent(Event):
+    """A plan ended. See `Client.on_plan_ended`."""
+
+    _handler = "on_plan_ended"
+
+    mid = attr.ib(None)
+    plan = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PlanEditedEvent(Event):
+    """Somebody edited a plan. See `Client.on_plan_edited`."""
+
+    _handler = "on_plan_edited"
+
+    mid = attr.ib(None)
+    plan = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PlanDeletedEvent(Event):
+    """Somebody deleted a plan. See `Client.on_plan_deleted`."""
+
+    _handler = "on_plan_deleted"
+
+    mid = attr.ib(None)
+    plan = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class PlanParticipationEvent(Event):
+    """Somebody decided to take part in a plan, or not. See `Client.on_plan_participation`."""
+
+    _handler = "on_plan_participation"
+
+    mid = attr.ib(None)
+    plan = attr.ib(None)
+    take_part = attr.ib(None)
+    author_id = attr.ib(None)
+    thread_id = attr.ib(None)
+    thread_type = attr.ib(None)
+    at = attr.ib(None)
+    metadata = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class QprimerEvent(Event):
+    """The client just started listening. See `Client.on_qprimer`."""
+
+    _handler = "on_qprimer"
+
+    at = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class ChatTimestampEvent(Event):
+    """The client received a chat online presence update. See `Client.on_chat_timestamp`."""
+
+    _handler = "on_chat_timestamp"
+
+    buddylist = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class BuddylistOverlayEvent(Event):
+    """The client received information about friends' active status. See `Client.on_buddylist_overlay`."""
+
+    _handler = "on_buddylist_overlay"
+
+    statuses = attr.ib(None)
+    msg = attr.ib(None)
+
+
+@attr.s(slots=True)
+class UnknownEvent(Event):
+    """Some unknown data was received. See `Client.on_unknown_messsage_type`."""
+
+    _handler = "on_unknown_messsage_type"
+
+    msg = attr.ib(None)
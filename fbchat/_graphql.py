@@ -34,7 +34,12 @@ def queries_to_json(*queries):
     return json.dumps(rtn)
 
 
-def response_to_json(content):
+def response_to_json(content, return_errors=False):
+    """Parse a response to a batch of queries.
+
+    If ``return_errors`` is set, errors of single queries are returned in place of
+    their result, instead of being raised.
+    """
     content = _util.strip_json_cruft(content)  # Usually only needed in some error cases
     try:
         j = json.loads(content, cls=ConcatJSONDecoder)
@@ -50,14 +55,18 @@ def response_to_json(content):
             continue
         _util.handle_payload_error(x)
         [(key, value)] = x.items()
-        _util.handle_graphql_errors(value)
+        try:
+            _util.handle_graphql_errors(value)
+        except _exception.FBchatFacebookError as e:
+            if not return_errors:
+                raise
+            rtn[int(key[1:])] = e
+            continue
         if "response" in value:
             rtn[int(key[1:])] = value["response"]
         else:
             rtn[int(key[1:])] = value["data"]
 
-    log.debug(rtn)
-
     return rtn
 
 
@@ -0,0 +1,228 @@
+import collections
+import concurrent.futures
+from . import _util, _trace
+
+
+class _Prefetcher:
+    """Fetches pages in a background thread, before they're needed."""
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._executor = None
+        self._position = None
+        self._future = None
+
+    def prefetch(self, position):
+        """Start fetching the page at ``position``."""
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._position = position
+        # Fetch as part of the span of whoever is iterating
+        self._future = self._executor.submit(_trace.propagate(self._fetch), position)
+
+    def get(self, position):
+        """Return the page at ``position``, waiting for it if it's being prefetched."""
+        future, self._future = self._future, None
+        if future is not None and self._position == position:
+            return future.result()
+        return self._fetch(position)
+
+    def close(self):
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class ThreadIterator:
+    """Iterates over threads, newest first, fetching them page by page.
+
+    Returned by `Client.iter_threads`. While the threads of a page are consumed, the
+    next page is fetched in a background thread.
+
+    Iteration can be resumed later, from after the last thread returned, by passing
+    `cursor` to `Client.iter_threads`.
+    """
+
+    def __init__(
+        self,
+        client,
+        thread_location,
+        before=None,
+        after=None,
+        cursor=None,
+        prefetch=True,
+    ):
+        self._client = client
+        self._thread_location = thread_location
+        self._after = after
+        self._prefetch = prefetch
+        # Threads are fetched from `before`, skipping the threads in `_skip`, which
+        # have already been returned and were last active at `before`
+        if cursor is not None:
+            before, _, skip = cursor.partition(":")
+            self._before, self._skip = int(before), set(filter(None, skip.split(",")))
+        else:
+            self._before = _util.datetime_to_millis(before) if before else None
+            self._skip = set()
+        self._cursor = (self._before, self._skip)
+        self._threads = collections.deque()
+        self._pages = _Prefetcher(self._fetch)
+        self._done = False
+
+    @property
+    def cursor(self):
+        """Position after the last thread returned, as a string.
+
+        ``None`` if nothing has been returned yet, and no cursor or ``before`` was
+        given.
+        """
+        before, skip = self._cursor
+        if before is None:
+            return None
+        return "{}:{}".format(before, ",".join(sorted(skip)))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self._threads:
+            if self._done:
+                self.close()
+                raise StopIteration
+            self._load_page()
+
+        thread = self._threads.popleft()
+        if self._after is not None and (
+            thread.last_active is None or thread.last_active < self._after
+        ):
+            # Threads are sorted, so the rest are older as well
+            self._threads.clear()
+            self._done = True
+            self.close()
+            raise StopIteration
+
+        if thread.last_active is not None:
+            millis = _util.datetime_to_millis(thread.last_active)
+            before, skip = self._cursor
+            skip = skip | {thread.uid} if millis == before else {thread.uid}
+            self._cursor = (millis, skip)
+        return thread
+
+    def close(self):
+        """Stop prefetching. Called automatically when iteration stops."""
+        self._pages.close()
+
+    def _fetch(self, before):
+        return self._client.fetch_thread_list(
+            thread_location=self._thread_location,
+            before=_util.millis_to_datetime(before) if before is not None else None,
+        )
+
+    def _load_page(self):
+        threads = self._pages.get(self._before)
+
+        # `before` is inclusive, so pages overlap by the threads last active then
+        threads = [thread for thread in threads if thread.uid not in self._skip]
+        if not threads:
+            self._done = True
+            return
+        self._threads.extend(threads)
+
+        last_active = threads[-1].last_active
+        if last_active is None or (
+            self._after is not None and last_active < self._after
+        ):
+            # Threads without messages come last, and can't be paged past
+            self._done = True
+            return
+        before = _util.datetime_to_millis(last_active)
+        skip = {thread.uid for thread in threads if thread.last_active == last_active}
+        if before == self._before:
+            skip |= self._skip
+        self._before, self._skip = before, skip
+
+        if self._prefetch:
+            self._pages.prefetch(before)
+
+
+class MessageIterator:
+    """Iterates over the messages in a thread, newest first, fetching them page by
+    page.
+
+    Returned by `Client.iter_thread_messages`. While a page is parsed and consumed,
+    the next page is fetched in a background thread. At most two pages are held in
+    memory, however long the thread is.
+    """
+
+    def __init__(
+        self,
+        client,
+        thread_id,
+        before=None,
+        page_size=100,
+        load_read_receipts=True,
+        prefetch=True,
+    ):
+        self._client = client
+        self._thread_id = thread_id
+        self._page_size = page_size
+        self._load_read_receipts = load_read_receipts
+        self._prefetch = prefetch
+        # Messages are fetched from `before`, skipping the messages in `_skip`,
+        # which have already been returned and were sent at `before`
+        self._before = _util.datetime_to_millis(before) if before else None
+        self._skip = set()
+        self._messages = collections.deque()
+        self._pages = _Prefetcher(self._fetch)
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self._messages:
+            if self._done:
+                self.close()
+                raise StopIteration
+            self._load_page()
+        return self._messages.popleft()
+
+    def close(self):
+        """Stop prefetching. Called automatically when iteration stops."""
+        self._pages.close()
+
+    def _fetch(self, before):
+        return self._client._fetch_messages_page(
+            self._thread_id, self._page_size, before, self._load_read_receipts
+        )
+
+    def _load_page(self):
+        thread = self._pages.get(self._before)
+
+        # Nodes are ordered from oldest to newest, and overlap with the last page
+        nodes = [
+            node
+            for node in thread["messages"]["nodes"]
+            if node["message_id"] not in self._skip
+        ]
+        if not nodes:
+            self._done = True
+            return
+        before = int(nodes[0]["timestamp_precise"])
+        skip = {
+            node["message_id"]
+            for node in nodes
+            if int(node["timestamp_precise"]) == before
+        }
+        if before == self._before:
+            skip |= self._skip
+        self._before, self._skip = before, skip
+
+        # Fetch the next page while this page is parsed
+        if self._prefetch:
+            self._pages.prefetch(before)
+        thread["messages"]["nodes"] = nodes
+        self._messages.extend(self._client._parse_messages_page(thread))
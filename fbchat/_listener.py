@@ -0,0 +1,391 @@
+import asyncio
+import attr
+import requests
+import ssl
+import threading
+import time
+import urllib.parse
+from ._core import log
+from ._exception import FBchatFacebookError
+from ._watchdog import _Worker
+from . import _metrics, _util
+
+
+class _ConnectionClosed(ConnectionError):
+    """The connection was closed before a response was received."""
+
+
+class _Connection:
+    """A keep-alive HTTP/1.1 connection, for sending a client's pull requests.
+
+    Only supports what pull requests need, and doesn't use the proxies or the
+    certificate settings of the client's session.
+    """
+
+    def __init__(self):
+        self._address = None
+        self._reader = None
+        self._writer = None
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._address, self._reader, self._writer = (None, None, None)
+
+    async def get(self, request, timeout):
+        """Send a prepared GET request.
+
+        Args:
+            request (requests.PreparedRequest): The request to send
+            timeout: Number of seconds, or ``(connect timeout, read timeout)``
+
+        Returns:
+            tuple: The status code, and the body as bytes
+        """
+        try:
+            url = urllib.parse.urlsplit(request.url)
+            if self._address == (url.scheme, url.netloc):
+                try:
+                    return await self._send(request, url, timeout)
+                except _ConnectionClosed:
+                    # Facebook closed the connection while it was idle
+                    self.close()
+            await self._connect(url, timeout)
+            return await self._send(request, url, timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _connect(self, url, timeout):
+        connect_timeout = timeout[0] if isinstance(timeout, tuple) else timeout
+        context = None
+        if url.scheme == "https":
+            context = ssl.create_default_context(cafile=requests.certs.where())
+        port = url.port or (443 if url.scheme == "https" else 80)
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(url.hostname, port, ssl=context), connect_timeout
+        )
+        self._address = (url.scheme, url.netloc)
+
+    async def _send(self, request, url, timeout):
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        lines = ["GET {} HTTP/1.1".format(request.path_url), "Host: " + url.netloc]
+        for name, value in request.headers.items():
+            if name.lower() not in ("host", "accept-encoding", "connection"):
+                lines.append("{}: {}".format(name, value))
+        lines += ["Accept-Encoding: identity", "Connection: keep-alive", "", ""]
+        self._writer.write("\r\n".join(lines).encode("latin-1"))
+        status_code, body, keep_alive = await asyncio.wait_for(
+            self._read_response(), read_timeout
+        )
+        if not keep_alive:
+            self.close()
+        return status_code, body
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise _ConnectionClosed
+        version, status_code = status_line.decode("latin-1").split()[:2]
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (
+            version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        )
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            keep_alive = False
+        return int(status_code), body, keep_alive
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # Skip the trailers
+                while (await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)
+
+
+@attr.s(slots=True)
+class Listener:
+    """Listens for events on many clients at once, with a few threads.
+
+    Each client is listened to like in `Client.listen`, and events are dispatched to
+    its ``on_*`` methods. The long-polling pull requests of all clients are sent by
+    one thread, running an `asyncio` event loop, so a client waiting for Facebook
+    doesn't take up a thread. Everything that may block, like parsing and handling
+    events and pinging Facebook, is done by ``workers`` threads, in order for each
+    client: a client's events wait only while all workers are busy with the events
+    of other clients. Keep the default pull timeout, since Facebook holds pull
+    requests for about a minute.
+
+    The pull requests are sent with their own HTTP connections, one per client,
+    using the cookies and headers of the client's session, but not its proxies.
+
+    When the connection to Facebook is lost, clients wait before trying again, with
+    a delay that grows with every consecutive failure, across all clients. This way
+    a lost connection doesn't make every client retry at once.
+
+    Example:
+        Listen on 300 accounts with 17 threads, 16 of them handling events::
+
+            listener = fbchat.Listener(workers=16)
+            for client in clients:
+                listener.add(client)
+            listener.listen()
+    """
+
+    #: Number of threads used for handling events
+    workers = attr.ib(4)
+    #: Seconds to wait before retrying after the connection was lost. Doubled for
+    #: every consecutive failure
+    backoff = attr.ib(1)
+    #: The max. number of seconds to wait before retrying
+    max_backoff = attr.ib(5 * 60)
+    _clients = attr.ib(factory=set, init=False, repr=False)
+    _lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+    # The event loop, while listening
+    _loop = attr.ib(None, init=False, repr=False)
+    _thread = attr.ib(None, init=False, repr=False)
+    # Only used in the event loop
+    _worker = attr.ib(None, init=False, repr=False)
+    _stopping = attr.ib(None, init=False, repr=False)
+    # Clients mapped to the task listening with them
+    _tasks = attr.ib(factory=dict, init=False, repr=False)
+    _failures = attr.ib(0, init=False, repr=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+    def add(self, client):
+        """Start listening with a client.
+
+        Args:
+            client (Client): The client to listen with
+        """
+        with self._lock:
+            if client in self._clients:
+                return
+            self._clients.add(client)
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._start_task, client)
+        client.on_listening()
+
+    def remove(self, client):
+        """Stop listening with a client.
+
+        The client's current request to Facebook is cancelled, while events already
+        received with it are still handled.
+
+        Args:
+            client (Client): The client to stop listening with
+        """
+        with self._lock:
+            self._clients.discard(client)
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._cancel_task, client)
+
+    def start(self):
+        """Start listening in the background."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._stopping = self._loop.create_future()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._loop,), name="fbchat-listener"
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop listening.
+
+        The current requests to Facebook are cancelled, while events already
+        received are still handled.
+        """
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._set_stopping)
+
+    def join(self, timeout=None):
+        """Wait for the listener to stop.
+
+        Args:
+            timeout (float): Max. number of seconds to wait
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def listen(self):
+        """Listen until interrupted, e.g. with Ctrl+C."""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        self.join()
+
+    def _run(self, loop):
+        asyncio.set_event_loop(loop)
+        self._worker = _Worker(self.workers, name="fbchat-listener-worker")
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            self._worker.stop()
+            with self._lock:
+                self._loop = None
+            loop.close()
+
+    async def _main(self):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            self._start_task(client)
+        await self._stopping
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _set_stopping(self):
+        if not self._stopping.done():
+            self._stopping.set_result(None)
+
+    def _start_task(self, client):
+        with self._lock:
+            if client not in self._clients:
+                return  # Removed again
+        if client not in self._tasks:
+            self._tasks[client] = self._loop.create_task(self._listen(client))
+
+    def _cancel_task(self, client):
+        task = self._tasks.pop(client, None)
+        if task is not None:
+            task.cancel()
+
+    async def _run_in_worker(self, func, *args):
+        future = self._worker.submit(func, *args)
+        return await asyncio.wrap_future(future, loop=self._loop)
+
+    async def _listen(self, client):
+        connection = _Connection()
+        pinged_at = None
+        client._listening = True
+        try:
+            while True:
+                if client._mark_alive and (
+                    pinged_at is None
+                    or time.monotonic() - pinged_at >= client._ping_interval
+                ):
+                    pinged_at = time.monotonic()
+                    await self._run_in_worker(client._ping_quietly)
+                delay = await self._listen_once(client, connection)
+                if delay is None:
+                    with self._lock:
+                        self._clients.discard(client)
+                    self._tasks.pop(client, None)
+                    return
+                if delay:
+                    await asyncio.sleep(delay)
+        finally:
+            connection.close()
+            client._sticky, client._pool = (None, None)
+            client._listening = False
+
+    async def _listen_once(self, client, connection):
+        """Send a pull request, and wait for a worker to handle the response.
+
+        Returns:
+            Number of seconds to wait before listening with the client again, or
+            ``None`` to stop listening with it
+        """
+        state = client._state
+        timeout = state._timeouts.get_pull()
+        request = state._prepare_get(client._pull_url(), client._pull_params())
+        sample = _metrics.RequestSample(
+            endpoint=urllib.parse.urlsplit(request.url).path, method="GET"
+        )
+        started_at = time.monotonic()
+        try:
+            status_code, body = await connection.get(request, timeout)
+        except asyncio.TimeoutError as e:
+            state._timeouts.observe_pull_timeout(timeout)
+            self._record_failure(state, sample, started_at, e)
+            return 0
+        except (OSError, EOFError, ValueError) as e:
+            self._record_failure(state, sample, started_at, e)
+            self._failures += 1
+            delay = self.backoff * 2 ** min(self._failures - 1, 16)
+            return min(delay, self.max_backoff)
+
+        self._failures = 0
+        # Wait for the response to be handled, so events are handled in order
+        return await self._run_in_worker(
+            self._handle, client, status_code, body, sample, started_at
+        )
+
+    @staticmethod
+    def _record_failure(state, sample, started_at, exception):
+        sample.exception = exception
+        sample.duration = time.monotonic() - started_at
+        state._record_request(sample)
+
+    @staticmethod
+    def _handle(client, status_code, body, sample, started_at):
+        state = client._state
+        sample.status_code = status_code
+        sample.response_bytes = len(body)
+        try:
+            try:
+                _util.check_http_code(status_code)
+                content = _util.get_decoded(body)
+                _util.check_content(content)
+                state._payload_logger.log(sample.endpoint, content)
+                j = _util.to_json(content)
+                if isinstance(j, dict) and "error" in j:
+                    sample.error_code = j["error"]
+            except Exception as e:
+                sample.exception = e
+                sample.error_code = getattr(e, "fb_error_code", None)
+                raise
+            finally:
+                sample.duration = time.monotonic() - started_at
+                state._record_request(sample)
+            client._check_pull(j, started_at)
+            events = client._events_from_pull(j)
+        except FBchatFacebookError as e:
+            if client._switch_pull_channel(e):
+                return 0
+            log.exception("Stopped listening with client {}".format(client.uid))
+            return None
+        except Exception as e:
+            return 0 if client.on_listen_error(exception=e) else None
+
+        if not events:
+            return 0
+        try:
+            client.on_events(events)
+        except Exception as e:
+            return 0 if client.on_listen_error(exception=e) else None
+        return 0
@@ -0,0 +1,144 @@
+import attr
+import bisect
+import collections
+import threading
+
+#: Default histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+#: Histogram bucket upper bounds for sizes, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+@attr.s(slots=True)
+class Histogram:
+    """Counts observed values in buckets.
+
+    Can safely be updated from multiple threads.
+    """
+
+    #: Sorted upper bounds of the buckets. Values above the last bound are counted
+    #: in an extra, unbounded bucket
+    bounds = attr.ib(DEFAULT_BUCKETS, converter=tuple)
+    #: Number of values observed in each bucket
+    counts = attr.ib(init=False)
+    #: Number of observed values
+    count = attr.ib(0, init=False)
+    #: Sum of the observed values
+    sum = attr.ib(0, init=False)
+    _lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+
+    @counts.default
+    def _counts_default(self):
+        return [0] * (len(self.bounds) + 1)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        """Return a consistent ``(counts, count, sum)`` tuple of the histogram."""
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def quantile(self, q):
+        """Estimate the ``q``-quantile of the observed values.
+
+        Returns the upper bound of the bucket containing it, ``float("inf")`` for the
+        unbounded bucket, or ``None`` if no values have been observed.
+        """
+        counts, total, _ = self.snapshot()
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return bound
+        return float("inf")
+
+
+@attr.s(slots=True)
+class RequestSample:
+    """Measurements of a request sent to Facebook."""
+
+    #: The path of the requested URL, e.g. ``"/messaging/send/"`` or ``"/pull"``
+    endpoint = attr.ib()
+    #: ``"GET"`` or ``"POST"``
+    method = attr.ib()
+    #: Number of seconds from sending the request, until the response was parsed
+    duration = attr.ib(None)
+    #: Size of the request body in bytes
+    request_bytes = attr.ib(0)
+    #: Size of the response body in bytes
+    response_bytes = attr.ib(0)
+    #: The HTTP status code, or ``None`` if no response was received
+    status_code = attr.ib(None)
+    #: Facebook's error code, if the response contained an error
+    error_code = attr.ib(None)
+    #: IDs of the GraphQL queries in the request
+    doc_ids = attr.ib(())
+    #: The exception raised, if the request failed
+    exception = attr.ib(None)
+
+
+@attr.s(slots=True)
+class EndpointStats:
+    """Statistics of the requests sent to an endpoint."""
+
+    #: `Histogram` of the number of seconds requests took
+    latency = attr.ib(factory=Histogram)
+    #: `Histogram` of request sizes, in bytes
+    request_bytes = attr.ib(factory=lambda: Histogram(SIZE_BUCKETS))
+    #: `Histogram` of response sizes, in bytes
+    response_bytes = attr.ib(factory=lambda: Histogram(SIZE_BUCKETS))
+    #: Number of requests by HTTP status code, ``None`` meaning no response
+    status_codes = attr.ib(factory=collections.Counter)
+    #: Number of responses by the Facebook error code they contained
+    error_codes = attr.ib(factory=collections.Counter)
+
+
+@attr.s(slots=True)
+class RequestMetrics:
+    """Collects statistics of the requests sent to Facebook.
+
+    Can safely be updated from multiple threads.
+    """
+
+    #: Dictionary of ``(endpoint, doc_ids)`` tuples mapped to their `EndpointStats`.
+    #: ``doc_ids`` is a comma-separated string of the GraphQL query IDs in the
+    #: request, or ``None`` for other requests
+    endpoints = attr.ib(factory=dict, init=False)
+    _lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+
+    def observe(self, sample):
+        """Record a `RequestSample`."""
+        key = (sample.endpoint, ",".join(sample.doc_ids) or None)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.status_codes[sample.status_code] += 1
+            if sample.error_code is not None:
+                stats.error_codes[sample.error_code] += 1
+        stats.latency.observe(sample.duration)
+        stats.request_bytes.observe(sample.request_bytes)
+        stats.response_bytes.observe(sample.response_bytes)
@@ -0,0 +1,117 @@
+import attr
+import threading
+from collections import OrderedDict
+from . import _util
+from ._user import ActiveStatus
+
+
+@attr.s(slots=True)
+class _Presence:
+    active = attr.ib()
+    #: Timestamp in milliseconds, or ``None``
+    last_active = attr.ib()
+    in_game = attr.ib()
+    #: Timestamp in milliseconds of when this record was last updated
+    updated_at = attr.ib()
+
+    def _to_active_status(self):
+        last_active = None
+        if self.last_active is not None:
+            last_active = _util.millis_to_datetime(self.last_active)
+        return ActiveStatus(
+            active=self.active, last_active=last_active, in_game=self.in_game
+        )
+
+
+@attr.s(slots=True)
+class PresenceStore:
+    """Stores the latest known active status of users, as received while listening.
+
+    Users are stored with integer IDs, and records that haven't been updated in
+    ``ttl`` seconds are evicted. Safe to use from multiple threads.
+    """
+
+    #: Seconds to keep a record after it was last updated, or ``None`` to keep forever
+    ttl = attr.ib(60 * 60)
+    _clock = attr.ib(_util.now, repr=False)
+    # Ordered by `updated_at`, so the oldest records are always first
+    _records = attr.ib(factory=OrderedDict, init=False, repr=False)
+    _lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def update(self, user_id, active, last_active, in_game):
+        """Store the status of a user.
+
+        Args:
+            user_id: ID of the user
+            active: Whether the user is active now
+            last_active (int): Timestamp in milliseconds of when the user was last
+                active, or ``None``
+            in_game: Whether the user is playing a Messenger game now
+        """
+        user_id = int(user_id)
+        now = self._clock()
+        with self._lock:
+            record = self._records.pop(user_id, None)
+            if record is None:
+                record = _Presence(active, last_active, in_game, now)
+            else:
+                record.active = active
+                record.last_active = last_active
+                record.in_game = in_game
+                record.updated_at = now
+            self._records[user_id] = record
+
+    def evict_expired(self):
+        """Remove records that haven't been updated in ``ttl`` seconds."""
+        with self._lock:
+            self._evict_expired()
+
+    def _evict_expired(self):
+        if self.ttl is None:
+            return
+        cutoff = self._clock() - self.ttl * 1000
+        while self._records:
+            user_id, record = next(iter(self._records.items()))
+            if record.updated_at >= cutoff:
+                break
+            del self._records[user_id]
+
+    def get(self, user_id):
+        """Return the `ActiveStatus` of a user, or ``None`` if it isn't known."""
+        with self._lock:
+            self._evict_expired()
+            record = self._records.get(int(user_id))
+            return None if record is None else record._to_active_status()
+
+    def get_many(self, user_ids):
+        """Return a dictionary of user IDs mapped to their `ActiveStatus`.
+
+        Users whose status isn't known are left out.
+        """
+        rtn = {}
+        with self._lock:
+            self._evict_expired()
+            for user_id in user_ids:
+                record = self._records.get(int(user_id))
+                if record is not None:
+                    rtn[str(user_id)] = record._to_active_status()
+        return rtn
+
+    def active_since(self, since):
+        """Return IDs of users who have been active since the given timestamp.
+
+        Args:
+            since (int): Timestamp in milliseconds
+        """
+        with self._lock:
+            self._evict_expired()
+            return [
+                str(user_id)
+                for user_id, record in self._records.items()
+                if record.active
+                or (record.last_active is not None and record.last_active >= since)
+            ]
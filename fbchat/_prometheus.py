@@ -0,0 +1,213 @@
+import attr
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from ._core import log
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return ",".join(
+        '{}="{}"'.format(key, _escape(value))
+        for key, value in labels
+        if value is not None
+    )
+
+
+class _Family:
+    """Samples of one metric, in the Prometheus text format."""
+
+    def __init__(self, name, type_, help_):
+        self.name = name
+        self.lines = [
+            "# HELP {} {}".format(name, help_),
+            "# TYPE {} {}".format(name, type_),
+        ]
+
+    def add(self, labels, value, suffix=""):
+        self.lines.append(
+            "{}{}{{{}}} {}".format(self.name, suffix, _format_labels(labels), value)
+        )
+
+    def add_histogram(self, labels, histogram):
+        counts, count, sum_ = histogram.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.bounds, counts):
+            cumulative += bucket_count
+            self.add(labels + [("le", repr(float(bound)))], cumulative, "_bucket")
+        self.add(labels + [("le", "+Inf")], count, "_bucket")
+        self.add(labels, sum_, "_sum")
+        self.add(labels, count, "_count")
+
+
+def format_metrics(clients):
+    """Format metrics of clients in the Prometheus text format.
+
+    Args:
+        clients: `Client` objects, labeled by their ID as ``account``
+
+    Returns:
+        str: The metrics
+    """
+    requests = _Family(
+        "fbchat_requests_total",
+        "counter",
+        "Requests sent to Facebook, by endpoint and HTTP status.",
+    )
+    errors = _Family(
+        "fbchat_request_errors_total",
+        "counter",
+        "Responses from Facebook containing an error, by error code.",
+    )
+    durations = _Family(
+        "fbchat_request_duration_seconds",
+        "histogram",
+        "Time taken by requests to Facebook.",
+    )
+    sizes = _Family(
+        "fbchat_response_size_bytes", "histogram", "Size of responses from Facebook."
+    )
+    events = _Family("fbchat_events_total", "counter", "Events received, by type.")
+    handlers = _Family(
+        "fbchat_handler_duration_seconds", "histogram", "Time taken by event handlers."
+    )
+    overruns = _Family(
+        "fbchat_handler_overruns_total",
+        "counter",
+        "Event handlers abandoned for exceeding their time budget.",
+    )
+    queued = _Family(
+        "fbchat_events_queued",
+        "gauge",
+        "Events received, but not yet consumed from Client.events.",
+    )
+    presence = _Family(
+        "fbchat_presence_users", "gauge", "Users with a known active status."
+    )
+
+    for client in clients:
+        account = [("account", client.uid)]
+        endpoints = client._state._request_metrics.endpoints
+        for (endpoint, doc_ids), stats in sorted(
+            list(endpoints.items()), key=lambda item: (item[0][0], item[0][1] or "")
+        ):
+            labels = account + [("endpoint", endpoint), ("doc_id", doc_ids)]
+            for status, count in sorted(
+                list(stats.status_codes.items()), key=lambda item: str(item[0])
+            ):
+                status = "none" if status is None else status
+                requests.add(labels + [("status", status)], count)
+            for code, count in sorted(list(stats.error_codes.items())):
+                errors.add(labels + [("code", code)], count)
+            durations.add_histogram(labels, stats.latency)
+            sizes.add_histogram(labels, stats.response_bytes)
+
+        for type_, count in sorted(list(client._event_counts.items())):
+            events.add(account + [("type", type_)], count)
+        for name, histogram in sorted(list(client._watchdog.latencies.items())):
+            handlers.add_histogram(account + [("handler", name)], histogram)
+        for name, count in sorted(list(client._watchdog.overruns.items())):
+            overruns.add(account + [("handler", name)], count)
+        backlog = client._event_backlog
+        queued.add(account, len(backlog) if backlog is not None else 0)
+        presence.add(account, len(client._presence))
+
+    families = [
+        requests,
+        errors,
+        durations,
+        sizes,
+        events,
+        handlers,
+        overruns,
+        queued,
+        presence,
+    ]
+    return "\n".join(line for family in families for line in family.lines) + "\n"
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            body = self.server.metrics.render().encode("utf-8")
+        except Exception:
+            log.exception("Could not render metrics")
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("Metrics server: " + format % args)
+
+
+@attr.s(slots=True)
+class MetricsServer:
+    """Serves metrics of clients over HTTP, in the Prometheus text format.
+
+    The metrics are served at ``/metrics``, and include requests sent to Facebook
+    by endpoint, status and error code, events received by type, event handler
+    latency, and the number of queued events. Each client is labeled by its ID.
+
+    Example:
+        Serve metrics of a client at ``http://localhost:9100/metrics``::
+
+            server = fbchat.MetricsServer(port=9100)
+            server.add(client)
+            server.start()
+            client.listen()
+    """
+
+    #: The host to listen on
+    host = attr.ib("127.0.0.1")
+    #: The port to listen on. ``0`` picks a free port, see `address`
+    port = attr.ib(9100)
+    _clients = attr.ib(factory=list, init=False, repr=False)
+    _server = attr.ib(None, init=False, repr=False)
+
+    @property
+    def address(self):
+        """The ``(host, port)`` tuple the server is listening on."""
+        return self._server.server_address
+
+    def add(self, client):
+        """Serve metrics of a client."""
+        if client not in self._clients:
+            self._clients.append(client)
+
+    def remove(self, client):
+        """Stop serving metrics of a client."""
+        self._clients.remove(client)
+
+    def render(self):
+        """Return the current metrics, in the Prometheus text format."""
+        return format_metrics(list(self._clients))
+
+    def start(self):
+        """Start serving metrics in a background thread."""
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.metrics = self
+        thread = threading.Thread(
+            target=self._server.serve_forever, name="fbchat-metrics", daemon=True
+        )
+        thread.start()
+
+    def stop(self):
+        """Stop serving metrics."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,12 +1,17 @@
 import attr
 import bs4
+import collections
+import functools
+import itertools
+import logging
 import re
 import requests
 import random
+import time
 import urllib.parse
 
 from ._core import log
-from . import _graphql, _util, _exception
+from . import _graphql, _util, _exception, _metrics, _trace
 
 FB_DTSG_REGEX = re.compile(r'name="fb_dtsg" value="(.*?)"')
 
@@ -45,7 +50,7 @@ def _2fa_helper(session, code, r):
     soup = find_input_fields(r.text)
     data = dict()
 
-    url = "https://m.facebook.com/login/checkpoint/"
+    url = _util.prefix_url("https://m.facebook.com/login/checkpoint/")
 
     data["approvals_code"] = code
     data["fb_dtsg"] = soup.find("input", {"name": "fb_dtsg"})["value"]
@@ -98,6 +103,98 @@ def _2fa_helper(session, code, r):
     return r
 
 
+@attr.s(slots=True)
+class Timeouts:
+    """Timeouts used for requests to Facebook.
+
+    Each timeout is given in seconds, either as a ``(connect, read)`` tuple, or as a
+    single number used for both, like `requests` accepts.
+    """
+
+    #: Used for requests not covered by the other timeouts
+    default = attr.ib((10, 30))
+    #: Used when listening. Facebook holds these requests open until there's new
+    #: data, so the read timeout must be longer than that
+    pull = attr.ib((10, 60))
+    #: Used when sending messages
+    send = attr.ib((10, 30))
+    #: Used when uploading files
+    upload = attr.ib((10, 120))
+    #: Used for GraphQL requests
+    graphql = attr.ib((10, 30))
+    #: Whether to derive the read timeout of `pull` from how long Facebook has been
+    #: holding pull requests. It's never shorter than the read timeout of `pull`
+    adaptive_pull = attr.ib(False)
+    #: The longest read timeout the adaptive pull timeout may use
+    max_pull = attr.ib(120)
+    _hold_times = attr.ib(
+        factory=lambda: collections.deque(maxlen=20), init=False, repr=False
+    )
+
+    def get_pull(self):
+        """Get the timeout to use for the next pull request.
+
+        The adaptive read timeout is never shorter than the read timeout of `pull`.
+        """
+        if not self.adaptive_pull or not self._hold_times:
+            return self.pull
+        connect, read = self.pull if isinstance(self.pull, tuple) else (self.pull,) * 2
+        # Leave some margin, so a slightly longer hold doesn't time out
+        adaptive = min(max(self._hold_times) * 1.25 + 5, self.max_pull)
+        return connect, max(read, adaptive)
+
+    def observe_pull_hold(self, seconds):
+        """Record how long Facebook held a pull request that returned no data."""
+        self._hold_times.append(seconds)
+
+    def observe_pull_timeout(self, timeout):
+        """Record that a pull request timed out, after ``timeout`` seconds.
+
+        Facebook held the request for at least as long, so the next read timeout
+        grows from it.
+        """
+        read = timeout[1] if isinstance(timeout, tuple) else timeout
+        self._hold_times.append(read)
+
+
+@attr.s(slots=True)
+class PayloadLogger:
+    """Logs responses from Facebook at the ``DEBUG`` level.
+
+    Responses can be megabytes large, so only every ``sample_rate``'th response from
+    each endpoint is logged, truncated to ``max_size`` characters.
+    """
+
+    #: Log one in every ``sample_rate`` responses from each endpoint. Less than 1
+    #: disables logging
+    sample_rate = attr.ib(1)
+    #: The max. number of characters of a response to log
+    max_size = attr.ib(4096)
+    #: Paths of the endpoints to log responses from, or ``None`` for all endpoints
+    endpoints = attr.ib(None)
+    _counts = attr.ib(factory=collections.Counter, init=False, repr=False)
+
+    def log(self, endpoint, content):
+        if self.sample_rate < 1 or not log.isEnabledFor(logging.DEBUG):
+            return
+        if self.endpoints is not None and endpoint not in self.endpoints:
+            return
+        # Not thread-safe, but a race only makes the sampling slightly uneven
+        count = self._counts[endpoint]
+        self._counts[endpoint] = count + 1
+        if count % self.sample_rate:
+            return
+        size = len(content)
+        if size > self.max_size:
+            content = content[: self.max_size] + "... ({} more)".format(
+                size - self.max_size
+            )
+        log.debug(
+            "Response from {}: {}".format(endpoint, content),
+            extra={"fbchat_endpoint": endpoint, "fbchat_response_size": size},
+        )
+
+
 @attr.s(slots=True)  # TODO i Python 3: Add kw_only=True
 class State:
     """Stores and manages state required for most Facebook requests."""
@@ -106,15 +203,19 @@ class State:
     _fb_dtsg = attr.ib()
     _revision = attr.ib()
     _session = attr.ib(factory=session_factory)
-    _counter = attr.ib(0)
+    _counter = attr.ib(factory=lambda: itertools.count(1))
     _client_id = attr.ib(factory=client_id_factory)
     _logout_h = attr.ib(None)
+    _timeouts = attr.ib(factory=Timeouts)
+    _request_metrics = attr.ib(factory=_metrics.RequestMetrics)
+    _request_callbacks = attr.ib(factory=list)
+    _payload_logger = attr.ib(factory=PayloadLogger)
 
     def get_params(self):
-        self._counter += 1  # TODO: Make this operation atomic / thread-safe
+        # `next` on an `itertools.count` is atomic, so this is thread-safe
         return {
             "__a": 1,
-            "__req": _util.str_base(self._counter, 36),
+            "__req": _util.str_base(next(self._counter), 36),
             "__rev": self._revision,
             "fb_dtsg": self._fb_dtsg,
         }
@@ -123,7 +224,8 @@ class State:
     def login(cls, email, password, on_2fa_callback):
         session = session_factory()
 
-        soup = find_input_fields(session.get("https://m.facebook.com/").text)
+        r = session.get(_util.prefix_url("https://m.facebook.com/"))
+        soup = find_input_fields(r.text)
         data = dict(
             (elem["name"], elem["value"])
             for elem in soup
@@ -133,7 +235,8 @@ class State:
         data["pass"] = password
         data["login"] = "Log In"
 
-        r = session.post("https://m.facebook.com/login.php?login_attempt=1", data=data)
+        url = _util.prefix_url("https://m.facebook.com/login.php?login_attempt=1")
+        r = session.post(url, data=data)
 
         # Usually, 'Checkpoint' will refer to 2FA
         if "checkpoint" in r.url and ('id="approvals_code"' in r.text.lower()):
@@ -142,7 +245,8 @@ class State:
 
         # Sometimes Facebook tries to show the user a "Save Device" dialog
         if "save-device" in r.url:
-            r = session.get("https://m.facebook.com/login/save-device/cancel/")
+            url = _util.prefix_url("https://m.facebook.com/login/save-device/cancel/")
+            r = session.get(url)
 
         if is_home(r.url):
             return cls.from_session(session=session)
@@ -154,7 +258,7 @@ class State:
 
     def is_logged_in(self):
         # Send a request to the login url, to see if we're directed to the home page
-        url = "https://m.facebook.com/login.php?login_attempt=1"
+        url = _util.prefix_url("https://m.facebook.com/login.php?login_attempt=1")
         r = self._session.get(url, allow_redirects=False)
         return "Location" in r.headers and is_home(r.headers["Location"])
 
@@ -206,36 +310,103 @@ class State:
         session.cookies = requests.cookies.merge_cookies(session.cookies, cookies)
         return cls.from_session(session=session)
 
-    def _get(self, url, params, error_retries=3):
+    def _record_request(self, sample):
+        self._request_metrics.observe(sample)
+        for callback in self._request_callbacks:
+            try:
+                callback(sample)
+            except Exception:
+                log.exception("Request callback {} failed".format(callback))
+
+    def _request(self, method, url, parse, doc_ids=(), **kwargs):
+        url = _util.prefix_url(url)
+        sample = _metrics.RequestSample(
+            endpoint=urllib.parse.urlparse(url).path, method=method, doc_ids=doc_ids
+        )
+        started_at = time.monotonic()
+        try:
+            with _trace.span(
+                "{} {}".format(method, sample.endpoint),
+                endpoint=sample.endpoint,
+                doc_ids=",".join(doc_ids) or None,
+            ) as span:
+                if method == "GET":
+                    r = self._session.get(url, **kwargs)
+                else:
+                    r = self._session.post(url, **kwargs)
+                sample.status_code = r.status_code
+                body = getattr(getattr(r, "request", None), "body", None)
+                sample.request_bytes = len(body) if body else 0
+                sample.response_bytes = len(r._content or b"")
+                span.set_attribute("status_code", sample.status_code)
+                span.set_attribute("response_bytes", sample.response_bytes)
+                content = _util.check_request(r)
+            self._payload_logger.log(sample.endpoint, content)
+            with _trace.span("parse", endpoint=sample.endpoint):
+                j = parse(content)
+            if isinstance(j, dict) and "error" in j:
+                sample.error_code = j["error"]
+            return j
+        except Exception as e:
+            sample.exception = e
+            sample.error_code = getattr(e, "fb_error_code", None)
+            raise
+        finally:
+            sample.duration = time.monotonic() - started_at
+            self._record_request(sample)
+
+    def _get(self, url, params, error_retries=3, timeout=None):
+        params.update(self.get_params())
+        return self._request(
+            "GET",
+            url,
+            _util.to_json,
+            params=params,
+            timeout=timeout or self._timeouts.default,
+        )
+
+    def _prepare_get(self, url, params):
+        """Prepare a GET request like `_get`, to be sent with another HTTP client."""
         params.update(self.get_params())
-        r = self._session.get(_util.prefix_url(url), params=params)
-        content = _util.check_request(r)
-        return _util.to_json(content)
+        request = requests.Request("GET", _util.prefix_url(url), params=params)
+        return self._session.prepare_request(request)
 
-    def _post(self, url, data, files=None, as_graphql=False):
+    def _post(self, url, data, files=None, as_graphql=False, timeout=None, doc_ids=()):
         data.update(self.get_params())
-        r = self._session.post(_util.prefix_url(url), data=data, files=files)
-        content = _util.check_request(r)
-        if as_graphql:
-            return _graphql.response_to_json(content)
-        else:
-            return _util.to_json(content)
+        return self._request(
+            "POST",
+            url,
+            _graphql.response_to_json if as_graphql else _util.to_json,
+            doc_ids=doc_ids,
+            data=data,
+            files=files,
+            timeout=timeout or self._timeouts.default,
+        )
 
-    def _payload_post(self, url, data, files=None):
-        j = self._post(url, data, files=files)
+    def _payload_post(self, url, data, files=None, timeout=None):
+        j = self._post(url, data, files=files, timeout=timeout)
         _util.handle_payload_error(j)
         try:
             return j["payload"]
         except (KeyError, TypeError):
             raise _exception.FBchatException("Missing payload: {}".format(j))
 
-    def _graphql_requests(self, *queries):
+    def _graphql_requests(self, *queries, return_errors=False):
         data = {
             "method": "GET",
             "response_format": "json",
             "queries": _graphql.queries_to_json(*queries),
         }
-        return self._post("/api/graphqlbatch/", data, as_graphql=True)
+        data.update(self.get_params())
+        doc_ids = {query.get("doc_id") or query.get("query_id") for query in queries}
+        return self._request(
+            "POST",
+            "/api/graphqlbatch/",
+            functools.partial(_graphql.response_to_json, return_errors=return_errors),
+            doc_ids=tuple(sorted(str(doc_id) for doc_id in doc_ids if doc_id)),
+            data=data,
+            timeout=self._timeouts.graphql,
+        )
 
     def _upload(self, files, voice_clip=False):
         """Upload files to Facebook.
@@ -250,7 +421,10 @@ class State:
         data = {"voice_clip": voice_clip}
 
         j = self._payload_post(
-            "https://upload.facebook.com/ajax/mercury/upload.php", data, files=file_dict
+            "https://upload.facebook.com/ajax/mercury/upload.php",
+            data,
+            files=file_dict,
+            timeout=self._timeouts.upload,
         )
 
         if len(j["metadata"]) != len(files):
@@ -273,7 +447,7 @@ class State:
         data["message_id"] = offline_threading_id
         data["threading_id"] = _util.generate_message_id(self._client_id)
         data["ephemeral_ttl_mode:"] = "0"
-        j = self._post("/messaging/send/", data)
+        j = self._post("/messaging/send/", data, timeout=self._timeouts.send)
 
         # update JS token if received in response
         fb_dtsg = _util.get_jsmods_require(j, 2)
@@ -0,0 +1,191 @@
+import bisect
+import copy
+import threading
+from . import _util, _event, _iterators
+from ._thread import ThreadType, ThreadLocation
+
+
+class _SnapshotIterator(_iterators.ThreadIterator):
+    """Like `ThreadIterator`, but also records what the index needs.
+
+    That is the unread threads, and the sequence ID of the first page, from which
+    events should be pulled to not miss any changes made after the snapshot.
+    """
+
+    def __init__(self, client, thread_location):
+        super().__init__(client, thread_location)
+        self.sequence_id = None
+        self.unread = set()
+
+    def _fetch(self, before):
+        include_seq_id = before is None
+        j = self._client._fetch_thread_list(
+            20,
+            self._thread_location,
+            _util.millis_to_datetime(before) if before is not None else None,
+            include_seq_id=include_seq_id,
+        )
+        if include_seq_id:
+            self.sequence_id = j.get("sync_sequence_id")
+        threads = self._client._parse_thread_list(j["nodes"])
+        for node, thread in zip(j["nodes"], threads):
+            if node.get("unread_count"):
+                self.unread.add(thread.uid)
+        return threads
+
+
+class ThreadIndex:
+    """An in-memory index of threads, ordered by when they were last active.
+
+    Created by `Client.create_thread_index`, from a snapshot of the thread list, and
+    kept up to date while the client is listening, from new messages, threads being
+    marked as read, title changes, and people being added or removed. Queries are
+    answered without sending any requests.
+
+    Threads first seen while listening are assumed to be in the inbox.
+
+    Threads are returned as copies, since the indexed threads are changed while
+    listening, possibly in another thread.
+    """
+
+    def __init__(self, user_id):
+        self._user_id = user_id
+        self._threads = {}
+        self._locations = {}
+        self._unread = set()
+        # Sorted list of ``(-last active in milliseconds, thread ID)``
+        self._order = []
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._threads)
+
+    def __contains__(self, thread_id):
+        with self._lock:
+            return str(thread_id) in self._threads
+
+    def get(self, thread_id):
+        """Return the :class:`Thread` with ID ``thread_id``, or ``None``."""
+        with self._lock:
+            return copy.deepcopy(self._threads.get(str(thread_id)))
+
+    def is_unread(self, thread_id):
+        """Return whether a thread has unread messages."""
+        with self._lock:
+            return str(thread_id) in self._unread
+
+    def recent(self, limit=None, thread_location=None):
+        """Return the most recently active threads, from newest to oldest.
+
+        Args:
+            limit (int): Max. number of threads to return (default all threads)
+            thread_location (ThreadLocation): Only return threads in this location
+
+        Returns:
+            list: :class:`Thread` objects
+        """
+        return self._query(limit, thread_location, unread_only=False)
+
+    def unread(self, limit=None, thread_location=None):
+        """Return the threads with unread messages, from newest to oldest.
+
+        Args:
+            limit (int): Max. number of threads to return (default all threads)
+            thread_location (ThreadLocation): Only return threads in this location
+
+        Returns:
+            list: :class:`Thread` objects
+        """
+        return self._query(limit, thread_location, unread_only=True)
+
+    def _query(self, limit, thread_location, unread_only):
+        rtn = []
+        with self._lock:
+            for _, thread_id in self._order:
+                if limit is not None and len(rtn) >= limit:
+                    break
+                if unread_only and thread_id not in self._unread:
+                    continue
+                if (
+                    thread_location is not None
+                    and self._locations[thread_id] != thread_location
+                ):
+                    continue
+                rtn.append(copy.deepcopy(self._threads[thread_id]))
+        return rtn
+
+    def _add(self, thread, thread_location, unread):
+        with self._lock:
+            self._threads[thread.uid] = thread
+            self._locations[thread.uid] = thread_location
+            if unread:
+                self._unread.add(thread.uid)
+            self._reorder(thread)
+
+    def _reorder(self, thread):
+        old_key = self._keys.get(thread.uid)
+        if old_key is not None:
+            del self._order[bisect.bisect_left(self._order, old_key)]
+        millis = 0
+        if thread.last_active is not None:
+            millis = _util.datetime_to_millis(thread.last_active)
+        key = (-millis, thread.uid)
+        bisect.insort(self._order, key)
+        self._keys[thread.uid] = key
+
+    def _touch(self, thread_id, thread_type, at):
+        """Get a thread, adding it if it's unknown, and mark it active at ``at``."""
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            thread = thread_type._to_class()(thread_id)
+            self._threads[thread_id] = thread
+            self._locations[thread_id] = ThreadLocation.INBOX
+        if at is not None and (thread.last_active is None or at > thread.last_active):
+            thread.last_active = at
+        self._reorder(thread)
+        return thread
+
+    def _remove(self, thread_id):
+        self._threads.pop(thread_id, None)
+        self._locations.pop(thread_id, None)
+        self._unread.discard(thread_id)
+        key = self._keys.pop(thread_id, None)
+        if key is not None:
+            del self._order[bisect.bisect_left(self._order, key)]
+
+    def _apply(self, events):
+        """Update the index from events received while listening."""
+        with self._lock:
+            for event in events:
+                self._apply_event(event)
+
+    def _apply_event(self, event):
+        if isinstance(event, _event.MessageEvent):
+            self._touch(event.thread_id, event.thread_type, event.at)
+            if event.author_id == self._user_id:
+                self._unread.discard(event.thread_id)
+            else:
+                self._unread.add(event.thread_id)
+        elif isinstance(event, _event.MarkedSeenEvent):
+            if event.threads:
+                self._unread.difference_update(id_ for id_, _ in event.threads)
+            else:
+                # Whole folders were marked as read
+                self._unread.clear()
+        elif isinstance(event, _event.TitleChangeEvent):
+            thread = self._touch(event.thread_id, event.thread_type, event.at)
+            if thread.type == ThreadType.GROUP:
+                thread.name = event.new_title
+        elif isinstance(event, _event.PeopleAddedEvent):
+            thread = self._touch(event.thread_id, ThreadType.GROUP, event.at)
+            if thread.type == ThreadType.GROUP:
+                thread.participants.update(event.added_ids)
+        elif isinstance(event, _event.PersonRemovedEvent):
+            if event.removed_id == self._user_id:
+                self._remove(event.thread_id)
+            else:
+                thread = self._touch(event.thread_id, ThreadType.GROUP, event.at)
+                if thread.type == ThreadType.GROUP:
+                    thread.participants.discard(event.removed_id)
@@ -0,0 +1,262 @@
+import attr
+import collections
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from ._core import log
+
+# The span currently active in each thread
+_local = threading.local()
+
+
+def current_span():
+    """Return the span active in the current thread, or ``None``."""
+    return getattr(_local, "span", None)
+
+
+@attr.s(slots=True, cmp=False)
+class Span:
+    """A timed operation, e.g. a call to a `Client` method, or a request it sent.
+
+    Spans started while another span is active become its children.
+    """
+
+    #: The name of the operation, e.g. ``Client.fetch_thread_info``
+    name = attr.ib()
+    #: The `Tracer` that started the span
+    tracer = attr.ib(repr=False)
+    #: The span this is a child of, or ``None``
+    parent = attr.ib(None, repr=False)
+    #: Dictionary of details about the operation, e.g. the endpoint of a request
+    attributes = attr.ib(factory=dict)
+    #: Spans started while this span was active
+    children = attr.ib(factory=list, repr=False)
+    #: Unix timestamp of when the span started
+    start_time = attr.ib(None)
+    #: Number of seconds the span took, or ``None`` if it hasn't ended
+    duration = attr.ib(None)
+    #: The exception raised in the span, if any
+    error = attr.ib(None)
+    _started_at = attr.ib(None, repr=False)
+    _previous = attr.ib(None, repr=False)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Make this the current span in this thread, without starting or ending it.
+
+        Use as a context manager, e.g. to run work in another thread as part of it.
+        """
+        previous = current_span()
+        _local.span = self
+        try:
+            yield self
+        finally:
+            _local.span = previous
+
+    def _start(self):
+        self.start_time = time.time()
+        self._started_at = time.perf_counter()
+        self.tracer.on_start(self)
+
+    def _end(self, error=None):
+        self.duration = time.perf_counter() - self._started_at
+        self.error = error
+        try:
+            self.tracer.on_end(self)
+        except Exception:
+            log.exception("Tracer {} failed".format(self.tracer))
+
+    def __enter__(self):
+        self._start()
+        self._previous = current_span()
+        _local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.span = self._previous
+        self._previous = None
+        self._end(exc_value)
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **attributes):
+    """Start a child of the current span, or do nothing if nothing is being traced.
+
+    Use as a context manager.
+    """
+    parent = current_span()
+    if parent is None:
+        return _NOOP_SPAN
+    return parent.tracer.start_span(name, attributes)
+
+
+def propagate(func):
+    """Wrap ``func`` to run as part of the current span, e.g. in another thread."""
+    parent = current_span()
+    if parent is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with parent.activate():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _traced_generator(func, name):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._tracer is None:
+            return (yield from func(self, *args, **kwargs))
+        # The span lasts until iteration stops, but is only the current span while
+        # the generator runs, not while the caller consumes what it yielded
+        span = self._tracer.start_span(name)
+        span._start()
+        generator = func(self, *args, **kwargs)
+        error = None
+        try:
+            while True:
+                with span.activate():
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                yield item
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with span.activate():
+                generator.close()
+            span._end(error)
+
+    return wrapper
+
+
+def traced(func):
+    """Decorate a `Client` method, to trace it with the client's tracer.
+
+    The span of a generator method lasts until iteration stops.
+    """
+    name = "Client." + func.__name__
+    if inspect.isgeneratorfunction(func):
+        return _traced_generator(func, name)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._tracer is None:
+            return func(self, *args, **kwargs)
+        with self._tracer.start_span(name):
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Tracer:
+    """Traces the methods of a client, and the requests and parsing they do.
+
+    Each public `Client` method called gets a span, with child spans for each
+    request sent to Facebook and each response parsed. The most recent traces, that
+    is spans without a parent, are kept in `traces`.
+
+    Subclass and override `on_start` and `on_end` to export spans elsewhere.
+
+    Example:
+        Print where the time went in a call::
+
+            tracer = fbchat.Tracer()
+            client.set_tracer(tracer)
+            client.fetch_thread_info(thread_id)
+            for span in tracer.traces[-1].children:
+                print(span.name, span.attributes, span.duration)
+
+    Args:
+        max_traces: Number of traces to keep
+    """
+
+    def __init__(self, max_traces=100):
+        #: The most recent traces, oldest first
+        self.traces = collections.deque(maxlen=max_traces)
+
+    def start_span(self, name, attributes=None):
+        """Create a span, as a child of the current span in this thread.
+
+        The span starts when used as a context manager.
+        """
+        parent = current_span()
+        span = Span(name, self, parent=parent, attributes=attributes or {})
+        if parent is not None:
+            parent.children.append(span)
+        return span
+
+    def on_start(self, span):
+        """Called when a span starts."""
+
+    def on_end(self, span):
+        """Called when a span ends."""
+        if span.parent is None:
+            self.traces.append(span)
+
+
+class OpenTelemetryTracer(Tracer):
+    """Exports spans to `OpenTelemetry <https://opentelemetry.io/>`_.
+
+    Requires the ``opentelemetry-api`` package. Spans are exported with the
+    configured OpenTelemetry tracer provider.
+
+    Args:
+        tracer: An OpenTelemetry tracer. Defaults to ``trace.get_tracer("fbchat")``
+        max_traces: Number of traces to keep in `traces`
+    """
+
+    def __init__(self, tracer=None, max_traces=0):
+        from opentelemetry import trace
+
+        super().__init__(max_traces=max_traces)
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("fbchat")
+        self._spans = {}
+
+    def on_start(self, span):
+        context = None
+        if span.parent in self._spans:
+            context = self._trace.set_span_in_context(self._spans[span.parent])
+        self._spans[span] = self._tracer.start_span(
+            span.name, context=context, start_time=int(span.start_time * 1e9)
+        )
+
+    def on_end(self, span):
+        super().on_end(span)
+        otel_span = self._spans.pop(span, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value)
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(
+                self._trace.Status(self._trace.StatusCode.ERROR, str(span.error))
+            )
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
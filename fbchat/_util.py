@@ -1,5 +1,6 @@
 import datetime
 import json
+import re
 import time
 import random
 import contextlib
@@ -153,9 +154,7 @@ def check_content(content, as_json=True):
 
 def to_json(content):
     content = strip_json_cruft(content)
-    j = parse_json(content)
-    log.debug(j)
-    return j
+    return parse_json(content)
 
 
 def get_jsmods_require(j, index):
@@ -177,6 +176,12 @@ def require_list(list_):
         return set([list_])
 
 
+def chunks(items, size):
+    """Split a sequence into lists of at most ``size`` items."""
+    items = list(items)
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
 def mimetype_to_key(mimetype):
     if not mimetype:
         return "file_id"
@@ -230,9 +235,19 @@ def get_url_parameter(url, param):
     return get_url_parameters(url, param)[0]
 
 
+#: If set, requests are sent to this URL instead of Facebook, e.g. to a local test
+#: server. Only the domain is replaced, so ``https://0-edge-chat.facebook.com/pull``
+#: is sent to ``BASE_URL + "/pull"``
+BASE_URL = None
+
+FACEBOOK_URL_RE = re.compile(r"^https://([\w-]+\.)*facebook\.com(?=/|$)")
+
+
 def prefix_url(url):
     if url.startswith("/"):
-        return "https://www.facebook.com" + url
+        return (BASE_URL or "https://www.facebook.com") + url
+    if BASE_URL:
+        return FACEBOOK_URL_RE.sub(lambda match: BASE_URL, url, count=1)
     return url
 
 
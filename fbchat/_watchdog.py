@@ -0,0 +1,159 @@
+import attr
+import queue
+import time
+import threading
+import concurrent.futures
+from ._core import log
+from . import _metrics
+
+
+class _Worker:
+    """Runs handlers in ``threads`` daemon threads, one at a time in each.
+
+    Unlike the workers of a ``ThreadPoolExecutor``, which are joined when the
+    interpreter exits, a worker stuck in a handler doesn't keep the process alive.
+    """
+
+    def __init__(self, threads=1, name="fbchat-handler"):
+        self._jobs = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._work, name=name, daemon=True)
+            for _ in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func, *args):
+        future = concurrent.futures.Future()
+        self._jobs.put((future, func, args))
+        return future
+
+    def stop(self):
+        """Stop once the current handlers are done."""
+        for _ in self._threads:
+            self._jobs.put(None)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, func, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+@attr.s(slots=True)
+class Watchdog:
+    """Runs event handlers, recording how long each kind of handler takes.
+
+    If ``budget`` is set, handlers are run in a daemon worker thread, and abandoned
+    if they don't finish within ``budget`` seconds. The abandoned handler keeps
+    running in the background, without keeping the process from exiting, and the
+    following handlers are run in a new worker thread.
+
+    At most ``max_abandoned`` handlers are left running at a time. Once that many
+    are, handlers aren't abandoned anymore, but waited for until one of the
+    abandoned handlers finishes, so a service that hangs can't leak threads.
+    """
+
+    #: Max. number of seconds a handler may run, or ``None`` to run handlers inline
+    budget = attr.ib(None)
+    #: Max. number of abandoned handlers left running in the background
+    max_abandoned = attr.ib(8)
+    #: Dictionary of handler names mapped to a `Histogram` of their run time
+    latencies = attr.ib(factory=dict, init=False)
+    #: Dictionary of handler names mapped to the number of times they were abandoned
+    overruns = attr.ib(factory=dict, init=False)
+    _worker = attr.ib(None, init=False, repr=False)
+    _abandoned = attr.ib(factory=set, init=False, repr=False)
+    _lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+
+    def _record(self, name, started_at):
+        histogram = self.latencies.get(name)
+        if histogram is None:
+            histogram = self.latencies.setdefault(name, _metrics.Histogram())
+        histogram.observe(time.monotonic() - started_at)
+
+    @property
+    def abandoned(self):
+        """Number of abandoned handlers that are still running."""
+        with self._lock:
+            return len(self._abandoned)
+
+    def _finish_abandoned(self, name, started_at, on_error, future):
+        with self._lock:
+            self._abandoned.discard(future)
+        self._record(name, started_at)
+        exception = future.exception()
+        if exception is None:
+            return
+        if on_error is None:
+            log.error(
+                "Abandoned handler {} failed".format(name),
+                exc_info=(type(exception), exception, exception.__traceback__),
+            )
+            return
+        try:
+            on_error(exception)
+        except Exception:
+            log.exception("Error handler of {} failed".format(name))
+
+    def run(self, name, func, *args, on_error=None):
+        """Run ``func(*args)``, as the handler ``name``.
+
+        Exceptions raised by ``func`` are propagated. If the handler is abandoned,
+        they are passed to ``on_error`` instead, in the handler's thread, or logged
+        if ``on_error`` isn't set.
+
+        Returns:
+            bool: False if the handler was abandoned because it exceeded ``budget``
+        """
+        started_at = time.monotonic()
+        if self.budget is None:
+            try:
+                func(*args)
+            finally:
+                self._record(name, started_at)
+            return True
+
+        if self._worker is None:
+            self._worker = _Worker()
+        future = self._worker.submit(func, *args)
+        done, _ = concurrent.futures.wait([future], timeout=self.budget)
+        if not done:
+            with self._lock:
+                abandoned = list(self._abandoned)
+            if len(abandoned) >= self.max_abandoned:
+                # Too many threads are stuck already, wait instead of adding another
+                log.warning(
+                    "{} handlers are stuck, waiting for {}".format(len(abandoned), name)
+                )
+                concurrent.futures.wait(
+                    abandoned + [future],
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+            if not future.done():
+                # Let the handler finish in the background, and give the next
+                # handlers a fresh worker, so they don't queue up behind it
+                with self._lock:
+                    self._abandoned.add(future)
+                self._worker.stop()
+                self._worker = None
+                self.overruns[name] = self.overruns.get(name, 0) + 1
+                future.add_done_callback(
+                    lambda future: self._finish_abandoned(
+                        name, started_at, on_error, future
+                    )
+                )
+                return False
+
+        self._record(name, started_at)
+        future.result()  # Propagate exceptions
+        return True
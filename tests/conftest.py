@@ -3,7 +3,10 @@ import json
 
 from utils import *
 from contextlib import contextmanager
-from fbchat import ThreadType, Message, Mention
+from fake_facebook import FakeFacebook
+from fbchat import ThreadType, Message, Mention, Client
+from fbchat import _util
+from fbchat._state import State
 
 
 @pytest.fixture(scope="session")
@@ -125,3 +128,33 @@ def message_with_mentions(request, client, client2, group):
         text += "group, "
     text += "nothing]"
     return Message(text, mentions=mentions)
+
+
+@pytest.fixture
+def offline_client(monkeypatch):
+    """A client that's "logged in" without sending any requests."""
+
+    def set_session(self, session_cookies):
+        self._state = State(user_id="1234", fb_dtsg="", revision=1)
+        self._uid = self._state.user_id
+        return True
+
+    monkeypatch.setattr(Client, "set_session", set_session)
+    monkeypatch.setattr(Client, "is_logged_in", lambda self: True)
+    return Client("email", "password", session_cookies={"c_user": "1234"})
+
+
+@pytest.fixture
+def fake_facebook(monkeypatch):
+    """A local server standing in for Facebook."""
+    with FakeFacebook() as fake:
+        monkeypatch.setattr(_util, "BASE_URL", fake.url)
+        yield fake
+
+
+@pytest.fixture
+def fake_client(fake_facebook):
+    """A client that's logged in to `fake_facebook`."""
+    client = Client("email", "password", session_cookies={"c_user": "1234"})
+    yield client
+    client._state._session.close()
@@ -0,0 +1,465 @@
+"""A local stand-in for Facebook's servers, for testing without real accounts.
+
+Implements the endpoints the client uses when logging in, listening, sending
+messages, uploading files and fetching threads, backed by a small in-memory model
+of users, groups and messages. Latency and errors can be injected.
+
+Point the client at it by setting ``fbchat._util.BASE_URL`` to `FakeFacebook.url`.
+"""
+import collections
+import email.parser
+import itertools
+import json
+import random
+import socketserver
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from fbchat import _util
+
+HOME_PAGE = """<html><body>
+<form action="/logout.php"><input type="hidden" name="h" value="fake_h" /></form>
+<input type="hidden" name="fb_dtsg" value="fake_dtsg" />
+<script>{"client_revision":1,"server_revision":1}</script>
+</body></html>"""
+
+GRAPHQL_THREAD_INFO = "2147762685294928"
+GRAPHQL_THREAD_MESSAGES = "1860982147341344"
+GRAPHQL_THREAD_LIST = "1349387578499440"
+GRAPHQL_MESSAGE_INFO = "1768656253222505"
+
+
+def _flatten(params):
+    return {key: values[-1] for key, values in params.items()}
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # Many clients may connect at once, e.g. when listening with `Listener`
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def log_message(self, *args):
+        pass
+
+    def _read_params(self, url):
+        params = _flatten(urllib.parse.parse_qs(url.query))
+        files = {}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            message = email.parser.BytesParser().parsebytes(
+                b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+            )
+            for part in message.get_payload():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename() is not None:
+                    files[name] = part.get_content_type()
+                else:
+                    params[name] = part.get_payload(decode=True).decode()
+        elif body:
+            params.update(_flatten(urllib.parse.parse_qs(body.decode())))
+        return params, files
+
+    def _respond(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        params, files = self._read_params(url)
+        status, headers, body = self.server.fake._handle(
+            method, url.path, params, files
+        )
+        body = body.encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeFacebook:
+    """A local HTTP server, which responds like Facebook does.
+
+    Args:
+        user_id: ID of the logged in user
+        hold: Max. number of seconds a pull request waits for new events
+    """
+
+    def __init__(self, user_id="1234", hold=0.2):
+        self.user_id = user_id
+        self.hold = hold
+        #: Number of seconds to wait before responding to each request
+        self.latency = 0
+        #: Fraction of requests that fail at random with ``error_status``
+        self.error_rate = 0
+        self.error_status = 500
+        #: Canned responses, by path. Either a JSON object, or a callable taking the
+        #: request parameters and returning one
+        self.responses = {}
+        #: Canned GraphQL responses, by ``doc_id`` or ``query_id``. Either a JSON
+        #: object, or a callable taking the query parameters and returning one.
+        #: ``None`` falls back to the default response, and an object with
+        #: ``"errors"`` fails the query
+        self.graphql = {}
+        #: Requests received, as ``(method, path, params)`` tuples
+        self.requests = []
+        #: User profiles, by ID
+        self.users = {}
+        #: Groups, by ID
+        self.groups = {}
+        #: Message nodes of each thread, by thread ID, oldest first
+        self.messages = collections.defaultdict(list)
+        #: Read watermarks of each thread, by thread ID, then by user ID
+        self.read_receipts = collections.defaultdict(dict)
+        self._failures = collections.defaultdict(list)
+        self._events = collections.deque(maxlen=10000)
+        self._seq = 0
+        self._mids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._random = random.Random(0)
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return "http://{}:{}".format(host, port)
+
+    def start(self):
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        thread = threading.Thread(
+            target=self._server.serve_forever,
+            args=(0.05,),
+            name="fake-facebook",
+            daemon=True,
+        )
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_user(self, user_id, name="Test User", is_friend=True):
+        self.users[str(user_id)] = {
+            "id": str(user_id),
+            "name": name,
+            "firstName": name.split()[0],
+            "type": "friend" if is_friend else "user",
+            "is_friend": is_friend,
+            "gender": 2,
+            "uri": "https://www.facebook.com/{}".format(user_id),
+            "thumbSrc": "https://example.com/{}.jpg".format(user_id),
+        }
+
+    def add_group(self, group_id, name="Test Group", participants=()):
+        self.groups[str(group_id)] = {
+            "id": str(group_id),
+            "name": name,
+            "participants": [self.user_id] + [str(p) for p in participants],
+        }
+
+    def fail(self, path, status=500, error=None, times=1):
+        """Make the next requests to ``path`` fail.
+
+        Args:
+            path: The path, e.g. ``"/pull"``
+            status: The HTTP status code to respond with
+            error: If set, respond with this Facebook error code and status 200
+            times: Number of requests that should fail
+        """
+        with self._condition:
+            self._failures[path].extend([(status, error)] * times)
+
+    def push(self, *ms):
+        """Send events to clients that are listening."""
+        with self._condition:
+            for m in ms:
+                self._seq += 1
+                self._events.append((self._seq, m))
+            self._condition.notify_all()
+
+    def receive_message(self, text, author_id, thread_id=None, timestamp=None):
+        """Store a message, and send it to clients that are listening.
+
+        Args:
+            text: Text of the message
+            author_id: ID of the sender
+            thread_id: ID of the group, or ``None`` for a message to the user
+            timestamp: Time of the message in milliseconds, defaults to now
+
+        Returns:
+            The message ID
+        """
+        thread_id = str(thread_id or author_id)
+        mid = "mid.$fake{}".format(next(self._mids))
+        if timestamp is None:
+            timestamp = _util.now()
+        self.messages[thread_id].append(
+            {
+                "message_id": mid,
+                "message_sender": {"id": str(author_id)},
+                "message": {"text": text, "ranges": []},
+                "timestamp_precise": str(timestamp),
+                "unread": False,
+                "message_reactions": [],
+                "tags_list": ["source:chat:web"],
+                "blob_attachments": [],
+            }
+        )
+        if thread_id in self.groups:
+            thread_key = {"threadFbId": int(thread_id)}
+        else:
+            thread_key = {"otherUserFbId": int(thread_id)}
+        delta = {
+            "class": "NewMessage",
+            "body": text,
+            "messageMetadata": {
+                "messageId": mid,
+                "actorFbId": int(author_id),
+                "timestamp": str(timestamp),
+                "threadKey": thread_key,
+                "tags": ["source:chat:web"],
+            },
+        }
+        self.push({"type": "delta", "delta": delta})
+        return mid
+
+    def _handle(self, method, path, params, files):
+        with self._condition:
+            self.requests.append((method, path, params))
+            failure = None
+            if self._failures.get(path):
+                failure = self._failures[path].pop(0)
+            elif self.error_rate and self._random.random() < self.error_rate:
+                failure = (self.error_status, None)
+        if self.latency:
+            time.sleep(self.latency)
+
+        if failure is not None:
+            status, error = failure
+            if error is None:
+                return status, {}, "Error {}".format(status)
+            body = {"error": error, "errorDescription": "Injected error"}
+            return 200, {}, "for (;;);" + json.dumps(body)
+
+        if path in ("/", "/home.php"):
+            return 200, {"Content-Type": "text/html"}, HOME_PAGE
+        if path == "/login.php":
+            return 302, {"Location": "/home.php"}, ""
+
+        response = self.responses.get(path)
+        if callable(response):
+            response = response(params)
+        if response is None:
+            handler = {
+                "/pull": self._pull,
+                "/active_ping": lambda params: {"t": "pong"},
+                "/messaging/send/": self._send,
+                "/ajax/mercury/upload.php": lambda params: self._upload(files),
+                "/chat/user_info/": self._user_info,
+                "/api/graphqlbatch/": self._graphql_batch,
+                "/ajax/mercury/search_snippets.php": self._search_snippets,
+            }.get(path, lambda params: {"payload": {}})
+            response = handler(params)
+        if isinstance(response, str):
+            return 200, {}, response
+        return 200, {}, "for (;;);" + json.dumps(response)
+
+    def _pull(self, params):
+        if "sticky_token" not in params:
+            return {
+                "t": "lb",
+                "seq": params.get("seq", "0"),
+                "lb_info": {"sticky": "fake_sticky", "pool": "fake_pool"},
+            }
+        seq = int(params.get("seq") or 0)
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > seq, timeout=self.hold)
+            ms = [m for event_seq, m in self._events if event_seq > seq]
+            seq = self._seq
+        if not ms:
+            return {"t": "heartbeat", "seq": seq}
+        return {"t": "msg", "seq": seq, "ms": ms}
+
+    def _send(self, params):
+        thread_id = params.get("thread_fbid") or params.get("other_user_fbid")
+        mid = self.receive_message(params.get("body"), self.user_id, thread_id)
+        action = {"message_id": mid, "thread_fbid": params.get("thread_fbid")}
+        return {"payload": {"actions": [action]}}
+
+    def _upload(self, files):
+        metadata = []
+        for i, mimetype in enumerate(files.values()):
+            metadata.append(
+                {"filetype": mimetype, _util.mimetype_to_key(mimetype): 1000 + i}
+            )
+        return {"payload": {"metadata": metadata}}
+
+    def _user_info(self, params):
+        ids = [value for key, value in params.items() if key.startswith("ids[")]
+        profiles = {id_: self.users[id_] for id_ in ids if id_ in self.users}
+        return {"payload": {"profiles": profiles}}
+
+    def _search_snippets(self, params):
+        query, thread_id = params["query"], params["thread_fbid"]
+        offset, limit = int(params["snippetOffset"]), int(params["snippetLimit"])
+        found = [
+            {"message_id": m["message_id"]}
+            for m in reversed(self.messages.get(thread_id, []))
+            if query in m["message"]["text"]
+        ]
+        result = {thread_id: {"snippets": found[offset : offset + limit]}}
+        return {"payload": {"search_snippets": {query: result if found else {}}}}
+
+    def _graphql_batch(self, params):
+        queries = json.loads(params["queries"])
+        lines = []
+        for key, query in sorted(queries.items()):
+            query_id = query.get("doc_id") or query.get("query_id")
+            query_params = query.get("query_params") or {}
+            data = self.graphql.get(query_id)
+            if callable(data):
+                data = data(query_params)
+            if data is None:
+                data = self._graphql_data(query_id, query_params)
+            if isinstance(data, dict) and "errors" in data:
+                lines.append(json.dumps({key: data}))  # A failed query
+            else:
+                lines.append(json.dumps({key: {"data": data}}))
+        summary = {"successful_results": len(lines), "error_results": 0}
+        lines.append(json.dumps(summary))
+        return "\n".join(lines)
+
+    def _graphql_data(self, query_id, params):
+        if query_id == GRAPHQL_THREAD_INFO:
+            return {"message_thread": self._thread_node(params["id"])}
+        if query_id == GRAPHQL_THREAD_MESSAGES:
+            node = self._thread_node(
+                params["id"], params["message_limit"], params["before"]
+            )
+            if node is not None and params["load_read_receipts"]:
+                node["read_receipts"]["nodes"] = [
+                    {"watermark": str(watermark), "actor": {"id": user_id}}
+                    for user_id, watermark in self.read_receipts[params["id"]].items()
+                ]
+            return {"message_thread": node}
+        if query_id == GRAPHQL_MESSAGE_INFO:
+            ids = params["thread_and_message_id"]
+            for message in self.messages.get(ids["thread_id"], []):
+                if message["message_id"] == ids["message_id"]:
+                    return {"message": message}
+            return {"message": None}
+        if query_id == GRAPHQL_THREAD_LIST:
+            thread_ids = list(self.groups) + [
+                thread_id for thread_id in self.messages if thread_id in self.users
+            ]
+            nodes = [self._thread_node(thread_id, 1) for thread_id in thread_ids]
+            nodes = [node for node in nodes if node is not None]
+            nodes.sort(key=self._last_timestamp, reverse=True)
+            if params.get("before") is not None:
+                # Inclusive, like Facebook
+                nodes = [
+                    n for n in nodes if self._last_timestamp(n) <= params["before"]
+                ]
+            nodes = nodes[: params["limit"]]
+            for node in nodes:
+                node["unread_count"] = self._unread_count(node)
+            threads = {"nodes": nodes}
+            if params.get("includeSeqID"):
+                threads["sync_sequence_id"] = str(self._seq)
+            return {"viewer": {"message_threads": threads}}
+        return {}
+
+    @staticmethod
+    def _last_timestamp(node):
+        if "last_message" not in node:
+            return 0
+        return int(node["last_message"]["nodes"][0]["timestamp_precise"])
+
+    def _unread_count(self, node):
+        thread_id = node["thread_key"].get("thread_fbid") or node["thread_key"].get(
+            "other_user_id"
+        )
+        watermark = self.read_receipts[thread_id].get(self.user_id, 0)
+        return sum(
+            1
+            for m in self.messages.get(thread_id, [])
+            if m["message_sender"]["id"] != self.user_id
+            and int(m["timestamp_precise"]) > watermark
+        )
+
+    def _actor_node(self, user_id):
+        user = self.users.get(user_id, {})
+        return {
+            "messaging_actor": {
+                "id": user_id,
+                "name": user.get("name"),
+                "short_name": user.get("firstName"),
+                "url": user.get("uri"),
+                "gender": "FEMALE",
+                "is_viewer_friend": user.get("is_friend"),
+                "big_image_src": {"uri": user.get("thumbSrc")},
+            }
+        }
+
+    def _thread_node(self, thread_id, message_limit=0, before=None):
+        thread_id = str(thread_id)
+        messages = self.messages.get(thread_id, [])
+        if before is not None:
+            # Inclusive, like Facebook
+            messages = [m for m in messages if int(m["timestamp_precise"]) <= before]
+        node = {
+            "messages_count": len(messages),
+            "messages": {"nodes": messages[-message_limit:] if message_limit else []},
+            "read_receipts": {"nodes": []},
+            "customization_info": None,
+            "event_reminders": {"nodes": []},
+        }
+        if messages:
+            node["last_message"] = {"nodes": [messages[-1]]}
+        if thread_id in self.groups:
+            group = self.groups[thread_id]
+            participants = [self._actor_node(p) for p in group["participants"]]
+            node.update(
+                {
+                    "thread_key": {"thread_fbid": thread_id},
+                    "thread_type": "GROUP",
+                    "name": group["name"],
+                    "image": None,
+                    "all_participants": {"nodes": participants},
+                    "thread_admins": [{"id": self.user_id}],
+                    "approval_mode": 0,
+                    "group_approval_queue": {"nodes": []},
+                    "joinable_mode": {"mode": "0", "link": ""},
+                }
+            )
+        elif thread_id in self.users:
+            participants = [self._actor_node(p) for p in (self.user_id, thread_id)]
+            node.update(
+                {
+                    "thread_key": {"other_user_id": thread_id},
+                    "thread_type": "ONE_TO_ONE",
+                    "all_participants": {"nodes": participants},
+                }
+            )
+        else:
+            return None
+        return node
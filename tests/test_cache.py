@@ -0,0 +1,66 @@
+import pytest
+
+from fbchat._cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_lru_eviction(clock):
+    cache = LRUCache(maxsize=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_expiry(clock):
+    cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 5
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_add(clock):
+    cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+    assert cache.add(("NewMessage", None, "mid.1"))
+    assert not cache.add(("NewMessage", None, "mid.1"))
+    assert cache.add(("deltaMessageReply", "mid.1"))
+    clock.now = 10
+    assert cache.add(("NewMessage", None, "mid.1"))
+
+
+def test_pop(clock):
+    cache = LRUCache(clock=clock)
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", 2) == 2
+
+
+def test_replace(clock):
+    cache = LRUCache(ttl=10, clock=clock)
+    assert not cache.replace("a", 1)
+    assert "a" not in cache
+    cache.set("a", 1)
+    clock.now = 8
+    assert cache.replace("a", 2)
+    assert cache.get("a") == 2
+    clock.now = 11  # Replacing didn't renew the entry
+    assert "a" not in cache
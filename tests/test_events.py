@@ -0,0 +1,192 @@
+import time
+import threading
+import pickle
+
+from fbchat import ThreadType, Message, MessageEvent, TypingEvent, UnknownEvent
+
+
+def new_message(mid, text="Hello", thread_fbid=None):
+    thread_key = {"threadFbId": thread_fbid} if thread_fbid else {"otherUserFbId": 4321}
+    return {
+        "type": "delta",
+        "delta": {
+            "class": "NewMessage",
+            "body": text,
+            "messageMetadata": {
+                "messageId": mid,
+                "actorFbId": 4321,
+                "timestamp": "1500000000000",
+                "threadKey": thread_key,
+                "tags": [],
+            },
+        },
+    }
+
+
+def typing():
+    return {"type": "typ", "from": 4321, "to": 1234, "st": 1}
+
+
+def catch_events(client):
+    caught = []
+    client.on_event = caught.append
+    return caught
+
+
+def receive(client, *ms):
+    client.set_active_status(False)
+    client._pull_message = lambda: {"ms": list(ms)}
+    assert client._do_one_listen()
+
+
+def test_on_event(offline_client):
+    caught = catch_events(offline_client)
+    receive(
+        offline_client, new_message("mid.1", thread_fbid=1111), typing(), {"type": "x"}
+    )
+
+    message, typ, unknown = caught
+    assert isinstance(message, MessageEvent)
+    assert message.mid == "mid.1"
+    assert message.author_id == "4321"
+    assert message.thread_id == "1111"
+    assert message.thread_type == ThreadType.GROUP
+    assert message.message_object.text == "Hello"
+    assert isinstance(typ, TypingEvent)
+    assert typ.thread_id == "4321"
+    assert isinstance(unknown, UnknownEvent)
+
+
+def test_legacy_hooks(offline_client):
+    caught = []
+    offline_client.on_message = lambda **kwargs: caught.append(kwargs)
+    receive(offline_client, new_message("mid.1"))
+
+    kwargs, = caught
+    assert kwargs["mid"] == "mid.1"
+    assert kwargs["thread_id"] == "4321"
+    assert kwargs["thread_type"] == ThreadType.USER
+    assert isinstance(kwargs["message_object"], Message)
+
+
+def test_event_pickle(offline_client):
+    caught = catch_events(offline_client)
+    receive(offline_client, new_message("mid.1"))
+    event, = caught
+    assert pickle.loads(pickle.dumps(event)).mid == "mid.1"
+
+
+def test_deduplication(offline_client):
+    caught = catch_events(offline_client)
+    receive(
+        offline_client, new_message("mid.1"), new_message("mid.2"), new_message("mid.1")
+    )
+    assert [event.mid for event in caught] == ["mid.1", "mid.2"]
+
+    offline_client.set_event_deduplication(size=0)
+    receive(offline_client, new_message("mid.1"))
+    assert len(caught) == 3
+
+
+def test_handler_error(offline_client):
+    errors = []
+
+    def on_message(**kwargs):
+        raise ValueError
+
+    offline_client.on_message = on_message
+    offline_client.on_message_error = lambda exception, msg: errors.append(exception)
+    receive(offline_client, new_message("mid.1"))
+    assert isinstance(errors[0], ValueError)
+
+
+def test_on_events(offline_client):
+    caught = []
+    offline_client.on_events = caught.append
+    offline_client.set_active_status(False)
+    offline_client._pull_message = lambda: {
+        "batches": [{"ms": [new_message("mid.1")]}, {"ms": [new_message("mid.2")]}],
+        "ms": [typing()],
+    }
+    offline_client._do_one_listen()
+
+    events, = caught
+    assert [type(e) for e in events] == [MessageEvent, MessageEvent, TypingEvent]
+
+
+def pull_responses(client, *responses):
+    responses = iter(responses)
+
+    def pull_message():
+        try:
+            return next(responses)
+        except StopIteration:
+            time.sleep(0.01)  # Like a long-poll that didn't return anything
+            return None
+
+    client.set_active_status(False)
+    client._pull_message = pull_message
+
+
+def test_events(offline_client):
+    pull_responses(
+        offline_client,
+        {"ms": [new_message("mid.1"), new_message("mid.2")]},
+        {"ms": [new_message("mid.3")]},
+    )
+    events = offline_client.events()
+    assert [next(events).mid for _ in range(3)] == ["mid.1", "mid.2", "mid.3"]
+    assert offline_client._event_backlog is not None
+    events.close()
+    assert offline_client._event_backlog is None
+
+
+def test_events_batched(offline_client):
+    pull_responses(
+        offline_client,
+        {"ms": [new_message("mid.1"), new_message("mid.2"), new_message("mid.3")]},
+        {"ms": [new_message("mid.4")]},
+    )
+    events = offline_client.events(batch_size=2)
+    assert [e.mid for e in next(events)] == ["mid.1", "mid.2"]
+    assert [e.mid for e in next(events)] == ["mid.3", "mid.4"]
+    events.close()
+
+
+def test_events_max_wait(offline_client):
+    pull_responses(offline_client, {"ms": [new_message("mid.1")]})
+    events = offline_client.events(batch_size=100, max_wait=0.1)
+    assert [e.mid for e in next(events)] == ["mid.1"]
+    events.close()
+
+
+def test_handler_overrun(offline_client):
+    release = threading.Event()
+    overruns = []
+    offline_client.on_message = lambda **kwargs: release.wait(5)
+    offline_client.on_handler_overrun = lambda event: overruns.append(event)
+    offline_client.set_handler_budget(0.01)
+    receive(offline_client, new_message("mid.1"), typing())
+    release.set()
+
+    event, = overruns
+    assert isinstance(event, MessageEvent)
+    assert set(offline_client.get_handler_latencies()) >= {"on_typing"}
+
+
+def test_ping_interval(offline_client, monkeypatch):
+    pings = []
+    monkeypatch.setattr(offline_client, "_ping", lambda: pings.append(None))
+    offline_client.set_ping_interval(0.05)
+    stop = offline_client._start_pinging()
+    time.sleep(0.22)
+    stop.set()
+    assert 3 <= len(pings) <= 6
+
+
+def test_pull_does_not_ping(offline_client, monkeypatch):
+    monkeypatch.setattr(offline_client, "_ping", lambda: 1 / 0)
+    offline_client.set_active_status(True)
+    offline_client._pull_message = lambda: {"ms": [typing()]}
+    event, = offline_client._pull_events()
+    assert isinstance(event, TypingEvent)
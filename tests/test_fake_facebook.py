@@ -0,0 +1,366 @@
+import concurrent.futures
+import pytest
+import requests
+import time
+
+from os import path
+from fbchat import (
+    FBchatException,
+    FBchatFacebookError,
+    Group,
+    Message,
+    MessageEvent,
+    ThreadType,
+    User,
+)
+from fbchat._exception import FBchatPleaseRefresh
+
+GRAPHQL_THREAD_MESSAGES = "1860982147341344"
+
+
+def test_login(fake_facebook, fake_client):
+    assert fake_client.uid == "1234"
+    assert fake_client.is_logged_in()
+    assert fake_client._state._fb_dtsg == "fake_dtsg"
+
+
+def test_send_and_listen(fake_facebook, fake_client):
+    fake_facebook.add_group("1111", participants=["4321"])
+    caught = []
+    fake_client.on_event = caught.append
+
+    mid = fake_client.send(Message(text="Hi"), "1111", ThreadType.GROUP)
+    fake_facebook.receive_message("Hello", author_id="4321", thread_id="1111")
+    assert fake_client._do_one_listen()  # Gets the sticky token
+    assert fake_client._do_one_listen()
+
+    sent, received = caught
+    assert isinstance(sent, MessageEvent)
+    assert sent.mid == mid
+    assert sent.message_object.text == "Hi"
+    assert received.author_id == "4321"
+    assert received.message_object.text == "Hello"
+
+
+def test_fetch(fake_facebook, fake_client):
+    fake_facebook.add_user("4321", name="Jane Doe")
+    fake_facebook.add_group("1111", name="Friends", participants=["4321"])
+    fake_facebook.receive_message("Hello", author_id="4321")
+
+    threads = fake_client.fetch_thread_info("1111", "4321")
+    assert isinstance(threads["1111"], Group)
+    assert threads["1111"].name == "Friends"
+    assert threads["1111"].participants == {"1234", "4321"}
+    assert isinstance(threads["4321"], User)
+    assert threads["4321"].first_name == "Jane"
+
+    message, = fake_client.fetch_thread_messages("4321")
+    assert message.text == "Hello"
+    assert message.author == "4321"
+    assert len(fake_client.fetch_thread_list()) == 2
+
+
+def test_upload(fake_facebook, fake_client):
+    image = path.join(path.dirname(__file__), "resources", "image.png")
+    fake_client.send_local_files([image], thread_id="4321")
+    sent = [r for r in fake_facebook.requests if r[1] == "/messaging/send/"]
+    (_, _, params), = sent
+    assert params["image_ids[0]"] == "1000"
+
+
+def test_error_injection(fake_facebook, fake_client):
+    fake_facebook.fail("/messaging/send/", status=500)
+    with pytest.raises(FBchatFacebookError) as excinfo:
+        fake_client.send(Message(text="Hi"), "4321")
+    assert excinfo.value.request_status_code == 500
+
+    fake_facebook.fail("/ajax/mercury/change_read_status.php", error=1357004)
+    with pytest.raises(FBchatPleaseRefresh):
+        fake_client.mark_as_read("4321")
+
+    fake_facebook.fail("/pull", status=503)
+    assert fake_client._pull_events() == []
+    assert fake_client._pull_channel == 1
+
+
+def test_latency(fake_facebook, fake_client):
+    fake_facebook.latency = 0.1
+    started_at = time.monotonic()
+    fake_client.send(Message(text="Hi"), "4321")
+    assert time.monotonic() - started_at >= 0.1
+
+
+
+@pytest.fixture
+def threads(fake_facebook):
+    thread_ids = []
+    for i in range(5):
+        thread_id = str(10000 + i)
+        fake_facebook.add_user(thread_id)
+        for j in range(3):
+            fake_facebook.receive_message("{}-{}".format(i, j), author_id=thread_id)
+        thread_ids.append(thread_id)
+    return thread_ids
+
+
+def batch_requests(fake_facebook):
+    return [r for r in fake_facebook.requests if r[1] == "/api/graphqlbatch/"]
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_fetch_messages_for_threads(fake_facebook, fake_client, threads, parallel):
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        messages, errors = fake_client.fetch_messages_for_threads(
+            threads + ["99999"],
+            limit=2,
+            batch_size=4,
+            executor=executor if parallel else None,
+        )
+
+    assert len(batch_requests(fake_facebook)) == 2
+    assert sorted(messages) == threads
+    assert [m.text for m in messages["10003"]] == ["3-2", "3-1"]
+    assert list(errors) == ["99999"]
+    assert isinstance(errors["99999"], FBchatException)
+
+
+def test_fetch_messages_for_threads_errors(fake_facebook, fake_client, threads):
+    def respond(params):
+        if params["id"] == "10001":
+            return {"errors": [{"code": 1675004, "message": "Rate limited"}]}
+        return None
+
+    fake_facebook.graphql[GRAPHQL_THREAD_MESSAGES] = respond
+    messages, errors = fake_client.fetch_messages_for_threads(threads)
+    assert sorted(messages) == threads[:1] + threads[2:]
+    assert errors["10001"].fb_error_code == "1675004"
+
+    # A failed request fails all threads in the batch
+    fake_facebook.fail("/api/graphqlbatch/", status=500)
+    messages, errors = fake_client.fetch_messages_for_threads(threads, batch_size=3)
+    assert sorted(messages) == threads[3:]
+    assert sorted(errors) == threads[:3]
+    assert all(isinstance(e, FBchatFacebookError) for e in errors.values())
+
+    # Including when it times out
+    def slow(params):
+        if params["id"] == threads[0]:
+            time.sleep(0.5)
+        return None
+
+    fake_facebook.graphql[GRAPHQL_THREAD_MESSAGES] = slow
+    fake_client.set_timeouts(graphql=(10, 0.1))
+    messages, errors = fake_client.fetch_messages_for_threads(threads, batch_size=3)
+    assert sorted(messages) == threads[3:]
+    assert all(isinstance(e, requests.Timeout) for e in errors.values())
+
+
+def test_read_receipts(fake_facebook, fake_client):
+    fake_facebook.add_group("1111", participants=["4321", "5432", "6543"])
+    for i in range(4):
+        fake_facebook.receive_message(str(i), "4321", "1111", timestamp=1000 * i)
+    fake_facebook.read_receipts["1111"].update({"4321": 3000, "5432": 1000, "6543": 0})
+
+    messages = fake_client.fetch_thread_messages("1111", limit=4)
+    assert [(m.text, sorted(m.read_by)) for m in messages] == [
+        ("3", ["4321"]),
+        ("2", ["4321"]),
+        ("1", ["4321", "5432"]),
+        ("0", ["4321", "5432", "6543"]),
+    ]
+
+    messages = fake_client.fetch_thread_messages("1111", load_read_receipts=False)
+    assert all(message.read_by == [] for message in messages)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_fetch_all_users_from_threads(fake_facebook, fake_client, parallel):
+    user_ids = ["1234", "4321", "5432", "6543", "7654"]
+    for user_id in user_ids:
+        fake_facebook.add_user(user_id)
+    fake_facebook.add_group("1111", participants=["4321", "5432", "6543"])
+    fake_facebook.add_group("2222", participants=["5432", "6543", "7654"])
+    threads = fake_client.fetch_thread_info("4321", "1111", "2222")
+    threads = [threads["4321"], threads["1111"], threads["2222"], threads["4321"]]
+    del fake_facebook.requests[:]
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        users = fake_client.fetch_all_users_from_threads(
+            threads, batch_size=2, executor=executor if parallel else None
+        )
+
+    assert users[0] is threads[0]
+    assert sorted(user.uid for user in users) == user_ids
+    assert all(isinstance(user, User) for user in users)
+    # Fetches the 4 users that weren't already fetched, 2 at a time
+    requests = [r for r in fake_facebook.requests if r[1] == "/chat/user_info/"]
+    assert len(requests) == 2
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_fetch_thread_info_batches(fake_facebook, fake_client, parallel):
+    user_ids = [str(10000 + i) for i in range(4)]
+    for user_id in user_ids:
+        fake_facebook.add_user(user_id)
+    fake_facebook.add_group("1111", participants=user_ids)
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        threads = fake_client.fetch_thread_info(
+            *user_ids + ["1111"], batch_size=2, executor=executor if parallel else None
+        )
+
+    assert sorted(threads) == user_ids + ["1111"]
+    assert isinstance(threads["1111"], Group)
+    assert all(isinstance(threads[user_id], User) for user_id in user_ids)
+    paths = [path for _, path, _ in fake_facebook.requests]
+    assert paths.count("/api/graphqlbatch/") == 3
+    assert paths.count("/chat/user_info/") == 2
+
+
+def thread_delta(mid, thread_key, **delta):
+    metadata = {
+        "messageId": mid,
+        "actorFbId": 4321,
+        "timestamp": "1500000000000",
+        "threadKey": thread_key,
+    }
+    return {"type": "delta", "delta": dict(delta, messageMetadata=metadata)}
+
+
+def test_entity_cache(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    fake_facebook.add_group("1111", name="Friends", participants=["4321"])
+    fake_client.set_entity_cache(size=10, ttl=None)
+    group = fake_client.fetch_group_info("1111")["1111"]
+    user = fake_client.fetch_user_info("4321")["4321"]
+    requests = len(fake_facebook.requests)
+    threads = fake_client.fetch_thread_info("1111", "4321")
+    assert threads["1111"] is not group
+    assert (threads["1111"].name, threads["4321"].name) == (group.name, user.name)
+    assert len(fake_facebook.requests) == requests
+
+    group_key = {"threadFbId": 1111}
+    fake_facebook.push(
+        thread_delta("mid.$1", group_key, **{"class": "ThreadName", "name": "Family"}),
+        thread_delta("mid.$2", group_key, addedParticipants=[{"userFbId": 5432}]),
+    )
+    assert fake_client._do_one_listen()  # Gets the sticky token
+    assert fake_client._do_one_listen()
+    cached = fake_client.fetch_group_info("1111")["1111"]
+    assert len(fake_facebook.requests) == requests + 2  # Only pulls
+    assert cached.name == "Family"
+    assert cached.participants == {"1234", "4321", "5432"}
+    # Threads already returned don't change, and changing them changes nothing
+    assert group.name == "Friends"
+    cached.participants.clear()
+    assert fake_client.fetch_group_info("1111")["1111"].participants
+
+    # Changes that can't be applied evict the thread
+    untyped_data = {"participant_id": 4321, "nickname": "Jane"}
+    fake_facebook.push(
+        thread_delta(
+            "mid.$3",
+            {"otherUserFbId": 4321},
+            type="change_thread_nickname",
+            untypedData=untyped_data,
+        )
+    )
+    requests = len(fake_facebook.requests)
+    assert fake_client._do_one_listen()
+    fake_client.fetch_user_info("4321")
+    assert len(fake_facebook.requests) == requests + 3  # Fetched again
+    fake_client.fetch_group_info("1111")
+    assert len(fake_facebook.requests) == requests + 3
+
+
+def test_thread_index(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    fake_facebook.add_user("5432")
+    fake_facebook.add_group("1111", name="Friends", participants=["4321"])
+    fake_facebook.receive_message("Hi", author_id="4321", timestamp=1500000000000)
+    fake_facebook.receive_message("Hey", author_id="5432", timestamp=1500000001000)
+    fake_facebook.receive_message("Yo", author_id="4321", thread_id="1111")
+    fake_facebook.read_receipts["4321"]["1234"] = 1500000000000
+
+    index = fake_client.create_thread_index()
+    assert len(index) == 3
+    assert [thread.uid for thread in index.recent()] == ["1111", "5432", "4321"]
+    group = index.get("1111")
+    assert [thread.uid for thread in index.unread()] == ["1111", "5432"]
+    assert not index.is_unread("4321")
+
+    # Events received while listening update the index, without any requests
+    fake_facebook.receive_message("Hello again", author_id="4321")
+    fake_facebook.push(
+        {
+            "type": "delta",
+            "delta": {
+                "class": "MarkRead",
+                "threadKeys": [{"threadFbId": 1111}],
+                "actionTimestampMs": "1500000002000",
+                "watermarkTimestampMs": "1500000002000",
+            },
+        },
+        thread_delta(
+            "mid.$1", {"threadFbId": 1111}, **{"class": "ThreadName", "name": "Fam"}
+        ),
+    )
+    requests = len(fake_facebook.requests)
+    assert fake_client._do_one_listen()  # Gets the sticky token
+    assert fake_client._do_one_listen()
+    paths = [path for _, path, _ in fake_facebook.requests[requests:]]
+    assert set(paths) == {"/pull"}
+
+    assert [thread.uid for thread in index.recent(limit=1)] == ["4321"]
+    assert [thread.uid for thread in index.unread()] == ["4321", "5432"]
+    assert index.get("1111").name == "Fam"
+    # Threads are returned as copies, which aren't changed by the index
+    assert group.name == "Friends"
+    group.name = "Changed"
+    assert index.get("1111").name == "Fam"
+
+
+def test_thread_index_while_listening(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    fake_facebook.receive_message("Hi", author_id="4321")
+    events = fake_client.events()
+    next(events)
+    seq = fake_client._seq
+    with pytest.raises(ValueError):
+        fake_client.create_thread_index()
+    assert fake_client._seq == seq
+    events.close()
+    assert len(fake_client.create_thread_index()) == 1
+
+
+def test_search_for_messages(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    mids = [
+        fake_facebook.receive_message("Hello {}".format(i), author_id="4321")
+        for i in range(7)
+    ]
+    fake_facebook.receive_message("Bye", author_id="4321")
+    requests = len(fake_facebook.requests)
+
+    messages = fake_client.search_for_messages(
+        "Hello", limit=10, thread_id="4321", batch_size=3
+    )
+    assert [message.uid for message in messages] == mids[::-1]
+    paths = [path for _, path, _ in fake_facebook.requests[requests:]]
+    assert paths.count("/api/graphqlbatch/") == 3
+
+
+def test_adaptive_pull_timeout(fake_facebook, fake_client):
+    fake_facebook.hold = 1
+    fake_client.set_timeouts(pull=(10, 0.5), adaptive_pull=True)
+    timeouts = fake_client._state._timeouts
+
+    # The first pull returns a sticky token at once, which isn't a hold
+    assert fake_client._do_one_listen()
+    assert timeouts.get_pull() == (10, 0.5)
+
+    # A timed out pull grows the read timeout, so the next pull doesn't time out
+    assert fake_client._do_one_listen()
+    assert timeouts.get_pull() == (10, 5.625)
+    assert fake_client._do_one_listen()
+    assert timeouts._hold_times[-1] >= 1
@@ -0,0 +1,98 @@
+import itertools
+import pytest
+
+from fbchat import FBchatFacebookError, ThreadLocation, _util
+
+# Threads 0-44, with thread 0 the most recent. Threads 18-22 were last active at
+# the same time, so they span the boundary between the first two pages
+TIMESTAMPS = [1500000000000 - 1000 * i for i in range(45)]
+TIMESTAMPS[18:23] = [TIMESTAMPS[18]] * 5
+
+
+@pytest.fixture
+def inbox(fake_facebook):
+    thread_ids = []
+    for i, timestamp in enumerate(TIMESTAMPS):
+        thread_id = str(10000 + i)
+        fake_facebook.add_user(thread_id)
+        fake_facebook.receive_message("Hi", author_id=thread_id, timestamp=timestamp)
+        thread_ids.append(thread_id)
+    return thread_ids
+
+
+def thread_list_requests(fake_facebook):
+    return [r for r in fake_facebook.requests if r[1] == "/api/graphqlbatch/"]
+
+
+def test_iter_threads(fake_client, inbox):
+    threads = list(fake_client.iter_threads(ThreadLocation.INBOX))
+    assert sorted(thread.uid for thread in threads) == inbox
+    assert len(threads) == len(inbox)
+    last_actives = [thread.last_active for thread in threads]
+    assert last_actives == sorted(last_actives, reverse=True)
+
+
+def test_iter_threads_cursor(fake_client, inbox):
+    threads = fake_client.iter_threads(ThreadLocation.INBOX)
+    assert threads.cursor is None
+    first = [thread.uid for thread in itertools.islice(threads, 20)]
+    cursor = threads.cursor
+    assert cursor.startswith("{}:".format(TIMESTAMPS[18]))
+    threads.close()
+
+    threads = fake_client.iter_threads(ThreadLocation.INBOX, cursor=cursor)
+    rest = [thread.uid for thread in threads]
+    assert sorted(first + rest) == inbox
+
+
+def test_iter_threads_after(fake_facebook, fake_client, inbox):
+    after = _util.millis_to_datetime(TIMESTAMPS[10])
+    threads = fake_client.iter_threads(ThreadLocation.INBOX, after=after)
+    assert [thread.uid for thread in threads] == inbox[:11]
+    # Stops without fetching, or prefetching, the next page
+    assert len(thread_list_requests(fake_facebook)) == 1
+
+
+def test_fetch_threads(fake_facebook, fake_client, inbox):
+    assert [t.uid for t in fake_client.fetch_threads(ThreadLocation.INBOX)] == inbox
+
+    before = _util.millis_to_datetime(TIMESTAMPS[5])
+    after = _util.millis_to_datetime(TIMESTAMPS[30])
+    threads = fake_client.fetch_threads(ThreadLocation.INBOX, before, after)
+    assert [thread.uid for thread in threads] == inbox[5:31]
+
+    del fake_facebook.requests[:]
+    threads = fake_client.fetch_threads(ThreadLocation.INBOX, limit=5)
+    assert [thread.uid for thread in threads] == inbox[:5]
+    assert len(thread_list_requests(fake_facebook)) == 1
+
+
+def test_iter_thread_messages(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    timestamps = [1500000000000 + 1000 * i for i in range(25)]
+    # Messages 8-11 were sent at the same time, spanning the first two pages
+    timestamps[8:12] = [timestamps[8]] * 4
+    mids = [
+        fake_facebook.receive_message(str(i), author_id="4321", timestamp=timestamp)
+        for i, timestamp in enumerate(timestamps)
+    ]
+
+    messages = fake_client.iter_thread_messages("4321", page_size=15)
+    assert [message.uid for message in messages] == mids[::-1]
+
+    before = _util.millis_to_datetime(timestamps[5])
+    messages = fake_client.iter_thread_messages("4321", before=before, page_size=2)
+    assert [message.uid for message in messages] == mids[5::-1]
+
+
+def test_iter_thread_messages_error(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    for i in range(5):
+        fake_facebook.receive_message(str(i), author_id="4321", timestamp=1000 * i)
+    messages = fake_client.iter_thread_messages("4321", page_size=2)
+    assert next(messages).text == "4"
+    assert next(messages).text == "3"
+    # Raised when the failed page is needed, even if it was prefetched
+    fake_facebook.fail("/api/graphqlbatch/", status=500)
+    with pytest.raises(FBchatFacebookError):
+        list(messages)
@@ -0,0 +1,148 @@
+import pytest
+import threading
+import time
+
+from fbchat import Client, Listener, TypingEvent
+from fbchat import _util
+
+
+def typing(user_id):
+    return {"type": "typ", "from": user_id, "to": 1234, "st": 1}
+
+
+def listener_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("fbchat-listener")]
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def clients(fake_facebook):
+    clients = [
+        Client("email", "password", session_cookies={"c_user": "1234"})
+        for _ in range(20)
+    ]
+    for client in clients:
+        client.set_active_status(False)
+    yield clients
+    for client in clients:
+        client._state._session.close()
+
+
+@pytest.fixture
+def listener():
+    listener = Listener(workers=2)
+    yield listener
+    listener.stop()
+    listener.join(5)
+
+
+def receive(clients, count):
+    """Record the events of each client, until all have received ``count``."""
+    received = {client: [] for client in clients}
+    done = threading.Event()
+
+    def on_event(client, event):
+        received[client].append(event)
+        if all(len(events) >= count for events in received.values()):
+            done.set()
+
+    for client in clients:
+        client.on_event = lambda event, client=client: on_event(client, event)
+    return received, done
+
+
+def test_listener(fake_facebook, clients, listener):
+    received, done = receive(clients, 3)
+    for client in clients:
+        listener.add(client)
+    assert len(listener) == len(clients)
+    listener.start()
+    fake_facebook.push(typing(1), typing(2))
+    fake_facebook.push(typing(3))
+    assert done.wait(5)
+    # The event loop, and the workers
+    assert len(listener_threads()) == 3
+    listener.stop()
+    listener.join(5)
+    # The workers stop once they're done with the events of the last pull requests
+    wait_until(lambda: not listener_threads())
+    for client in clients:
+        assert all(isinstance(event, TypingEvent) for event in received[client])
+        assert [event.thread_id for event in received[client]] == ["1", "2", "3"]
+        assert client._sticky is None
+
+
+def test_listener_latency(fake_facebook, clients, listener):
+    """Clients waiting for Facebook don't hold up the other clients."""
+    fake_facebook.hold = 5
+    received, done = receive(clients, 1)
+    for client in clients:
+        listener.add(client)
+    listener.start()
+    # Wait until every client has a pull request held by Facebook
+    wait_until(lambda: all(client._sticky for client in clients))
+    time.sleep(0.1)
+
+    started_at = time.monotonic()
+    fake_facebook.push(typing(1))
+    assert done.wait(5)
+    assert time.monotonic() - started_at < 1
+    fake_facebook.hold = 0.2
+
+
+def test_listener_unavailable_channel(fake_facebook, clients, listener):
+    client = clients[0]
+    received, done = receive([client], 1)
+    fake_facebook.fail("/pull", status=503)
+    listener.add(client)
+    listener.start()
+    fake_facebook.push(typing(1))
+    assert done.wait(5)
+    assert client._pull_channel == 1
+    stats = client.get_request_metrics().endpoints[("/pull", None)]
+    assert stats.status_codes[503] == 1
+
+
+def test_listener_backoff(monkeypatch, clients):
+    client = clients[0]
+    pulls = []
+    pull_params = client._pull_params
+    client._pull_params = lambda: pulls.append(client) or pull_params()
+    # Nothing listens on port 9 of this host
+    monkeypatch.setattr(_util, "BASE_URL", "http://127.0.0.1:9")
+
+    listener = Listener(workers=1, backoff=60)
+    listener.add(client)
+    listener.start()
+    wait_until(lambda: listener._failures)
+    time.sleep(0.1)
+    # The client is waiting before trying again
+    assert len(pulls) == 1
+    assert listener._failures == 1
+    listener.stop()
+    listener.join(5)
+    wait_until(lambda: not listener_threads())
+
+
+def test_listener_remove(fake_facebook, clients, listener):
+    listener.add(clients[0])
+    listener.add(clients[0])
+    listener.add(clients[1])
+    listener.remove(clients[0])
+    assert len(listener) == 1
+
+    received, done = receive(clients[:2], 1)
+    listener.start()
+    fake_facebook.push(typing(1))
+    wait_until(lambda: received[clients[1]])
+    assert not received[clients[0]]
+
+    listener.remove(clients[1])
+    wait_until(lambda: clients[1]._sticky is None)
+    assert not listener._tasks
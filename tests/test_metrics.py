@@ -0,0 +1,85 @@
+import pytest
+import requests
+
+from fbchat import FBchatException, Message, MetricsServer, RequestSample
+
+
+def test_request_metrics(fake_facebook, fake_client):
+    fake_facebook.add_group("1111")
+    samples = []
+    fake_client.add_request_callback(samples.append)
+
+    fake_client.send(Message(text="Hi"), "1111")
+    fake_client.fetch_thread_info("1111")
+
+    send, graphql = samples
+    assert isinstance(send, RequestSample)
+    assert send.endpoint == "/messaging/send/"
+    assert send.method == "POST"
+    assert send.status_code == 200
+    assert send.request_bytes > 0
+    assert send.response_bytes > 0
+    assert send.duration > 0
+    assert graphql.endpoint == "/api/graphqlbatch/"
+    assert graphql.doc_ids == ("2147762685294928",)
+
+    endpoints = fake_client.get_request_metrics().endpoints
+    stats = endpoints[("/api/graphqlbatch/", "2147762685294928")]
+    assert stats.latency.count == 1
+    assert stats.status_codes == {200: 1}
+
+
+def test_request_metrics_errors(fake_facebook, fake_client):
+    fake_facebook.fail("/messaging/send/", status=500)
+    fake_facebook.fail("/ajax/mercury/change_read_status.php", error=1357004)
+    with pytest.raises(FBchatException):
+        fake_client.send(Message(text="Hi"), "4321")
+    with pytest.raises(FBchatException):
+        fake_client.mark_as_read("4321")
+
+    endpoints = fake_client.get_request_metrics().endpoints
+    assert endpoints[("/messaging/send/", None)].status_codes == {500: 1}
+    stats = endpoints[("/ajax/mercury/change_read_status.php", None)]
+    assert stats.error_codes == {1357004: 1}
+
+
+def test_request_callback_error(fake_facebook, fake_client):
+    def callback(sample):
+        raise ValueError
+
+    fake_client.add_request_callback(callback)
+    fake_client.send(Message(text="Hi"), "4321")
+    fake_client.remove_request_callback(callback)
+
+
+def test_metrics_server(fake_facebook, fake_client):
+    fake_facebook.add_group("1111")
+    fake_client.set_active_status(False)
+    fake_client.send(Message(text="Hi"), "1111")
+    fake_client.on_event = lambda event: None
+    assert fake_client._do_one_listen()  # Gets the sticky token
+    assert fake_client._do_one_listen()
+
+    server = MetricsServer(port=0)
+    server.add(fake_client)
+    server.start()
+    try:
+        url = "http://{}:{}/metrics".format(*server.address)
+        r = requests.get(url)
+        assert requests.get(url + "/other").status_code == 404
+    finally:
+        server.stop()
+
+    assert r.status_code == 200
+    assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    lines = r.text.splitlines()
+    assert "# TYPE fbchat_requests_total counter" in lines
+    assert (
+        'fbchat_requests_total{account="1234",endpoint="/messaging/send/",'
+        'status="200"} 1'
+    ) in lines
+    assert 'fbchat_events_total{account="1234",type="MessageEvent"} 1' in lines
+    assert (
+        'fbchat_request_duration_seconds_count{account="1234",endpoint="/pull"} 2'
+    ) in lines
+    assert 'fbchat_events_queued{account="1234"} 0' in lines
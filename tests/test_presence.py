@@ -0,0 +1,83 @@
+import sys
+import threading
+
+from fbchat._presence import PresenceStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_update_and_get():
+    store = PresenceStore(clock=FakeClock())
+    store.update("1234", active=True, last_active=1500000000000, in_game=False)
+    status = store.get(1234)
+    assert status.active is True
+    assert status.in_game is False
+    assert status.last_active.timestamp() == 1500000000
+    assert store.get("4321") is None
+
+
+def test_get_many():
+    store = PresenceStore(clock=FakeClock())
+    store.update("1", active=True, last_active=None, in_game=None)
+    store.update("2", active=False, last_active=1000, in_game=None)
+    statuses = store.get_many(["1", "2", "3"])
+    assert set(statuses) == {"1", "2"}
+    assert statuses["1"].last_active is None
+
+
+def test_active_since():
+    store = PresenceStore(clock=FakeClock())
+    store.update("1", active=True, last_active=None, in_game=None)
+    store.update("2", active=False, last_active=1000, in_game=None)
+    store.update("3", active=False, last_active=3000, in_game=None)
+    assert sorted(store.active_since(2000)) == ["1", "3"]
+
+
+def test_ttl_eviction():
+    clock = FakeClock()
+    store = PresenceStore(ttl=10, clock=clock)
+    store.update("1", active=True, last_active=None, in_game=None)
+    clock.now = 5000
+    store.update("2", active=True, last_active=None, in_game=None)
+    clock.now = 12000
+    store.update("1", active=False, last_active=None, in_game=None)
+    clock.now = 16000
+    store.evict_expired()
+    assert len(store) == 1
+    assert store.get("1") is not None
+    assert store.get("2") is None
+
+
+def test_concurrent_use():
+    store = PresenceStore(ttl=None)
+    for user_id in range(1000):
+        store.update(user_id, True, None, False)
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        try:
+            while not stop.is_set():
+                store.active_since(0)
+        except Exception as e:
+            errors.append(e)
+
+    # Switch threads often, to make races likely
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        reader = threading.Thread(target=read)
+        reader.start()
+        for i in range(20000):
+            store.update(i % 1000, True, None, False)
+        stop.set()
+        reader.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors
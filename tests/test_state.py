@@ -0,0 +1,87 @@
+import logging
+import pytest
+
+from fbchat._state import PayloadLogger, State, Timeouts
+
+
+def test_timeouts_adaptive_pull():
+    timeouts = Timeouts(pull=(5, 30), adaptive_pull=True)
+    assert timeouts.get_pull() == (5, 30)
+    timeouts.observe_pull_hold(20)
+    timeouts.observe_pull_hold(40)
+    assert timeouts.get_pull() == (5, 55)
+    timeouts.observe_pull_hold(200)
+    assert timeouts.get_pull() == (5, timeouts.max_pull)
+
+
+def test_timeouts_adaptive_pull_minimum():
+    timeouts = Timeouts(pull=(5, 30), adaptive_pull=True)
+    timeouts.observe_pull_hold(0.04)
+    assert timeouts.get_pull() == (5, 30)
+
+
+def test_timeouts_adaptive_pull_timeout():
+    timeouts = Timeouts(pull=(5, 30), adaptive_pull=True)
+    timeouts.observe_pull_timeout((5, 30))
+    assert timeouts.get_pull() == (5, 42.5)
+    timeouts.observe_pull_timeout(timeouts.get_pull())
+    assert timeouts.get_pull()[1] > 42.5
+
+
+def test_timeouts_not_adaptive():
+    timeouts = Timeouts(pull=70)
+    timeouts.observe_pull_hold(20)
+    assert timeouts.get_pull() == 70
+
+
+def test_request_timeouts(monkeypatch):
+    state = State(user_id="1234", fb_dtsg="", revision=1)
+    state._timeouts.send = (1, 2)
+    calls = []
+
+    def post(url, data, files, timeout):
+        calls.append(timeout)
+        raise RuntimeError
+
+    monkeypatch.setattr(state._session, "post", post)
+    for func, args in [(state._post, ("/", {})), (state._do_send_request, ({},))]:
+        try:
+            func(*args)
+        except RuntimeError:
+            pass
+    assert calls == [state._timeouts.default, (1, 2)]
+
+
+def test_payload_logger(caplog):
+    logger = PayloadLogger(sample_rate=2, max_size=5, endpoints={"/pull"})
+    with caplog.at_level(logging.DEBUG, logger="fbchat"):
+        for content in ["abc", "abcdefgh", "xyz"]:
+            logger.log("/pull", content)
+        logger.log("/messaging/send/", "abc")
+
+    first, second = caplog.records
+    assert first.getMessage() == "Response from /pull: abc"
+    assert second.getMessage() == "Response from /pull: xyz"
+    logger.sample_rate = 1
+    caplog.clear()
+    with caplog.at_level(logging.DEBUG, logger="fbchat"):
+        logger.log("/pull", "abcdefgh")
+    record, = caplog.records
+    assert record.getMessage() == "Response from /pull: abcde... (3 more)"
+    assert record.fbchat_response_size == 8
+
+
+def test_payload_logger_disabled(caplog):
+    with caplog.at_level(logging.INFO, logger="fbchat"):
+        PayloadLogger().log("/pull", "abc")
+    assert not caplog.records
+    with caplog.at_level(logging.DEBUG, logger="fbchat"):
+        PayloadLogger(sample_rate=0).log("/pull", "abc")
+    assert not caplog.records
+
+
+def test_set_payload_logging(offline_client):
+    with pytest.raises(ValueError):
+        offline_client.set_payload_logging(sample_rate=0)
+    offline_client.set_payload_logging(sample_rate=10)
+    assert offline_client._state._payload_logger.sample_rate == 10
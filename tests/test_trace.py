@@ -0,0 +1,124 @@
+import concurrent.futures
+import pytest
+
+from fbchat import FBchatFacebookError, Tracer
+from fbchat._trace import span, current_span
+
+
+def test_span_without_tracer():
+    with span("parse") as s:
+        s.set_attribute("key", "value")
+    assert current_span() is None
+
+
+def test_tracer_nesting():
+    tracer = Tracer(max_traces=2)
+    with tracer.start_span("a") as a:
+        with span("b", key="value") as b:
+            assert current_span() is b
+        with pytest.raises(ValueError):
+            with span("c"):
+                raise ValueError
+        assert current_span() is a
+    assert current_span() is None
+
+    trace, = tracer.traces
+    assert trace is a
+    assert [child.name for child in a.children] == ["b", "c"]
+    assert b.parent is a
+    assert b.attributes == {"key": "value"}
+    assert isinstance(a.children[1].error, ValueError)
+    assert a.duration >= b.duration >= 0
+
+
+def test_trace_client_methods(fake_facebook, fake_client):
+    fake_facebook.add_user("4321", name="Jane Doe")
+    fake_facebook.add_group("1111", participants=["4321"])
+    tracer = Tracer()
+    fake_client.set_tracer(tracer)
+
+    fake_client.fetch_thread_info("1111", "4321")
+
+    trace, = tracer.traces
+    assert trace.name == "Client.fetch_thread_info"
+    graphql, user_info, parse_users, parse_threads = trace.children
+    assert graphql.name == "Client.graphql_requests"
+    assert [child.name for child in graphql.children] == [
+        "POST /api/graphqlbatch/",
+        "parse",
+    ]
+    request = graphql.children[0]
+    assert request.attributes["doc_ids"] == "2147762685294928"
+    assert request.attributes["status_code"] == 200
+    assert user_info.name == "POST /chat/user_info/"
+    assert parse_users.name == "parse"
+    assert parse_threads.name == "parse threads"
+    assert parse_threads.attributes == {"count": 2}
+
+
+def test_trace_error(fake_facebook, fake_client):
+    tracer = Tracer()
+    fake_client.set_tracer(tracer)
+    fake_facebook.fail("/ajax/mercury/change_read_status.php", error=1357004)
+
+    with pytest.raises(FBchatFacebookError):
+        fake_client.mark_as_read(["4321"])
+
+    trace, = tracer.traces
+    assert isinstance(trace.error, FBchatFacebookError)
+    request, parse = trace.children
+    assert request.error is None
+    assert parse.error is None
+
+
+def test_untraced(fake_facebook, fake_client):
+    tracer = Tracer()
+    fake_client.set_tracer(tracer)
+    fake_client.set_tracer(None)
+    fake_client.fetch_thread_list()
+    assert not tracer.traces
+
+
+def test_trace_generator(fake_facebook, fake_client):
+    fake_facebook.add_user("4321")
+    for i in range(4):
+        fake_facebook.receive_message("Hello {}".format(i), author_id="4321")
+    tracer = Tracer()
+    fake_client.set_tracer(tracer)
+
+    messages = fake_client.search_for_messages(
+        "Hello", limit=10, thread_id="4321", batch_size=2
+    )
+    assert not tracer.traces  # Not done iterating
+    next(messages)
+    assert current_span() is None
+    assert len(list(messages)) == 3
+
+    trace, = tracer.traces
+    assert trace.name == "Client.search_for_messages"
+    assert trace.duration > 0
+    search, *batches = trace.children
+    assert search.name == "Client.search_for_message_ids"
+    assert search.children[0].name == "POST /ajax/mercury/search_snippets.php"
+    # The second batch is fetched in a background thread
+    assert [batch.name for batch in batches] == ["Client.graphql_requests"] * 2
+
+
+def test_trace_other_threads(fake_facebook, fake_client):
+    thread_ids = [str(1000 + i) for i in range(5)]
+    for thread_id in thread_ids:
+        fake_facebook.add_group(thread_id)
+    tracer = Tracer()
+    fake_client.set_tracer(tracer)
+
+    # The second batch is fetched in a background thread
+    fake_client.fetch_thread_info(*thread_ids, batch_size=3)
+    trace, = tracer.traces
+    graphql = [c for c in trace.children if c.name == "Client.graphql_requests"]
+    assert len(graphql) == 2
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        fake_client.fetch_thread_info(*thread_ids, batch_size=3, executor=executor)
+    trace = tracer.traces[-1]
+    graphql = [c for c in trace.children if c.name == "Client.graphql_requests"]
+    assert len(graphql) == 2
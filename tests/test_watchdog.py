@@ -0,0 +1,96 @@
+import pytest
+import subprocess
+import sys
+import threading
+import time
+
+from os import path
+from fbchat import Histogram
+from fbchat._watchdog import Watchdog
+
+
+def test_histogram():
+    histogram = Histogram(bounds=[1, 2, 5])
+    for value in [0.5, 1, 1.5, 3, 10]:
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.sum == 16
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(1) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_run_inline():
+    watchdog = Watchdog()
+    caught = []
+    assert watchdog.run("on_message", caught.append, 1)
+    assert caught == [1]
+    assert watchdog.latencies["on_message"].count == 1
+
+
+def test_run_exception():
+    def handler():
+        raise ValueError
+
+    for budget in [None, 1]:
+        watchdog = Watchdog(budget=budget)
+        with pytest.raises(ValueError):
+            watchdog.run("on_message", handler)
+        assert watchdog.latencies["on_message"].count == 1
+
+
+def test_run_overrun():
+    watchdog = Watchdog(budget=0.01)
+    release = threading.Event()
+    assert not watchdog.run("on_message", release.wait, 5)
+    assert watchdog.overruns == {"on_message": 1}
+    # The next handler isn't stuck behind the abandoned one
+    assert watchdog.run("on_typing", lambda: None)
+
+    release.set()
+    while watchdog.latencies.get("on_message") is None:
+        release.wait(0.01)
+    assert watchdog.latencies["on_message"].count == 1
+
+
+def test_run_overrun_error():
+    watchdog = Watchdog(budget=0.01)
+    release = threading.Event()
+    errors = []
+
+    def handler():
+        release.wait(5)
+        raise ValueError
+
+    assert not watchdog.run("on_message", handler, on_error=errors.append)
+    release.set()
+    while not errors:
+        release.wait(0.01)
+    assert isinstance(errors[0], ValueError)
+    assert watchdog.abandoned == 0
+
+
+def test_run_overrun_max_abandoned():
+    watchdog = Watchdog(budget=0.01, max_abandoned=2)
+    release = threading.Event()
+    for _ in range(2):
+        assert not watchdog.run("on_message", release.wait, 5)
+    assert watchdog.abandoned == 2
+
+    # No more threads are abandoned, the next handler waits for one to finish
+    threading.Timer(0.2, release.set).start()
+    assert watchdog.run("on_message", time.sleep, 0.05)
+    assert watchdog.overruns == {"on_message": 2}
+    assert watchdog.abandoned <= 2
+
+
+def test_run_overrun_exit():
+    # An abandoned handler doesn't keep the interpreter from exiting
+    code = (
+        "import time\n"
+        "from fbchat._watchdog import Watchdog\n"
+        "assert not Watchdog(budget=0.05).run('on_message', time.sleep, 30)\n"
+    )
+    root = path.dirname(path.dirname(path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True, timeout=10)